@@ -1,5 +1,4 @@
-from django.db.models import FileField, TextChoices
-from django.conf import settings
+from django.db.models import FileField, TextChoices, Index
 
 from user.models import (
     Model,
@@ -16,8 +15,6 @@ from user.models import (
     CharField,
 )
 
-from cloudinary.uploader import destroy
-
 
 class Chat(Model):
     id = UUIDField(primary_key=True, editable=False, default=uuid4)
@@ -54,18 +51,8 @@ class Message(Model):
 
     class Meta:
         ordering = ["-created"]
+        # Backs the keyset pagination of a chat's messages on `(created, id)`
+        indexes = [Index(fields=["chat", "-created", "-id"])]
 
     def __str__(self):
         return f"{self.get_message_type_display()} message from {self.sender}"
-
-    # Extending the `delete` method to also remove the deleted audio from cloudinary
-    def delete(self, *args, **kwargs):
-        if self.audio_content:
-            public_id = self.audio_content.name
-            destroy(
-                public_id=public_id,
-                api_key=settings.CLOUDINARY_STORAGE["API_KEY"],
-                api_secret=settings.CLOUDINARY_STORAGE["API_SECRET"],
-                cloud_name=settings.CLOUDINARY_STORAGE["CLOUD_NAME"],
-            )
-        return super().delete(*args, **kwargs)
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Message
+# The media deletion outbox (and the `purge_deleted_media` task draining it) belongs to palette, whose artworks
+# are most of the deleted media; chat only queues its audio files there, so chat depends on palette being installed
+from palette.models import MediaDeletion
+
+from urllib.parse import urlparse
+import os
+
+
+def get_public_id_from_url(url):
+    """
+    Extracts the cloudinary public id from a delivery url.
+    e.g. `https://res.cloudinary.com/<cloud>/video/upload/v123/abc.mp3` -> `abc`
+    """
+    path = urlparse(url).path
+    _, _, public_path = path.partition("/upload/")
+    segments = public_path.split("/")
+    if segments and segments[0].startswith("v") and segments[0][1:].isdigit():
+        segments = segments[1:]  # Drop the version segment
+    return os.path.splitext("/".join(segments))[0]
+
+
+@receiver(post_delete, sender=Message)
+def record_audio_deletion(sender, instance, **kwargs):
+    # Audio messages are uploaded with `resource_type="auto"`, which cloudinary stores as video
+    if instance.audio_content:
+        public_id = get_public_id_from_url(instance.audio_content.name)
+        if public_id:
+            MediaDeletion.objects.create(public_id=public_id, resource_type="video")
@@ -15,15 +15,14 @@ from user.views import (
 from .models import Chat, Message
 from .serializers import MessageSerializer, ChatSerializer
 from portal.permissions import IsChatArtistOrCollector
+from portal.pagination import KeysetPagination
 
 from uuid import UUID
-from rest_framework.pagination import CursorPagination
 from drf_spectacular.utils import extend_schema
 
 
-class ChatMessagePagination(CursorPagination):
+class ChatMessagePagination(KeysetPagination):
     page_size = 10  # Number of messages per page
-    ordering = "-created"
 
 
 
@@ -51,7 +50,7 @@ class ChatRoomView(APIView):
         other_user = artist if request.user == collector else collector
         other_user_status = chat.is_artist_online if other_user == artist else chat.is_collector_online
         
-        messages = Message.objects.filter(chat=chat).order_by("-created")
+        messages = Message.objects.filter(chat=chat)
         
         # Paginate the messages
         paginator = self.pagination_class()
@@ -1,6 +1,6 @@
 from django.contrib.admin import register, ModelAdmin
 
-from .models import Genre, Artwork
+from .models import Genre, Artwork, CartItem
 
 
 @register(Genre)
@@ -28,3 +28,9 @@ class ArtworkAdmin(ModelAdmin):
     list_filter = ["name", "created"]
     prepopulated_fields = {"slug": ["name"]}
     filter_horizontal = ["genre"]
+
+
+@register(CartItem)
+class CartItemAdmin(ModelAdmin):
+    list_display = ["id", "user", "artwork", "quantity", "updated"]
+    list_filter = ["updated"]
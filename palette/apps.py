@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PaletteConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "palette"
+
+    def ready(self):
+        from . import signals
@@ -1,78 +1,114 @@
 from django.conf import settings
 
-from .serializers import Artwork, ArtworkSerializer
+from .models import CartItem
+from .utils import get_artwork_snapshots
+from portal.redis_client import get_redis_connection
 
 from decimal import Decimal
 
 
-# Class for oprating shopping carts in the request session
+CART_DIRTY_SET = "cart_dirty"  # Ids of users whose carts changed since the last persistence run
+CART_LOADED_FIELD = "loaded"  # Marks a cart hash as restored, so empty carts aren't reloaded from the database
+
+
+# Class for operating shopping carts stored as redis hashes keyed by user
 class Cart:
     def __init__(self, request):
-        self.session = request.session
+        self.redis = get_redis_connection()
+        self.user_id = str(request.user.id)
+        self.key = f"cart_{self.user_id}"
 
         """
-        Retrieve and initialize an existing cart from session or create a new one.
-        Cart is saved in session as a dict.
+        Retrieve an existing cart hash or restore it from the last persisted copy.
+        The `field` is the artwork.id; the `value` is the quantity.
         """
-        cart = self.session.get(settings.CART_SESSION_ID)
-        if not cart:
-            cart = self.session[settings.CART_SESSION_ID] = {}
-            
-        self.cart = cart
+        if not self.redis.exists(self.key):
+            self.load()
 
-    # Alternative to this is assigning SESSION_SAVE_EVERY_REQUEST=True in the `settings` file
-    def save(self):
-        self.session.modified = True
+    # Restores a cart hash from `CartItem` rows without overwriting concurrent updates
+    def load(self):
+        cart_items = CartItem.objects.filter(user_id=self.user_id).values_list("artwork_id", "quantity")
+        pipeline = self.redis.pipeline()
+        pipeline.hsetnx(self.key, CART_LOADED_FIELD, 1)
+        for artwork_id, quantity in cart_items:
+            pipeline.hsetnx(self.key, str(artwork_id), quantity)
+        pipeline.expire(self.key, settings.CART_CACHE_TIMEOUT)
+        pipeline.execute()
 
-    # Increments value of artwork `quantity` in cart or override `quantity` value of existing artwork dict
+    # Refreshes the cart's TTL and marks it for persistence
+    def save(self, pipeline):
+        pipeline.expire(self.key, settings.CART_CACHE_TIMEOUT)
+        pipeline.sadd(CART_DIRTY_SET, self.user_id)
+        pipeline.execute()
+
+    # Increments value of artwork `quantity` in cart or override `quantity` value of existing artwork
     def add(self, artwork, quantity=1, override=False):
-        """
-        Retrieve an existing nested artwork dict from the cart or create a new one.
-        The `key` is the artwork.id; the `value` is a dict of the artwork.price and quantity(defaults to 0).
-        """
         artwork_id = str(artwork.id)
-        if artwork_id not in self.cart:
-            self.cart[artwork_id] = {"price": str(artwork.price), "quantity": 0}
+        pipeline = self.redis.pipeline()
         if not override:
-            self.cart[artwork_id]["quantity"] += quantity
-        else: 
-            self.cart[artwork_id]["quantity"] = quantity
-            
-        self.save()
+            pipeline.hincrby(self.key, artwork_id, quantity)
+        else:
+            pipeline.hset(self.key, artwork_id, quantity)
+
+        self.save(pipeline)
 
     # Removes artwork from cart
     def remove(self, artwork):
-        artwork_id = str(artwork.id)
-        if artwork_id in self.cart:
-            del self.cart[artwork_id]
-            self.save()
+        pipeline = self.redis.pipeline()
+        pipeline.hdel(self.key, str(artwork.id))
+        self.save(pipeline)
 
-    # Removes cart from session
+    # Empties the cart, keeping the hash so the persisted copy isn't restored
     def clear(self):
-        del self.session[settings.CART_SESSION_ID]
-        self.save()
+        pipeline = self.redis.pipeline()
+        pipeline.delete(self.key)
+        pipeline.hset(self.key, CART_LOADED_FIELD, 1)
+        self.save(pipeline)
 
-    # Handles the `iter` attribute of cart
-    def __iter__(self):
-        # Create a copy of existing cart for every iteration
-        cart = self.cart.copy()
+    # Returns a dict of `{artwork_id: quantity}` for all items in cart
+    def get_quantities(self):
+        return {
+            field.decode(): int(value)
+            for field, value in self.redis.hgetall(self.key).items()
+            if field.decode() != CART_LOADED_FIELD
+        }
+
+    def get_items(self):
+        """
+        Builds the cart items from compact artwork snapshots, along with the cart's total price.
+        Line and grand totals are calculated with `Decimal` in a single pass.
+        """
+        quantities = self.get_quantities()
+        snapshots = get_artwork_snapshots(quantities.keys())
 
-        # Retrieves all `keys` in cart and adds serialized artwork data for each key
-        artwork_ids = self.cart.keys()
-        artworks = Artwork.objects.filter(id__in=artwork_ids)
-        for artwork in artworks:
-            artwork_data = ArtworkSerializer(artwork).data  # `artwork` on its own is not JSON-serializable
-            cart[str(artwork.id)]["artwork"] = artwork_data
+        items, total_price = [], Decimal("0")
+        for artwork_id, quantity in quantities.items():
+            snapshot = snapshots.get(artwork_id)
+            if snapshot is None:  # Artwork has been deleted
+                continue
 
-        # Calculates and sets a total price for each items in cart
-        for item in cart.values():
-            item["total_price"] = str(item["price"] * item["quantity"])  # Decimal() is not JSON-serializable ***
-            yield item
+            price = Decimal(snapshot["price"] or "0")
+            item_total_price = price * quantity
+            total_price += item_total_price
+            items.append({
+                "price": str(price),
+                "quantity": quantity,
+                "artwork": snapshot,
+                "total_price": str(item_total_price),  # Decimal() is not JSON-serializable
+            })
+
+        return items, total_price
+
+    # Handles the `iter` attribute of cart
+    def __iter__(self):
+        items, _ = self.get_items()
+        return iter(items)
 
     # Calculates the total number of individual items in cart
     def __len__(self):
-        return sum(item["quantity"] for item in self.cart.values())
+        return sum(self.get_quantities().values())
 
     # Calculates the total price of all cart items
     def get_total_price(self):
-        return sum(Decimal(item["total_price"]) for item in self.cart.values())
+        _, total_price = self.get_items()
+        return total_price
@@ -0,0 +1,102 @@
+"""
+Dominant colour extraction and the colour buckets used to search artworks by colour.
+
+Dominant colours are found with a small k-means over a downsampled copy of the image, vectorized with NumPy.
+Each colour is indexed under a bucket of a `BUCKET_LEVELS`³ grid of the RGB cube (see `ArtworkColor`),
+and a searched colour matches the buckets of the grid cell nearest to it on every channel.
+"""
+
+from itertools import product
+import numpy as np
+import re
+
+
+SAMPLE_SIZE = 64  # Images are downsampled to fit this many pixels per side before clustering
+COLOR_COUNT = 5
+MIN_COLOR_SHARE = 0.05  # Colours covering less of the image are left out of its signature
+KMEANS_ITERATIONS = 10
+MERGE_DISTANCE = 24  # Cluster centres closer than this (in RGB units) are reported as one colour
+
+BUCKET_LEVELS = 8
+BUCKET_WIDTH = 256 // BUCKET_LEVELS
+
+HEX_COLOR_PATTERN = re.compile(r"^#?([0-9a-fA-F]{6})$")
+
+
+def extract_dominant_colors(image):
+    """
+    Retrieves an image's dominant colours as a list of `#rrggbb` strings, from the most to the least common.
+    Transparent pixels are ignored.
+    """
+    sample = image.convert("RGBA")
+    sample.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE))
+    pixels = np.asarray(sample).reshape(-1, 4)
+    pixels = pixels[pixels[:, 3] >= 128, :3].astype(np.float32)
+    if not len(pixels):
+        return []
+
+    # Initial centres are spread across the pixels sorted by brightness, so results are deterministic
+    count = min(COLOR_COUNT, len(np.unique(pixels, axis=0)))
+    by_brightness = pixels[np.argsort(pixels.sum(axis=1), kind="stable")]
+    centers = by_brightness[((np.arange(count) + 0.5) * len(pixels) / count).astype(int)]
+
+    for _ in range(KMEANS_ITERATIONS):
+        distances = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        labels = distances.argmin(axis=1)
+        sizes = np.bincount(labels, minlength=count)
+        sums = np.stack(
+            [np.bincount(labels, weights=pixels[:, channel], minlength=count) for channel in range(3)], axis=1
+        )
+        new_centers = np.where(sizes[:, None] > 0, sums / np.maximum(sizes, 1)[:, None], centers).astype(np.float32)
+        if np.allclose(new_centers, centers, atol=0.5):
+            break
+        centers = new_centers
+
+    # Clusters splitting a single colour (e.g. a flat image with a few resampled edge pixels) are merged
+    kept_centers, kept_shares = [], []
+    for i in np.argsort(-sizes, kind="stable"):
+        distances = [np.linalg.norm(centers[i] - center) for center in kept_centers]
+        if distances and min(distances) < MERGE_DISTANCE:
+            kept_shares[int(np.argmin(distances))] += sizes[i] / len(pixels)
+        else:
+            kept_centers.append(centers[i])
+            kept_shares.append(sizes[i] / len(pixels))
+
+    return [
+        "#{:02x}{:02x}{:02x}".format(*np.rint(center).astype(int))
+        for center, share in sorted(zip(kept_centers, kept_shares), key=lambda item: -item[1])
+        if share >= MIN_COLOR_SHARE
+    ]
+
+
+def parse_hex_color(value):
+    # Returns the `(r, g, b)` of a `#rrggbb`/`rrggbb` string, or None if it isn't one
+    match = HEX_COLOR_PATTERN.match(value.strip())
+    if match:
+        return tuple(bytes.fromhex(match.group(1)))
+
+
+def get_color_bucket(rgb, levels=BUCKET_LEVELS):
+    # Bucket of a colour in a grid of `levels`³ cells, the search grid by default
+    r, g, b = (channel // (256 // levels) for channel in rgb)
+    return (r * levels + g) * levels + b
+
+
+def get_color_buckets(hex_colors):
+    # Buckets of a list of `#rrggbb` colours, as stored for an artwork's dominant colours
+    return sorted({get_color_bucket(parse_hex_color(hex_color)) for hex_color in hex_colors})
+
+
+def get_search_buckets(hex_color):
+    """
+    Retrieves the buckets searched for a colour: on each channel, its own level and the adjacent level
+    nearest to it, so colours just across a bucket boundary still match.
+    """
+    levels = []
+    for channel in parse_hex_color(hex_color):
+        level = channel // BUCKET_WIDTH
+        adjacent = level - 1 if channel % BUCKET_WIDTH < BUCKET_WIDTH / 2 else level + 1
+        levels.append({level, min(max(adjacent, 0), BUCKET_LEVELS - 1)})
+    return sorted(
+        (r * BUCKET_LEVELS + g) * BUCKET_LEVELS + b for r, g, b in product(*levels)
+    )
@@ -0,0 +1,125 @@
+"""
+Near-duplicate detection of artwork images with a 64-bit difference hash (dHash).
+
+Hashes are split into `SEGMENT_COUNT` 16-bit segments, each stored in an indexed column of `ArtworkImageHash`.
+Two hashes within `ARTWORK_DUPLICATE_MAX_DISTANCE` bits of each other have at least one segment within
+`ARTWORK_DUPLICATE_MAX_DISTANCE // SEGMENT_COUNT` bits (pigeonhole), so candidates are found with index lookups
+of those segment variants, and only the candidates' full hashes are compared.
+"""
+
+from django.db.models import Q
+from django.conf import settings
+
+from .models import ArtworkImageHash
+
+from PIL import Image
+from itertools import combinations
+import numpy as np
+
+
+HASH_WIDTH, HASH_HEIGHT = 8, 8
+SEGMENT_COUNT = 4
+SEGMENT_BITS = HASH_WIDTH * HASH_HEIGHT // SEGMENT_COUNT
+SEGMENT_MASK = (1 << SEGMENT_BITS) - 1
+# Hashes with fewer set (or unset) bits come from flat images or plain gradients, which all look alike to a dHash
+MIN_HASH_DETAIL = 8
+
+
+def compute_image_hash(image_file):
+    """
+    Computes the difference hash of an uploaded image: whether each pixel of a 9x8 grayscale thumbnail
+    is brighter than its right neighbour, as an unsigned 64-bit integer.
+    The file is rewound, so it can still be saved afterwards.
+    """
+    image_file.seek(0)
+    with Image.open(image_file) as image:
+        image.draft("L", (HASH_WIDTH * 8, HASH_HEIGHT * 8))  # JPEGs are downscaled while decoding
+        pixels = np.asarray(
+            image.convert("L").resize((HASH_WIDTH + 1, HASH_HEIGHT), Image.LANCZOS), dtype=np.int16
+        )
+    image_file.seek(0)
+
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def is_distinctive(image_hash):
+    # Only distinctive hashes are stored and compared
+    return MIN_HASH_DETAIL <= image_hash.bit_count() <= HASH_WIDTH * HASH_HEIGHT - MIN_HASH_DETAIL
+
+
+def get_segments(image_hash):
+    return [(image_hash >> (SEGMENT_BITS * i)) & SEGMENT_MASK for i in range(SEGMENT_COUNT)]
+
+
+def to_signed(image_hash):
+    # Hashes are stored in a signed 64-bit column
+    return image_hash - (1 << 64) if image_hash >= 1 << 63 else image_hash
+
+
+def to_unsigned(value):
+    return value & ((1 << 64) - 1)
+
+
+def get_segment_variants(segment, radius):
+    # Every value within `radius` bits of a segment
+    variants = [segment]
+    for distance in range(1, radius + 1):
+        for positions in combinations(range(SEGMENT_BITS), distance):
+            variant = segment
+            for position in positions:
+                variant ^= 1 << position
+            variants.append(variant)
+    return variants
+
+
+def build_image_hash(artwork, image_hash):
+    # Unsaved `ArtworkImageHash` row of an artwork
+    segments = get_segments(image_hash)
+    return ArtworkImageHash(
+        artwork=artwork, value=to_signed(image_hash), **{f"segment_{i}": segments[i] for i in range(SEGMENT_COUNT)}
+    )
+
+
+def find_near_duplicates(image_hashes):
+    """
+    Looks up the stored images within `ARTWORK_DUPLICATE_MAX_DISTANCE` bits of each of a list of hashes,
+    with one query over the segment indexes. Returns a dict of `{position: artwork_name}` for the hashes
+    that have a near-duplicate, naming the closest one.
+    """
+    if not image_hashes:
+        return {}
+
+    max_distance = settings.ARTWORK_DUPLICATE_MAX_DISTANCE
+    radius = max_distance // SEGMENT_COUNT
+    probes = [set() for _ in range(SEGMENT_COUNT)]
+    for image_hash in image_hashes:
+        for i, segment in enumerate(get_segments(image_hash)):
+            probes[i].update(get_segment_variants(segment, radius))
+
+    candidate_filter = Q()
+    for i, values in enumerate(probes):
+        candidate_filter |= Q(**{f"segment_{i}__in": values})
+    candidates = [
+        (to_unsigned(value), name)
+        for value, name in ArtworkImageHash.objects.filter(candidate_filter).values_list("value", "artwork__name")
+    ]
+
+    duplicates = {}
+    for position, image_hash in enumerate(image_hashes):
+        matches = [
+            ((image_hash ^ value).bit_count(), name) for value, name in candidates
+            if (image_hash ^ value).bit_count() <= max_distance
+        ]
+        if matches:
+            duplicates[position] = min(matches)[1]
+    return duplicates
+
+
+def find_duplicates_within(image_hashes):
+    # Positions of the hashes within `ARTWORK_DUPLICATE_MAX_DISTANCE` bits of an earlier hash of the same list
+    max_distance = settings.ARTWORK_DUPLICATE_MAX_DISTANCE
+    return [
+        position for position, image_hash in enumerate(image_hashes)
+        if any((image_hash ^ earlier).bit_count() <= max_distance for earlier in image_hashes[:position])
+    ]
@@ -0,0 +1,123 @@
+"""
+Streaming export of the artwork catalog as NDJSON or CSV.
+
+Artworks are read with a server-side cursor (`.iterator(chunk_size=...)`) in `(updated, id)` order, with the
+artist's username joined in the same query and the genre names of each chunk read with one more query.
+Rows are encoded a chunk at a time, so memory stays constant whatever the size of the catalog.
+"""
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.conf import settings
+
+from .models import Artwork, ArtworkGenre
+
+from asgiref.sync import sync_to_async
+from collections import defaultdict
+from itertools import islice
+import csv
+import json
+
+
+EXPORT_FIELDS = [
+    "id",
+    "name",
+    "slug",
+    "description",
+    "artist",
+    "genres",
+    "price",
+    "width",
+    "height",
+    "image",
+    "image_status",
+    "dominant_colors",
+    "is_available",
+    "created",
+    "updated",
+]
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def iterate_export_chunks(updated_since=None):
+    """
+    Yields the artworks as lists of `EXPORT_FIELDS` dicts, one list per chunk, in `(updated, id)` order.
+    With `updated_since`, only artworks updated at or after it are included.
+    """
+    queryset = Artwork.objects.order_by("updated", "id").values(
+        *[field for field in EXPORT_FIELDS if field not in ("artist", "genres")], "artist__user__username"
+    )
+    if updated_since is not None:
+        queryset = queryset.filter(updated__gte=updated_since)
+
+    chunk_size = settings.ARTWORK_EXPORT_CHUNK_SIZE
+    storage = Artwork._meta.get_field("image").storage
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        genres = defaultdict(list)
+        for artwork_id, genre_name in ArtworkGenre.objects.filter(
+            artwork_id__in=[row["id"] for row in chunk]
+        ).order_by("genre__name").values_list("artwork_id", "genre__name"):
+            genres[artwork_id].append(genre_name)
+
+        for row in chunk:
+            row["artist"] = row.pop("artist__user__username")
+            row["genres"] = genres[row["id"]]
+            row["image"] = storage.url(row["image"]) if row["image"] else None
+        yield [{field: row[field] for field in EXPORT_FIELDS} for row in chunk]
+
+
+def encode_ndjson(rows):
+    return "".join(json.dumps(row, cls=DjangoJSONEncoder) + "\n" for row in rows)
+
+
+class Echo:
+    # Write-only file object handing each line written by `csv.writer` back to the caller
+    def write(self, value):
+        return value
+
+
+def encode_csv(rows):
+    # Genres and dominant colours are joined with `|`; ids, prices and dates are formatted as in the NDJSON export
+    writer = csv.writer(Echo())
+    encoder = DjangoJSONEncoder()
+    lines = []
+    for row in rows:
+        row["genres"] = "|".join(row["genres"])
+        row["dominant_colors"] = "|".join(row["dominant_colors"])
+        lines.append(
+            writer.writerow(
+                [
+                    value if value is None or isinstance(value, (str, int, float, bool)) else encoder.default(value)
+                    for value in row.values()
+                ]
+            )
+        )
+    return "".join(lines)
+
+
+ENCODERS = {"ndjson": encode_ndjson, "csv": encode_csv}
+
+
+def export_artworks(export_format, updated_since=None):
+    # Yields the encoded catalog export, starting with the CSV header row, then one string per chunk of artworks
+    if export_format == "csv":
+        yield csv.writer(Echo()).writerow(EXPORT_FIELDS)
+    for chunk in iterate_export_chunks(updated_since):
+        yield ENCODERS[export_format](chunk)
+
+
+async def aexport_artworks(export_format, updated_since=None):
+    """
+    Asynchronous version of `export_artworks`, for `StreamingHttpResponse` under ASGI, which would otherwise
+    read a synchronous iterator into a list before sending any of it.
+    Each chunk is queried and encoded through `sync_to_async`, so only one chunk is held in memory at a time.
+    """
+    chunks = export_artworks(export_format, updated_since)
+    # Not `database_sync_to_async`, which would close the connection (and its cursor) between chunks
+    next_chunk = sync_to_async(next)
+    try:
+        while (chunk := await next_chunk(chunks, None)) is not None:
+            yield chunk
+    finally:
+        # Closes the database cursor in its own thread when the client disconnects early
+        await sync_to_async(chunks.close)()
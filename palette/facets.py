@@ -0,0 +1,129 @@
+from django.db.models import F, Count, Q, Value
+from django.db.models.functions import Greatest
+from django.db.transaction import on_commit
+
+from .models import Genre, Artwork, ArtworkGenre
+from .utils import bump_list_generation
+from portal.redis_client import get_redis_connection
+
+from collections import Counter, defaultdict
+
+
+GENRE_COUNTS_KEY = "genre_artwork_counts"  # Redis mirror of the genre count columns
+
+
+def get_total_field(genre_id):
+    return f"{genre_id}:total"
+
+
+def get_available_field(genre_id):
+    return f"{genre_id}:available"
+
+
+def update_genre_counts(count_deltas):
+    """
+    Applies a dict of `{genre_id: (total_delta, available_delta)}` to the genre count columns.
+    Genres sharing the same deltas are updated in one statement. The redis mirror is refreshed
+    and the genre list pages are invalidated once the transaction commits.
+    """
+    genre_ids_by_delta = defaultdict(list)
+    for genre_id, deltas in count_deltas.items():
+        if deltas != (0, 0):
+            genre_ids_by_delta[deltas].append(genre_id)
+    if not genre_ids_by_delta:
+        return
+
+    for (total_delta, available_delta), genre_ids in genre_ids_by_delta.items():
+        # Clamped at zero, as links written before the counts existed are only counted by `reconcile_genre_counts`
+        Genre.objects.filter(id__in=genre_ids).update(
+            artwork_count=Greatest(F("artwork_count") + total_delta, Value(0)),
+            available_artwork_count=Greatest(F("available_artwork_count") + available_delta, Value(0)),
+        )
+
+    def mirror_genre_counts():
+        # The committed counts are copied rather than incremented, so a mirror lost in a redis flush heals itself
+        genre_ids = [genre_id for genre_ids in genre_ids_by_delta.values() for genre_id in genre_ids]
+        counts = {}
+        for genre_id, artwork_count, available_artwork_count in Genre.objects.filter(id__in=genre_ids).values_list(
+            "id", "artwork_count", "available_artwork_count"
+        ):
+            counts[get_total_field(genre_id)] = artwork_count
+            counts[get_available_field(genre_id)] = available_artwork_count
+        if counts:
+            get_redis_connection().hset(GENRE_COUNTS_KEY, mapping=counts)
+        bump_list_generation("genre")
+
+    on_commit(mirror_genre_counts)
+
+
+def record_genre_links(links, sign=1):
+    """
+    Counts a list of added (`sign=1`) or removed (`sign=-1`) `(artwork_id, genre_id)` links.
+    The availability of the linked artworks is read in one query.
+    """
+    if not links:
+        return
+
+    available_ids = set(
+        Artwork.available.filter(id__in={artwork_id for artwork_id, _ in links}).values_list("id", flat=True)
+    )
+    totals, availables = Counter(), Counter()
+    for artwork_id, genre_id in links:
+        totals[genre_id] += sign
+        availables[genre_id] += sign if artwork_id in available_ids else 0
+
+    update_genre_counts({genre_id: (totals[genre_id], availables[genre_id]) for genre_id in totals})
+
+
+def record_availability_change(artwork_id, is_available):
+    # Moves an artwork in/out of the available count of each of its genres
+    genre_ids = ArtworkGenre.objects.filter(artwork_id=artwork_id).values_list("genre_id", flat=True)
+    update_genre_counts({genre_id: (0, 1 if is_available else -1) for genre_id in genre_ids})
+
+
+def get_genre_counts(genre_ids):
+    """
+    Retrieves a dict of `{genre_id: (artwork_count, available_artwork_count)}` from the redis mirror in one call.
+    Genres missing from the mirror (e.g. after a redis flush) are left out.
+    """
+    genre_ids = list(genre_ids)
+    fields = [field for genre_id in genre_ids for field in (get_total_field(genre_id), get_available_field(genre_id))]
+    if not fields:
+        return {}
+
+    values = get_redis_connection().hmget(GENRE_COUNTS_KEY, fields)
+    return {
+        genre_id: (int(values[i * 2]), int(values[i * 2 + 1]))
+        for i, genre_id in enumerate(genre_ids)
+        if None not in (values[i * 2], values[i * 2 + 1])
+    }
+
+
+def reconcile_genre_counts():
+    """
+    Recomputes every genre's counts from the `artwork_genre` table, fixing rows that drifted,
+    and rewrites the redis mirror. Returns the number of corrected genres.
+    """
+    genres = Genre.objects.annotate(
+        total=Count("artworks"),
+        available=Count("artworks", filter=Q(artworks__is_available=True)),
+    ).values_list("id", "artwork_count", "available_artwork_count", "total", "available")
+
+    drifted_genres = []
+    counts = {}
+    for genre_id, artwork_count, available_artwork_count, total, available in genres:
+        counts[get_total_field(genre_id)] = total
+        counts[get_available_field(genre_id)] = available
+        if (artwork_count, available_artwork_count) != (total, available):
+            drifted_genres.append(Genre(id=genre_id, artwork_count=total, available_artwork_count=available))
+
+    Genre.objects.bulk_update(drifted_genres, ["artwork_count", "available_artwork_count"], batch_size=500)
+    pipeline = get_redis_connection().pipeline()
+    pipeline.delete(GENRE_COUNTS_KEY)
+    if counts:
+        pipeline.hset(GENRE_COUNTS_KEY, mapping=counts)
+    pipeline.execute()
+
+    if drifted_genres:
+        bump_list_generation("genre")
+    return len(drifted_genres)
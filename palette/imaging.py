@@ -0,0 +1,80 @@
+from django.core.files.base import ContentFile
+from django.conf import settings
+
+from .colors import extract_dominant_colors
+
+from PIL import Image
+from io import BytesIO
+import os
+
+
+# Modes `Image.reduce` supports; other images are converted at full size first
+REDUCIBLE_MODES = {"L", "LA", "RGB", "RGBA", "CMYK", "I", "F"}
+
+
+def is_image_too_large(image_file):
+    """
+    Whether an uploaded image has more pixels than `ARTWORK_IMAGE_MAX_PIXELS`.
+    Only the header is read, so oversized images are rejected without being decoded.
+    """
+    image_file.seek(0)
+    with Image.open(image_file) as image:
+        width, height = image.size
+    image_file.seek(0)
+    return width * height > settings.ARTWORK_IMAGE_MAX_PIXELS
+
+
+def process_image(image_file, image_name, storage):
+    """
+    Reads an uploaded image once to get its metadata, and saves its WebP variants to `storage`.
+    Returns a dict of artwork field values: width, height, file_size, image_variants (`{width: name}`)
+    and dominant_colors.
+    
+    Variants are produced from the largest width down, resizing a single working copy in place,
+    JPEG uploads are downscaled while decoding, and other formats are reduced by an integer factor before
+    being converted, so the full-size image is never copied. Images with more than `ARTWORK_IMAGE_MAX_PIXELS`
+    pixels are refused before decoding.
+    """
+    file_size = image_file.size
+    image_file.seek(0)
+    with Image.open(image_file) as image:
+        width, height = image.size  # Read from the header, before any decoding
+        if width * height > settings.ARTWORK_IMAGE_MAX_PIXELS:
+            raise ValueError(f"Image is too large to process: {width}x{height} pixels.")
+        variant_widths = sorted(
+            (variant_width for variant_width in settings.ARTWORK_IMAGE_VARIANT_WIDTHS if variant_width < width),
+            reverse=True,
+        )
+        
+        image_variants = {}
+        if variant_widths:
+            image.draft("RGB", (variant_widths[0], max(1, height * variant_widths[0] // width)))  # JPEG only
+            mode = "RGBA" if image.has_transparency_data else "RGB"
+            reducing_factor = image.width // variant_widths[0]
+            if reducing_factor > 1 and image.mode in REDUCIBLE_MODES:
+                with image.reduce(reducing_factor) as reduced_image:
+                    working_image = reduced_image.convert(mode)
+            else:
+                working_image = image.convert(mode)
+            stem = os.path.splitext(os.path.basename(image_name))[0]
+            
+            for variant_width in variant_widths:
+                working_image.thumbnail((variant_width, height), Image.LANCZOS, reducing_gap=2.0)
+                buffer = BytesIO()
+                working_image.save(buffer, "WEBP", quality=settings.ARTWORK_IMAGE_VARIANT_QUALITY, method=4)
+                image_variants[str(variant_width)] = storage.save(
+                    f"images/variants/{stem}_{variant_width}w.webp", ContentFile(buffer.getvalue())
+                )
+            # Colours are sampled from the smallest variant rather than decoding the image again
+            dominant_colors = extract_dominant_colors(working_image)
+            working_image.close()
+        else:
+            dominant_colors = extract_dominant_colors(image)
+
+    return {
+        "width": width,
+        "height": height,
+        "file_size": file_size,
+        "image_variants": image_variants,
+        "dominant_colors": dominant_colors,
+    }
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from palette.models import Artwork
+from palette.colors import extract_dominant_colors
+from palette.tasks import index_artwork_colors, update_artwork_batch_cache_details
+
+from PIL import Image
+from collections import defaultdict
+
+
+class Command(BaseCommand):
+    help = (
+        "Extracts and indexes the dominant colours of artworks whose images were processed before colours were. "
+        "The smallest WebP variant is read when there is one, rather than the original image."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200, help="Number of artworks loaded per query.")
+
+    def handle(self, *args, **options):
+        artworks = Artwork.objects.filter(
+            dominant_colors=[], image_status=Artwork.ImageStatus.READY
+        ).exclude(image="").only("id", "artist", "image", "image_variants", "dominant_colors")
+
+        indexed_ids = defaultdict(list)
+        failed = 0
+        for artwork in artworks.iterator(chunk_size=options["batch_size"]):
+            storage = artwork.image.storage
+            variants = artwork.image_variants
+            name = variants[min(variants, key=int)] if variants else artwork.image.name
+            try:
+                with storage.open(name, "rb") as image_file, Image.open(image_file) as image:
+                    artwork.dominant_colors = extract_dominant_colors(image)
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"{artwork.id}: {exc}")
+                continue
+
+            artwork.save(update_fields=["dominant_colors", "updated"])
+            index_artwork_colors(artwork)
+            indexed_ids[artwork.artist_id].append(str(artwork.id))
+
+        # Cached copies are dropped once per artist rather than once per artwork
+        for artist_id, artwork_ids in indexed_ids.items():
+            update_artwork_batch_cache_details(artist_id, artwork_ids)
+        indexed = sum(len(artwork_ids) for artwork_ids in indexed_ids.values())
+        self.stdout.write(f"Indexed {indexed} artworks; {failed} failed.")
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from palette.models import Artwork, ArtworkImageHash
+from palette.duplicates import compute_image_hash, is_distinctive, build_image_hash
+
+
+class Command(BaseCommand):
+    help = (
+        "Stores the image hashes of artworks uploaded before near-duplicate detection, so later uploads are "
+        "checked against them. The smallest WebP variant is read when there is one, rather than the original image."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200, help="Number of hashes written per statement.")
+
+    def handle(self, *args, **options):
+        artworks = Artwork.objects.filter(
+            image_hash__isnull=True, image_status=Artwork.ImageStatus.READY
+        ).exclude(image="").only("id", "name", "image", "image_variants")
+
+        image_hashes = []
+        stored = failed = 0
+        for artwork in artworks.iterator(chunk_size=options["batch_size"]):
+            variants = artwork.image_variants
+            name = variants[min(variants, key=int)] if variants else artwork.image.name
+            try:
+                with artwork.image.storage.open(name, "rb") as image_file:
+                    image_hash = compute_image_hash(image_file)
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"{artwork.id}: {exc}")
+                continue
+
+            if is_distinctive(image_hash):
+                image_hashes.append(build_image_hash(artwork, image_hash))
+            if len(image_hashes) >= options["batch_size"]:
+                stored += len(ArtworkImageHash.objects.bulk_create(image_hashes))
+                image_hashes = []
+        stored += len(ArtworkImageHash.objects.bulk_create(image_hashes))
+
+        self.stdout.write(f"Stored {stored} image hashes; {failed} failed.")
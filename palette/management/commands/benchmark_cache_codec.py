@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from palette.models import Genre, Artwork
+from portal.codec import dumps, loads
+
+from timeit import timeit
+import pickle
+
+
+class Command(BaseCommand):
+    help = "Compares the size and encode/decode time of cached genres/artworks with pickle and the cache codec."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=100, help="Number of objects of each type to encode.")
+        parser.add_argument("--rounds", type=int, default=100, help="Number of times each object is encoded/decoded.")
+
+    def handle(self, *args, **options):
+        count, rounds = options["count"], options["rounds"]
+        samples = {
+            "genre": list(Genre.objects.all()[:count]),
+            "artwork": list(Artwork.objects.for_listing()[:count]),
+        }
+        codecs = {"pickle": (pickle.dumps, pickle.loads), "codec": (dumps, loads)}
+
+        self.stdout.write(f"{'type':<10}{'codec':<10}{'avg bytes':>12}{'encode us':>12}{'decode us':>12}")
+        for object_type, objects in samples.items():
+            if not objects:
+                self.stdout.write(f"{object_type:<10}no objects to encode")
+                continue
+
+            for codec_name, (encode, decode) in codecs.items():
+                payloads = [encode(obj) for obj in objects]
+                average_size = sum(len(payload) for payload in payloads) / len(payloads)
+                encode_time = timeit(lambda: [encode(obj) for obj in objects], number=rounds)
+                decode_time = timeit(lambda: [decode(payload) for payload in payloads], number=rounds)
+                per_object = 1_000_000 / (rounds * len(objects))
+                self.stdout.write(
+                    f"{object_type:<10}{codec_name:<10}{average_size:>12.0f}"
+                    f"{encode_time * per_object:>12.1f}{decode_time * per_object:>12.1f}"
+                )
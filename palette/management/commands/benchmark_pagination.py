@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db.transaction import atomic, set_rollback
+from django.test import RequestFactory
+
+from palette.models import Artwork
+from palette.views import PalettePagination
+from user.models import Artist
+
+from rest_framework.request import Request
+from rest_framework.pagination import Cursor
+from time import perf_counter
+from uuid import uuid4
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the latency of a middle and a deep artwork list page with keyset and offset pagination as the "
+        "table grows. Synthetic artworks are inserted in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="Table sizes to measure at."
+        )
+        parser.add_argument("--rounds", type=int, default=20, help="Number of times each page is fetched.")
+
+    def handle(self, *args, **options):
+        page_size = PalettePagination.page_size
+        self.stdout.write(f"{'rows':>10}{'page':>8}{'keyset ms':>12}{'offset ms':>12}")
+        with atomic():
+            user = get_user_model().objects.create_user(
+                email=f"{uuid4().hex}@benchmark.local", username=uuid4().hex[:20], password=uuid4().hex
+            )
+            artist = Artist.objects.create(user=user)
+            row_count = Artwork.objects.count()
+            for size in sorted(options["sizes"]):
+                if size > row_count:
+                    Artwork.objects.bulk_create(
+                        [Artwork(name=uuid4().hex, artist=artist) for _ in range(size - row_count)],
+                        batch_size=1000,
+                    )
+                    row_count = size
+
+                # A page in the middle of the list, and the page before the last, as reached by following
+                # `next` links from the first page. Near the end, few rows are left to filter whatever the plan,
+                # so the middle page is the one that shows whether the cursor bounds the index scan.
+                depths = {"middle": row_count // 2, "deep": max(row_count - page_size * 2, 0)}
+                for label, depth in depths.items():
+                    keyset_time = self.time_keyset_page(depth, options["rounds"])
+                    offset_time = self.time_offset_page(depth, page_size, options["rounds"])
+                    self.stdout.write(f"{row_count:>10}{label:>8}{keyset_time:>12.2f}{offset_time:>12.2f}")
+            set_rollback(True)
+
+    def time_keyset_page(self, depth, rounds):
+        paginator = PalettePagination()
+        paginator.base_url = "/"
+        last_row = Artwork.objects.order_by(*paginator.ordering)[depth]
+        cursor = paginator.encode_cursor(Cursor(offset=0, reverse=False, position=paginator.get_position(last_row)))
+        request = Request(RequestFactory().get(cursor))
+
+        start = perf_counter()
+        for _ in range(rounds):
+            PalettePagination().paginate_queryset(Artwork.objects.for_listing(), request)
+        return (perf_counter() - start) * 1000 / rounds
+
+    def time_offset_page(self, depth, page_size, rounds):
+        start = perf_counter()
+        for _ in range(rounds):
+            list(Artwork.objects.for_listing().order_by("-created", "-id")[depth + 1 : depth + 1 + page_size])
+        return (perf_counter() - start) * 1000 / rounds
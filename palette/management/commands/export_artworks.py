@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_datetime
+
+from palette.export import CONTENT_TYPES, export_artworks
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes the artwork catalog as NDJSON or CSV to a file or stdout, a chunk of artworks at a time. "
+        "With --updated-since, only artworks updated at or after the given ISO 8601 time are written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", dest="export_format", choices=list(CONTENT_TYPES), default="ndjson")
+        parser.add_argument("--updated-since", type=parse_datetime, help="ISO 8601 date and time.")
+        parser.add_argument("--output", help="Path of the file written. Defaults to stdout.")
+
+    def handle(self, *args, **options):
+        lines = export_artworks(options["export_format"], options["updated_since"])
+        if options["output"] is None:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+
+        with open(options["output"], "w", newline="", encoding="utf-8") as output:
+            output.writelines(lines)
+        self.stderr.write(f"Exported the artwork catalog to {options['output']}.")
@@ -8,24 +8,78 @@ from django.db.models import (
     ImageField,
     TextField,
     PositiveIntegerField,
+    BigIntegerField,
     URLField,
     DecimalField,
+    PositiveSmallIntegerField,
     BooleanField,
     ManyToManyField,
     ForeignKey,
+    OneToOneField,
     CASCADE,
+    UniqueConstraint,
+    TextChoices,
+    JSONField,
+    Q,
 )
 from django.db.models.manager import Manager
+from django.db.models.query import QuerySet
 from django.conf import settings
 
 from user.models import Artist
+from .colors import get_search_buckets
 
 from uuid import uuid4
-from cloudinary.uploader import destroy
+
+
+class ArtworkQuerySet(QuerySet):
+    # Loads the artist's user, popularity counts and genres alongside each artwork for serializing lists
+    def for_listing(self):
+        return self.select_related("artist__user", "stats").prefetch_related("genre")
+
+    def filter_catalog(self, filters):
+        """
+        Applies validated catalog filters (see `ArtworkFilterSerializer`); the ordering is applied by the paginator.
+        Genre slugs and colours are matched through the `artwork_genre`/`artwork_color` tables with subqueries,
+        so no `distinct()` is needed.
+        """
+        lookups = {
+            "artist": "artist_id",
+            "is_available": "is_available",
+            "min_price": "price__gte",
+            "max_price": "price__lte",
+            "min_width": "width__gte",
+            "max_width": "width__lte",
+            "min_height": "height__gte",
+            "max_height": "height__lte",
+        }
+        queryset = self.filter(
+            **{lookups[key]: value for key, value in filters.items() if key in lookups}
+        )
+        # Artworks without a price can't be placed in a price ordering, so they are left out of it
+        if filters.get("ordering", "").lstrip("-") == "price":
+            queryset = queryset.filter(price__isnull=False)
+        if filters.get("genre"):
+            artwork_ids = ArtworkGenre.objects.filter(
+                genre__slug__in=filters["genre"]
+            ).values("artwork_id")
+            queryset = queryset.filter(id__in=artwork_ids)
+        # Colours are matched through the `(bucket, artwork)` index of `artwork_color`
+        if filters.get("color"):
+            artwork_ids = ArtworkColor.objects.filter(
+                bucket__in=get_search_buckets(filters["color"])
+            ).values("artwork_id")
+            queryset = queryset.filter(id__in=artwork_ids)
+
+        return queryset
+
+
+class ArtworkManager(Manager.from_queryset(ArtworkQuerySet)):
+    pass
 
 
 # Custom manager class for operating on available artworks
-class AvailableManager(Manager):
+class AvailableManager(ArtworkManager):
     def get_queryset(self):
         return super().get_queryset().filter(is_available=True)
 
@@ -34,33 +88,51 @@ class Genre(Model):
     id = UUIDField(primary_key=True, editable=False, default=uuid4)
     name = CharField(max_length=250, unique=True)
     slug = SlugField(max_length=250, blank=True)
+    # Denormalized counts of linked artworks, kept up to date by `palette.facets`
+    artwork_count = PositiveIntegerField(default=0, editable=False)
+    available_artwork_count = PositiveIntegerField(default=0, editable=False)
     created = DateTimeField(auto_now_add=True)
+    updated = DateTimeField(auto_now=True)
 
     class Meta:
         db_table = "genre"
         ordering = ["-created"]
-        indexes = [Index(fields=["id"]), Index(fields=["name"]), Index(fields=["slug"])]
+        indexes = [
+            Index(fields=["id"]),
+            Index(fields=["name"]),
+            Index(fields=["slug"]),
+            Index(fields=["-created", "-id"]),
+        ]
 
     def __str__(self):
         return self.name
 
 
 class Artwork(Model):
+    class ImageStatus(TextChoices):
+        PROCESSING = "PRC", "Processing"
+        READY = "RDY", "Ready"
+        FAILED = "FLD", "Failed"
+
     id = UUIDField(primary_key=True, editable=False, default=uuid4)
     name = CharField(max_length=250, unique=True)
     slug = SlugField(max_length=250, blank=True)
     description = TextField(blank=True)
     image = ImageField(upload_to="images/")
+    image_status = CharField(max_length=3, choices=ImageStatus.choices, default=ImageStatus.READY, db_index=True)
     artist = ForeignKey(Artist, related_name="artist_artworks", on_delete=CASCADE)
     height = PositiveIntegerField(blank=True, null=True)
     width = PositiveIntegerField(blank=True, null=True)
+    file_size = PositiveIntegerField(blank=True, null=True)  # In bytes
+    image_variants = JSONField(default=dict, blank=True)  # WebP variant names keyed by width
+    dominant_colors = JSONField(default=list, blank=True)  # `#rrggbb` strings, most common first
     price = DecimalField(decimal_places=2, max_digits=7, blank=True, null=True)
     genre = ManyToManyField(Genre, related_name="artworks", db_index=True)
     is_available = BooleanField(default=True)
     created = DateTimeField(auto_now_add=True)
     updated = DateTimeField(auto_now=True)
 
-    objects = Manager()
+    objects = ArtworkManager()
     available = AvailableManager()
 
     class Meta:
@@ -72,19 +144,153 @@ class Artwork(Model):
             Index(fields=["slug"]),
             Index(fields=["artist"]),
             Index(fields=["is_available"]),
+            # Composite indexes backing the keyset pagination on `(created, id)`, alone and after the catalog filters
+            Index(fields=["-created", "-id"]),
+            Index(fields=["is_available", "-created", "-id"]),
+            Index(fields=["artist", "-created", "-id"]),
+            # Backs the artist artwork list filtered to available artworks
+            Index(
+                fields=["artist", "-created", "-id"],
+                condition=Q(is_available=True),
+                name="artwork_artist_available_idx",
+            ),
+            Index(fields=["width", "height"]),
+            # Back the catalog sort modes, with `id` as the tie-breaker; each serves both directions
+            Index(fields=["price", "id"]),
+            Index(fields=["is_available", "price", "id"]),
+            Index(fields=["name", "id"]),
+            Index(fields=["updated", "id"]),
         ]
 
     def __str__(self):
         return self.name
 
-    # Extending the `delete` method to also remove the deleted image from cloudinary
-    def delete(self, *args, **kwargs):
-        if self.image:
-            public_id = self.image.name
-            destroy(
-                public_id=public_id,
-                api_key=settings.CLOUDINARY_STORAGE["API_KEY"],
-                api_secret=settings.CLOUDINARY_STORAGE["API_SECRET"],
-                cloud_name=settings.CLOUDINARY_STORAGE["CLOUD_NAME"],
-            )
-        return super().delete(*args, **kwargs)
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remembers the loaded availability, so that changes to it are counted on save without a query
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_is_available = instance.__dict__.get("is_available")
+        return instance
+
+
+# Through model of `Artwork.genre`, on the auto-created `artwork_genre` table.
+# Its `(genre_id, artwork_id)` index is created after migrations (see `signals.create_artwork_genre_index`).
+ArtworkGenre = Artwork.genre.through
+
+
+class ArtworkColor(Model):
+    """
+    Colour bucket of one of an artwork's dominant colours (see `palette.colors`).
+    Indexed by bucket, so colour searches read the matching artwork ids without touching the `artwork` table.
+    """
+    artwork = ForeignKey(Artwork, related_name="colors", on_delete=CASCADE)
+    bucket = PositiveSmallIntegerField()
+
+    class Meta:
+        db_table = "artwork_color"
+        constraints = [
+            UniqueConstraint(fields=["artwork", "bucket"], name="artwork_color_unique")
+        ]
+        indexes = [Index(fields=["bucket", "artwork"])]
+
+    def __str__(self):
+        return f"{self.artwork_id} - {self.bucket}"
+
+
+class ArtworkImageHash(Model):
+    """
+    Difference hash of an artwork's image, used to reject near-duplicate uploads (see `palette.duplicates`).
+    The hash is also split into 16-bit segments, each indexed, so near-duplicates are found without a table scan.
+    """
+    artwork = OneToOneField(Artwork, primary_key=True, related_name="image_hash", on_delete=CASCADE)
+    value = BigIntegerField()  # The unsigned hash, stored as signed
+    segment_0 = PositiveIntegerField()
+    segment_1 = PositiveIntegerField()
+    segment_2 = PositiveIntegerField()
+    segment_3 = PositiveIntegerField()
+
+    class Meta:
+        db_table = "artwork_image_hash"
+        indexes = [
+            Index(fields=["segment_0"]),
+            Index(fields=["segment_1"]),
+            Index(fields=["segment_2"]),
+            Index(fields=["segment_3"]),
+        ]
+
+    def __str__(self):
+        return f"{self.artwork_id}: {self.value}"
+
+
+class CartItem(Model):
+    """
+    Persisted copy of a user's cart.
+    Carts live in redis hashes (see `palette.cart.Cart`) and are written here periodically.
+    """
+    user = ForeignKey(settings.AUTH_USER_MODEL, related_name="cart_items", on_delete=CASCADE)
+    artwork = ForeignKey(Artwork, related_name="cart_items", on_delete=CASCADE)
+    quantity = PositiveIntegerField(default=1)
+    updated = DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "cart_item"
+        constraints = [
+            UniqueConstraint(fields=["user", "artwork"], name="cart_item_unique")
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.artwork} for {self.user}"
+
+
+class MediaDeletion(Model):
+    """
+    Outbox of remote media files to delete from cloudinary.
+    Rows are recorded by `post_delete` signals (so cascades are included) and drained in batches by `purge_deleted_media`.
+    Shared with the chat app, which queues the audio files of deleted messages here.
+    """
+    public_id = CharField(max_length=500)
+    resource_type = CharField(max_length=10, default="image")
+    attempts = PositiveSmallIntegerField(default=0)
+    last_error = TextField(blank=True)
+    created = DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "media_deletion"
+        ordering = ["created"]
+        indexes = [Index(fields=["attempts", "id"])]
+
+    def __str__(self):
+        return f"{self.resource_type}: {self.public_id}"
+
+
+class ArtworkStats(Model):
+    """
+    Aggregated popularity counts of an artwork.
+    Views and cart adds are counted in redis (see `palette.popularity`) and added here periodically in bulk.
+    """
+    artwork = OneToOneField(Artwork, primary_key=True, related_name="stats", on_delete=CASCADE)
+    view_count = PositiveIntegerField(default=0)
+    unique_viewers = PositiveIntegerField(default=0)  # Approximate, from a redis HyperLogLog
+    cart_add_count = PositiveIntegerField(default=0)
+    updated = DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "artwork_stats"
+
+    def __str__(self):
+        return f"{self.artwork_id}: {self.view_count} views"
+
+
+class ArtistStats(Model):
+    # Aggregated popularity counts of all of an artist's artworks, written alongside `ArtworkStats`
+    artist = OneToOneField(Artist, primary_key=True, related_name="stats", on_delete=CASCADE)
+    view_count = PositiveIntegerField(default=0)
+    unique_viewers = PositiveIntegerField(default=0)
+    cart_add_count = PositiveIntegerField(default=0)
+    updated = DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "artist_stats"
+
+    def __str__(self):
+        return f"{self.artist_id}: {self.view_count} views"
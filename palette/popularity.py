@@ -0,0 +1,167 @@
+from django.db.transaction import atomic
+from django.core.cache import cache
+
+from .models import Artwork, ArtworkStats, ArtistStats
+from .utils import get_artwork_cache_key, bump_list_generation, get_artist_artwork_list_type
+from portal.redis_client import get_redis_connection
+
+from collections import Counter
+from hashlib import md5
+
+
+ARTWORK_VIEWS_KEY = "artwork_views"  # Views per artwork since the last flush
+ARTWORK_CART_ADDS_KEY = "artwork_cart_adds"  # Cart adds per artwork since the last flush
+STATS_FIELDS = ["view_count", "unique_viewers", "cart_add_count", "updated"]
+
+
+def get_artwork_viewers_key(artwork_id):
+    # HyperLogLog of the viewers of an artwork, kept across flushes and deleted along with the artwork
+    return f"artwork_viewers_{artwork_id}"
+
+
+def get_artist_viewers_key(artist_id):
+    # HyperLogLog of the viewers of any of an artist's artworks, deleted along with the artist
+    return f"artist_viewers_{artist_id}"
+
+
+def delete_viewers(*viewers_keys):
+    get_redis_connection().delete(*viewers_keys)
+
+
+def get_viewer_id(request):
+    # Authenticated viewers are counted by user; anonymous ones by a hash of their address and user agent
+    if request.user.is_authenticated:
+        return f"user_{request.user.id}"
+    address = request.META.get("REMOTE_ADDR", "")
+    user_agent = request.META.get("HTTP_USER_AGENT", "")
+    return md5(f"{address}_{user_agent}".encode()).hexdigest()
+
+
+def record_artwork_view(artwork, viewer_id):
+    # Counts a view and its viewer in a single round trip
+    pipeline = get_redis_connection().pipeline(transaction=False)
+    pipeline.hincrby(ARTWORK_VIEWS_KEY, str(artwork.id), 1)
+    pipeline.pfadd(get_artwork_viewers_key(artwork.id), viewer_id)
+    pipeline.pfadd(get_artist_viewers_key(artwork.artist_id), viewer_id)
+    pipeline.execute()
+
+
+def record_cart_add(artwork_id):
+    get_redis_connection().hincrby(ARTWORK_CART_ADDS_KEY, str(artwork_id), 1)
+
+
+def get_stats(obj):
+    """
+    Retrieves the stats row of an artwork/artist if it was loaded alongside it (e.g. with `select_related("stats")`).
+    Returns None if it has no stats yet or they were not loaded, so serializing other instances adds no queries.
+    """
+    if type(obj).stats.is_cached(obj):
+        return getattr(obj, "stats", None)
+
+
+def get_popularity(obj):
+    # Popularity counts of an artwork/artist, zero if it has no stats yet
+    stats = get_stats(obj)
+    return {
+        "views": stats.view_count if stats else 0,
+        "unique_viewers": stats.unique_viewers if stats else 0,
+        "cart_adds": stats.cart_add_count if stats else 0,
+    }
+
+
+def drain_counts(redis):
+    # Reads and clears the pending counts atomically, so increments made during the flush are kept for the next one
+    pipeline = redis.pipeline()
+    pipeline.hgetall(ARTWORK_VIEWS_KEY)
+    pipeline.hgetall(ARTWORK_CART_ADDS_KEY)
+    pipeline.delete(ARTWORK_VIEWS_KEY, ARTWORK_CART_ADDS_KEY)
+    views, cart_adds, _ = pipeline.execute()
+    return (
+        Counter({artwork_id.decode(): int(count) for artwork_id, count in views.items()}),
+        Counter({artwork_id.decode(): int(count) for artwork_id, count in cart_adds.items()}),
+    )
+
+
+def restore_counts(redis, views, cart_adds):
+    # Adds drained counts back, for a flush that failed to write them
+    pipeline = redis.pipeline()
+    for artwork_id, count in views.items():
+        pipeline.hincrby(ARTWORK_VIEWS_KEY, artwork_id, count)
+    for artwork_id, count in cart_adds.items():
+        pipeline.hincrby(ARTWORK_CART_ADDS_KEY, artwork_id, count)
+    pipeline.execute()
+
+
+def upsert_stats(model, key_field, deltas, unique_viewers):
+    """
+    Adds `{key: (view_delta, cart_add_delta)}` to the stats rows of `model`, and sets their unique viewers.
+    Existing rows are read in one query and all rows are written with one upsert.
+    """
+    existing = {
+        str(key): (view_count, cart_add_count)
+        for key, view_count, cart_add_count in model.objects.filter(
+            **{f"{key_field}__in": deltas.keys()}
+        ).values_list(key_field, "view_count", "cart_add_count")
+    }
+    rows = []
+    for key, (view_delta, cart_add_delta) in deltas.items():
+        view_count, cart_add_count = existing.get(key, (0, 0))
+        rows.append(
+            model(
+                **{f"{key_field}_id": key},
+                view_count=view_count + view_delta,
+                unique_viewers=unique_viewers[key],
+                cart_add_count=cart_add_count + cart_add_delta,
+            )
+        )
+    model.objects.bulk_create(
+        rows, batch_size=500, update_conflicts=True, unique_fields=[key_field], update_fields=STATS_FIELDS
+    )
+
+
+def flush_popularity():
+    """
+    Moves the view and cart add counts accumulated in redis to the `ArtworkStats`/`ArtistStats` tables,
+    with the unique viewer estimates of the affected artworks and artists. Returns the number of updated artworks.
+    Counts of artworks deleted since they were recorded are dropped.
+    """
+    redis = get_redis_connection()
+    views, cart_adds = drain_counts(redis)
+    if not views and not cart_adds:
+        return 0
+
+    try:
+        artist_ids = {
+            str(artwork_id): str(artist_id)
+            for artwork_id, artist_id in Artwork.objects.filter(
+                id__in=views.keys() | cart_adds.keys()
+            ).values_list("id", "artist_id")
+        }
+        artwork_deltas = {artwork_id: (views[artwork_id], cart_adds[artwork_id]) for artwork_id in artist_ids}
+        artist_deltas = {}
+        for artwork_id, artist_id in artist_ids.items():
+            view_delta, cart_add_delta = artist_deltas.get(artist_id, (0, 0))
+            artist_deltas[artist_id] = (view_delta + views[artwork_id], cart_add_delta + cart_adds[artwork_id])
+
+        pipeline = redis.pipeline(transaction=False)
+        for artwork_id in artwork_deltas:
+            pipeline.pfcount(get_artwork_viewers_key(artwork_id))
+        for artist_id in artist_deltas:
+            pipeline.pfcount(get_artist_viewers_key(artist_id))
+        counts = pipeline.execute()
+        artwork_viewers = dict(zip(artwork_deltas, counts))
+        artist_viewers = dict(zip(artist_deltas, counts[len(artwork_deltas):]))
+
+        with atomic():
+            upsert_stats(ArtworkStats, "artwork", artwork_deltas, artwork_viewers)
+            upsert_stats(ArtistStats, "artist", artist_deltas, artist_viewers)
+    except Exception:
+        restore_counts(redis, views, cart_adds)
+        raise
+
+    # Cached artworks and list pages hold the old counts, so they are refilled with the new ones on the next read
+    cache.delete_many([get_artwork_cache_key(artwork_id) for artwork_id in artwork_deltas])
+    bump_list_generation("artwork")
+    for artist_id in artist_deltas:
+        bump_list_generation(get_artist_artwork_list_type(artist_id))
+    return len(artwork_deltas)
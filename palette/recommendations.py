@@ -0,0 +1,213 @@
+"""
+Precomputed "similar artworks" recommendations.
+
+Each artwork is described by its genres, dominant colours, artist and price band, and scored against every
+available artwork with dense NumPy operations over blocks of rows and columns, keeping a running top-K per row.
+Genre and colour memberships are kept as sparse rows and only expanded one block at a time, so memory is
+bounded by the block size and the number of links rather than the catalog size times the number of genres.
+The results are cached per artwork, so `ArtworkSimilarView` serves them with a single lookup.
+"""
+
+from django.core.cache import cache
+from django.conf import settings
+
+from .models import Genre, Artwork, ArtworkGenre
+from .utils import get_artwork_snapshots
+from .colors import parse_hex_color, get_color_bucket
+from portal.codec import dumps, loads
+
+from typing import NamedTuple
+import numpy as np
+
+
+SIMILAR_ARTWORKS_TIMEOUT = 60 * 60 * 48  # Outlives a missed daily run
+
+GENRE_WEIGHT = 1.0  # Applied to the cosine similarity of the genre memberships
+COLOR_WEIGHT = 0.5  # Applied to the cosine similarity of the dominant colour buckets
+ARTIST_WEIGHT = 0.5
+PRICE_WEIGHT = 0.25  # Full for the same price band, half for adjacent bands
+# Colours are compared on a coarser grid than the colour search, so near (not only equal) colours match
+COLOR_LEVELS = 4
+
+
+class ArtworkFeatures(NamedTuple):
+    ids: np.ndarray  # Artwork ids as strings
+    # L2-normalized genre and colour bucket memberships in CSR form (row offsets, columns, values), one row per
+    # artwork. Each part is scaled by the square root of its weight, so a single product of two rows is the
+    # weighted sum of both cosine similarities. See `get_profiles`.
+    profile_offsets: np.ndarray
+    profile_columns: np.ndarray
+    profile_values: np.ndarray
+    profile_width: int
+    artists: np.ndarray  # Artist codes
+    price_bands: np.ndarray  # Power-of-two price bands, -1 without a price
+    available: np.ndarray
+
+
+def get_similar_artworks_key(artwork_id):
+    return f"similar_artworks_{artwork_id}"
+
+
+def load_artwork_features():
+    # Builds the feature arrays of every artwork from two streamed queries
+    rows = Artwork.objects.order_by("id").values_list("id", "artist_id", "price", "is_available", "dominant_colors")
+    artwork_ids, artist_ids, prices, available = [], [], [], []
+    color_rows, color_columns = [], []
+    for i, (artwork_id, artist_id, price, is_available, dominant_colors) in enumerate(rows.iterator(chunk_size=2000)):
+        artwork_ids.append(str(artwork_id))
+        artist_ids.append(str(artist_id))
+        prices.append(np.nan if price is None else float(price))
+        available.append(is_available)
+        # Artworks whose colours haven't been extracted yet are compared on the other features only
+        for hex_color in dominant_colors:
+            color_rows.append(i)
+            color_columns.append(get_color_bucket(parse_hex_color(hex_color), COLOR_LEVELS))
+
+    artwork_index = {artwork_id: i for i, artwork_id in enumerate(artwork_ids)}
+    genre_index = {str(genre_id): j for j, genre_id in enumerate(Genre.objects.values_list("id", flat=True))}
+    links = ArtworkGenre.objects.values_list("artwork_id", "genre_id").iterator(chunk_size=5000)
+    link_rows, link_columns = [], []
+    for artwork_id, genre_id in links:
+        # Links of artworks/genres created after the first queries are left for the next run
+        if str(artwork_id) in artwork_index and str(genre_id) in genre_index:
+            link_rows.append(artwork_index[str(artwork_id)])
+            link_columns.append(genre_index[str(genre_id)])
+
+    # Colour buckets follow the genres in each row
+    genre_count, profile_width = len(genre_index), len(genre_index) + COLOR_LEVELS ** 3
+    entries = np.unique(
+        np.array(link_rows + color_rows, dtype=np.int64) * profile_width
+        + np.array(link_columns + [genre_count + column for column in color_columns], dtype=np.int64)
+    )  # Sorted by row then column, with colours sharing a bucket merged
+    entry_rows, entry_columns = np.divmod(entries, profile_width)
+    is_genre = entry_columns < genre_count
+    profile_values = np.empty(len(entries), dtype=np.float32)
+    for part, weight in ((is_genre, GENRE_WEIGHT), (~is_genre, COLOR_WEIGHT)):
+        # Memberships are all ones, so each row's norm is the square root of its number of entries
+        part_sizes = np.bincount(entry_rows[part], minlength=len(artwork_ids))
+        profile_values[part] = np.sqrt(weight / part_sizes[entry_rows[part]])
+
+    prices = np.array(prices, dtype=np.float64)
+    price_bands = np.full(len(prices), -1, dtype=np.int16)
+    priced = ~np.isnan(prices)
+    price_bands[priced] = np.floor(np.log2(np.maximum(prices[priced], 1)))
+
+    return ArtworkFeatures(
+        ids=np.array(artwork_ids, dtype=object),
+        profile_offsets=np.concatenate([[0], np.cumsum(np.bincount(entry_rows, minlength=len(artwork_ids)))]),
+        profile_columns=entry_columns,
+        profile_values=profile_values,
+        profile_width=profile_width,
+        artists=np.unique(np.array(artist_ids, dtype=object), return_inverse=True)[1],
+        price_bands=price_bands,
+        available=np.array(available, dtype=bool),
+    )
+
+
+def get_profiles(features, rows):
+    # Expands the sparse profiles of the artworks in the `rows` slice into a dense `(rows, profile_width)` block
+    start, stop = features.profile_offsets[rows.start], features.profile_offsets[rows.stop]
+    entry_rows = np.repeat(
+        np.arange(rows.stop - rows.start), np.diff(features.profile_offsets[rows.start:rows.stop + 1])
+    )
+    profiles = np.zeros((rows.stop - rows.start, features.profile_width), dtype=np.float32)
+    profiles[entry_rows, features.profile_columns[start:stop]] = features.profile_values[start:stop]
+    return profiles
+
+
+def score_block(features, rows, columns):
+    """
+    Scores the artworks in the `rows` slice against those in the `columns` slice, as a `(rows, columns)` matrix.
+    Unavailable artworks and the artworks themselves score `-inf`, so they are never recommended.
+    Terms are added in place in float32, so each block allocates little beyond the matrix itself.
+    """
+    scores = get_profiles(features, rows) @ get_profiles(features, columns).T
+    np.add(scores, ARTIST_WEIGHT, out=scores, where=features.artists[rows, None] == features.artists[None, columns])
+
+    row_bands, column_bands = features.price_bands[rows, None], features.price_bands[None, columns]
+    band_gaps = np.abs(row_bands - column_bands)
+    priced = (row_bands >= 0) & (column_bands >= 0)
+    np.add(scores, PRICE_WEIGHT, out=scores, where=priced & (band_gaps == 0))
+    np.add(scores, PRICE_WEIGHT / 2, out=scores, where=priced & (band_gaps == 1))
+
+    scores[:, ~features.available[columns]] = -np.inf
+    if rows.start < columns.stop and columns.start < rows.stop:
+        # The block overlaps the diagonal, where each artwork meets itself
+        overlap = range(max(rows.start, columns.start), min(rows.stop, columns.stop))
+        scores[[i - rows.start for i in overlap], [i - columns.start for i in overlap]] = -np.inf
+    return scores
+
+
+def top_k(scores, indices, k):
+    # Keeps the `k` best scores of each row (unsorted) along with their column indices
+    if scores.shape[1] > k:
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, best, axis=1)
+        indices = np.take_along_axis(indices, best, axis=1)
+    return scores, indices
+
+
+def compute_similar_artworks(features, k, block_size):
+    """
+    Yields `(artwork_id, similar_artwork_ids)` for every artwork, best match first.
+    Artworks sharing nothing with an artwork (a zero score) are left out of its list.
+    """
+    count = len(features.ids)
+    for row_start in range(0, count, block_size):
+        rows = slice(row_start, min(row_start + block_size, count))
+        row_count = rows.stop - rows.start
+        best_scores = np.full((row_count, 0), -np.inf, dtype=np.float32)
+        best_indices = np.zeros((row_count, 0), dtype=np.int64)
+
+        for column_start in range(0, count, block_size):
+            columns = slice(column_start, min(column_start + block_size, count))
+            scores = score_block(features, rows, columns)
+            indices = np.broadcast_to(np.arange(columns.start, columns.stop), scores.shape)
+            # The block's own top matches are merged with the running ones
+            scores, indices = top_k(scores, indices, k)
+            best_scores, best_indices = top_k(
+                np.concatenate([best_scores, scores], axis=1),
+                np.concatenate([best_indices, indices], axis=1),
+                k,
+            )
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_indices = np.take_along_axis(best_indices, order, axis=1)
+        for i in range(row_count):
+            similar = best_indices[i][best_scores[i] > 0]
+            yield features.ids[rows.start + i], features.ids[similar].tolist()
+
+
+def build_similar_artworks(on_block=None):
+    """
+    Recomputes the similar artworks of every artwork and caches them, one batch of entries per block.
+    `on_block` is called after each batch is cached, e.g. to renew a lock held for the run.
+    Returns the number of artworks processed.
+    """
+    features = load_artwork_features()
+    block_size = settings.ARTWORK_SIMILARITY_BLOCK_SIZE
+    batch = {}
+    for artwork_id, similar_ids in compute_similar_artworks(features, settings.ARTWORK_SIMILAR_COUNT, block_size):
+        batch[get_similar_artworks_key(artwork_id)] = dumps(similar_ids)
+        if len(batch) >= block_size:
+            cache.set_many(batch, SIMILAR_ARTWORKS_TIMEOUT)
+            batch = {}
+            if on_block is not None:
+                on_block()
+    if batch:
+        cache.set_many(batch, SIMILAR_ARTWORKS_TIMEOUT)
+    return len(features.ids)
+
+
+def get_similar_artworks(artwork_id):
+    """
+    Retrieves the snapshots of an artwork's precomputed similar artworks, best match first.
+    Artworks deleted or made unavailable since the last build are left out.
+    """
+    similar_ids = loads(cache.get(get_similar_artworks_key(artwork_id))) or []
+    snapshots = get_artwork_snapshots(similar_ids)
+    return [
+        snapshots[similar_id] for similar_id in similar_ids
+        if similar_id in snapshots and snapshots[similar_id]["is_available"]
+    ]
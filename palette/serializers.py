@@ -1,7 +1,21 @@
 from django.utils.text import slugify
+from django.utils import timezone
+from django.conf import settings
 from rest_framework.fields import empty
 
-from .models import Genre, Artwork, Artist
+from .models import Genre, Artwork, Artist, ArtworkGenre, ArtworkImageHash
+from .utils import resolve_genre_ids
+from .facets import update_genre_counts
+from .popularity import get_popularity
+from .colors import parse_hex_color
+from .imaging import is_image_too_large
+from .duplicates import (
+    compute_image_hash,
+    is_distinctive,
+    build_image_hash,
+    find_near_duplicates,
+    find_duplicates_within,
+)
 
 from rest_framework.serializers import (
     ModelSerializer,
@@ -10,15 +24,24 @@ from rest_framework.serializers import (
     SerializerMethodField,
     Serializer,
     ChoiceField,
-    ValidationError
+    ValidationError,
+    UUIDField,
+    DecimalField,
+    IntegerField,
+    BooleanField,
+    JSONField,
+    ImageField,
+    DictField,
+    DateTimeField,
 )
+from collections import defaultdict
 
 
 class GenreSerializer(ModelSerializer):
     class Meta:
         model = Genre
-        fields = ["id", "name", "slug", "created"]
-        read_only_fields = ["id", "created"]
+        fields = ["id", "name", "slug", "artwork_count", "available_artwork_count", "created"]
+        read_only_fields = ["id", "artwork_count", "available_artwork_count", "created"]
 
     def create(self, validated_data):
         name = validated_data["name"]
@@ -36,6 +59,8 @@ class GenreSerializer(ModelSerializer):
 class ArtworkSerializer(ModelSerializer):
     artist = SerializerMethodField()
     genre = SerializerMethodField()
+    image_variants = SerializerMethodField()
+    popularity = SerializerMethodField()
     genres = ListField(
         write_only=True,
         allow_empty=True,
@@ -45,15 +70,42 @@ class ArtworkSerializer(ModelSerializer):
     class Meta:
         model = Artwork
         fields = "__all__"
-        read_only_fields = ["id", "artist", "created", "updated"]
+        read_only_fields = [
+            "id", "artist", "image_status", "height", "width", "file_size", "dominant_colors", "created", "updated"
+        ]
         
     def get_artist(self, obj):
         return obj.artist.user.username
 
+    def get_image_variants(self, obj):
+        # WebP variant urls keyed by width, for clients to pick the smallest that fits
+        storage = obj.image.storage
+        return {width: storage.url(name) for width, name in obj.image_variants.items()}
+
     def get_genre(self, obj):
         genres = obj.genre.all()
         return [genre.name for genre in genres]
 
+    def get_popularity(self, obj):
+        return get_popularity(obj)
+
+    def validate_image(self, value):
+        if self.instance is not None:
+            return value  # Images can't be changed by updates (see `update`), so they aren't read
+        
+        if is_image_too_large(value):
+            raise ValidationError("This image has too many pixels.", code="invalid")
+        # Near-duplicates of existing artworks are rejected before the image is stored anywhere
+        image_hash = compute_image_hash(value)
+        if is_distinctive(image_hash):
+            duplicate_name = find_near_duplicates([image_hash]).get(0)
+            if duplicate_name is not None:
+                raise ValidationError(
+                    f"This image is a near-duplicate of the artwork '{duplicate_name}'.", code="invalid"
+                )
+            self.image_hash = image_hash
+        return value
+
     def create(self, validated_data):
         validated_data["slug"] = slugify(validated_data["name"])
         if "is_available" not in self.context["data"]:
@@ -65,21 +117,19 @@ class ArtworkSerializer(ModelSerializer):
             
         genre_data = validated_data.pop("genres", [])
         artwork = Artwork.objects.create(**validated_data)
+        if getattr(self, "image_hash", None) is not None:
+            build_image_hash(artwork, self.image_hash).save()
 
         """
         Handles logic for `many-to-many` fields.
         This requires a list containing the name of each genre to be added in the `ManyToManyField`, seperated by commas.
-        For each name in the list, the ids of corresponding genre objects are added to the artwork object if existing.
+        All names are resolved in one query, and the links to existing genres are inserted in one statement.
         """
-        new_genre_list = []
-        for genre_name in genre_data:
-            genre = Genre.objects.filter(slug=slugify(genre_name)).first()
-            if genre:
-                new_genre_list.append(genre)
-
-        new_genre_ids = [genre.id for genre in new_genre_list]
-        if new_genre_ids:
-            artwork.genre.add(*new_genre_ids)
+        new_genre_ids = resolve_genre_ids(genre_data).values()
+        ArtworkGenre.objects.bulk_create(
+            [ArtworkGenre(artwork=artwork, genre_id=genre_id) for genre_id in new_genre_ids]
+        )
+        update_genre_counts({genre_id: (1, int(artwork.is_available)) for genre_id in new_genre_ids})
 
         return artwork
 
@@ -96,22 +146,282 @@ class ArtworkSerializer(ModelSerializer):
         elif len(error_list) > 1:
             raise ValidationError({"update": f"You cannot edit the values of {', '.join(error_list)}."})
         
+        # Similar functionality to create(), but every genre must exist
         new_genre_data = validated_data.pop("genres", [])
+        new_genre_ids = resolve_genre_ids(new_genre_data)
+        if len(new_genre_ids) < len({slugify(genre_name) for genre_name in new_genre_data}):
+            raise ValidationError({"slug": "Genre does not match existing genre data."}, code="invalid")
+        
         instance = super().update(instance, validated_data)
+        linked_genre_ids = set(ArtworkGenre.objects.filter(artwork=instance).values_list("genre_id", flat=True))
+        new_links = [
+            ArtworkGenre(artwork=instance, genre_id=genre_id)
+            for genre_id in new_genre_ids.values() if genre_id not in linked_genre_ids
+        ]
+        ArtworkGenre.objects.bulk_create(new_links, ignore_conflicts=True)
+        update_genre_counts({link.genre_id: (1, int(instance.is_available)) for link in new_links})
+        if new_links:
+            # Unlike `genre.add()`, bulk inserts leave the prefetched (or cached) genres in place
+            getattr(instance, "_prefetched_objects_cache", {}).pop("genre", None)
 
-        # Similar functionality to create()
-        new_genre_list = []
-        for genre_name in new_genre_data:
-            new_genre = Genre.objects.filter(slug=slugify(genre_name)).first()
-            if not new_genre:
-                raise ValidationError({"slug": "Genre does not match existing genre data."}, code="invalid")
-            new_genre_list.append(new_genre)
+        return instance
 
-        new_genre_ids = [genre.id for genre in new_genre_list]
-        if new_genre_ids:
-            instance.genre.add(*new_genre_ids)
 
-        return instance
+class ArtworkBulkItemSerializer(ModelSerializer):
+    genres = ListField(allow_empty=True, child=CharField())
+
+    class Meta:
+        model = Artwork
+        fields = ["name", "description", "price", "is_available", "genres"]
+        # Names are checked against the db once for the whole batch
+        extra_kwargs = {"name": {"validators": []}}
+
+
+class ArtworkBulkUpdateItemSerializer(ModelSerializer):
+    id = UUIDField()
+    genres = ListField(required=False, allow_empty=True, child=CharField())
+
+    class Meta:
+        model = Artwork
+        fields = ["id", "description", "price", "is_available", "genres"]
+
+
+def validate_bulk_items(item_serializer_class, items):
+    """
+    Validates each item of a bulk request, and returns the list of validated items.
+    Errors are raised together, prefixed with the position of their item.
+    """
+    if len(items) > settings.ARTWORK_BULK_MAX_ITEMS:
+        raise ValidationError(
+            {"artworks": f"At most {settings.ARTWORK_BULK_MAX_ITEMS} artworks can be sent at once."}, code="invalid"
+        )
+    
+    validated_items, error_list = [], []
+    for i, item in enumerate(items, start=1):
+        item_serializer = item_serializer_class(data=item)
+        if item_serializer.is_valid():
+            validated_items.append(item_serializer.validated_data)
+            continue
+        for field, errors in item_serializer.errors.items():
+            error_list.extend(f"Artwork {i}: {field} - {error}" for error in errors)
+            
+    if error_list:
+        raise ValidationError({"artworks": error_list}, code="invalid")
+    return validated_items
+
+
+class ArtworkBulkCreateSerializer(Serializer):
+    """
+    Validates a batch of new artworks sent as multipart form-data:
+    `artworks` is a JSON list of artwork fields, and `images` holds one image per artwork, in the same order.
+    """
+    artworks = JSONField(binary=True)
+    images = ListField(allow_empty=False, child=ImageField())
+
+    def validate(self, data):
+        items = data["artworks"]
+        if not isinstance(items, list) or not items:
+            raise ValidationError({"artworks": "Expected a list of artworks."}, code="invalid")
+        elif len(items) != len(data["images"]):
+            raise ValidationError({"images": "Expected one image per artwork."}, code="invalid")
+        
+        artworks = validate_bulk_items(ArtworkBulkItemSerializer, items)
+        names = [artwork["name"] for artwork in artworks]
+        if len(set(names)) < len(names):
+            raise ValidationError({"name": "Artwork names must be unique."}, code="invalid")
+        existing_names = list(Artwork.objects.filter(name__in=names).values_list("name", flat=True))
+        if existing_names:
+            raise ValidationError(
+                {"name": f"Artwork with this name already exists: {', '.join(existing_names)}."}, code="invalid"
+            )
+        
+        oversized_error_list = [
+            f"Artwork {i + 1}: image - This image has too many pixels."
+            for i, image in enumerate(data["images"]) if is_image_too_large(image)
+        ]
+        if oversized_error_list:
+            raise ValidationError({"images": oversized_error_list}, code="invalid")
+        
+        data["artworks"] = artworks
+        data["image_hashes"] = self.validate_image_hashes(data["images"])
+        return data
+
+    def validate_image_hashes(self, images):
+        """
+        Rejects images that are near-duplicates of existing artworks or of another image in the batch,
+        with one lookup for the whole batch. Returns each image's hash, or None if it isn't distinctive.
+        """
+        image_hashes = [compute_image_hash(image) for image in images]
+        positions = [i for i, image_hash in enumerate(image_hashes) if is_distinctive(image_hash)]
+        distinctive_hashes = [image_hashes[i] for i in positions]
+        
+        error_list = [
+            f"Artwork {positions[i] + 1}: image - This image is a near-duplicate of the artwork '{duplicate_name}'."
+            for i, duplicate_name in sorted(find_near_duplicates(distinctive_hashes).items())
+        ]
+        error_list.extend(
+            f"Artwork {positions[i] + 1}: image - This image is a near-duplicate of another image in the batch."
+            for i in find_duplicates_within(distinctive_hashes)
+        )
+        if error_list:
+            raise ValidationError({"images": error_list}, code="invalid")
+        return [image_hash if is_distinctive(image_hash) else None for image_hash in image_hashes]
+
+    def create(self, validated_data):
+        """
+        Inserts the batch of artworks with one statement, and their genre links and image hashes with one each.
+        Images are ingested separately (see `ingest_artwork_image`), so artworks are created as processing.
+        Like single creates, genre names without a matching genre are ignored.
+        """
+        artist = Artist.objects.filter(user=self.context["user"]).first()
+        genre_ids = resolve_genre_ids({name for item in validated_data["artworks"] for name in item["genres"]})
+        
+        artworks, links, image_hashes = [], [], []
+        for item, image_hash in zip(validated_data["artworks"], validated_data["image_hashes"]):
+            genre_slugs = {slugify(genre_name) for genre_name in item.pop("genres")}
+            artwork = Artwork(
+                **item,
+                slug=slugify(item["name"]),
+                artist=artist,
+                image_status=Artwork.ImageStatus.PROCESSING,
+            )
+            artworks.append(artwork)
+            if image_hash is not None:
+                image_hashes.append(build_image_hash(artwork, image_hash))
+            links.extend(
+                ArtworkGenre(artwork=artwork, genre_id=genre_ids[slug]) for slug in genre_slugs if slug in genre_ids
+            )
+            
+        Artwork.objects.bulk_create(artworks)
+        ArtworkGenre.objects.bulk_create(links)
+        ArtworkImageHash.objects.bulk_create(image_hashes)
+        
+        count_deltas = defaultdict(lambda: [0, 0])
+        for link in links:
+            count_deltas[link.genre_id][0] += 1
+            count_deltas[link.genre_id][1] += int(link.artwork.is_available)
+        update_genre_counts({genre_id: tuple(deltas) for genre_id, deltas in count_deltas.items()})
+        
+        return artworks
+
+
+class ArtworkBulkUpdateSerializer(Serializer):
+    """
+    Validates a batch of updates to artworks identified by id, which must be in the instance queryset
+    (the requesting artist's artworks). Like single updates, genres are added to the existing ones
+    and every genre must exist.
+    """
+    artworks = ListField(allow_empty=False, child=DictField())
+
+    def validate(self, data):
+        items = validate_bulk_items(ArtworkBulkUpdateItemSerializer, data["artworks"])
+        artwork_ids = [item["id"] for item in items]
+        if len(set(artwork_ids)) < len(artwork_ids):
+            raise ValidationError({"id": "Each artwork can only be updated once per batch."}, code="invalid")
+        
+        artworks = self.instance.in_bulk(artwork_ids)
+        missing_ids = [str(artwork_id) for artwork_id in artwork_ids if artwork_id not in artworks]
+        if missing_ids:
+            raise ValidationError(
+                {"id": f"Artwork does not exist or was not created by you: {', '.join(missing_ids)}."}, code="invalid"
+            )
+        
+        genre_names = {genre_name for item in items for genre_name in item.get("genres", [])}
+        genre_ids = resolve_genre_ids(genre_names)
+        if len(genre_ids) < len({slugify(genre_name) for genre_name in genre_names}):
+            raise ValidationError({"slug": "Genre does not match existing genre data."}, code="invalid")
+        
+        return {"artworks": items, "instances": artworks, "genre_ids": genre_ids}
+
+    def update(self, instance, validated_data):
+        """
+        Applies the batch of updates with one `bulk_update`, and inserts the new genre links with one statement.
+        Returns the updated artworks.
+        """
+        artworks, genre_ids = validated_data["instances"], validated_data["genre_ids"]
+        updated = timezone.now()
+        update_fields, availability_changes = {"updated"}, {}
+        for item in validated_data["artworks"]:
+            artwork = artworks[item["id"]]
+            was_available = artwork.is_available
+            for field in ("description", "price", "is_available"):
+                if field in item:
+                    setattr(artwork, field, item[field])
+                    update_fields.add(field)
+            if artwork.is_available != was_available:
+                availability_changes[artwork.id] = artwork.is_available
+            artwork.updated = updated
+        Artwork.objects.bulk_update(list(artworks.values()), sorted(update_fields))
+        
+        # `bulk_update` sends no signals, so genre counts are adjusted here for both availability changes and new links
+        count_deltas = defaultdict(lambda: [0, 0])
+        links = set(ArtworkGenre.objects.filter(artwork_id__in=artworks.keys()).values_list("artwork_id", "genre_id"))
+        for artwork_id, genre_id in links:
+            if artwork_id in availability_changes:
+                count_deltas[genre_id][1] += 1 if availability_changes[artwork_id] else -1
+        
+        new_links = []
+        for item in validated_data["artworks"]:
+            for slug in {slugify(genre_name) for genre_name in item.get("genres", [])}:
+                link = (item["id"], genre_ids[slug])
+                if link not in links:
+                    links.add(link)
+                    new_links.append(ArtworkGenre(artwork_id=link[0], genre_id=link[1]))
+                    count_deltas[link[1]][0] += 1
+                    count_deltas[link[1]][1] += int(artworks[item["id"]].is_available)
+        ArtworkGenre.objects.bulk_create(new_links, ignore_conflicts=True)
+        update_genre_counts({genre_id: tuple(deltas) for genre_id, deltas in count_deltas.items()})
+        
+        return [artworks[item["id"]] for item in validated_data["artworks"]]
+
+
+class ArtworkFilterSerializer(Serializer):
+    """
+    Validates the query parameters used to filter and sort the artwork catalog.
+    `genre` accepts one or more comma-separated genre slugs, `color` a `#rrggbb` colour,
+    and `ordering` one of `ORDERING_CHOICES`.
+    """
+    ORDERING_CHOICES = ["-created", "created", "price", "-price", "name", "-name", "updated", "-updated"]
+    genre = CharField(required=False)
+    artist = UUIDField(required=False)
+    is_available = BooleanField(required=False)
+    min_price = DecimalField(decimal_places=2, max_digits=7, required=False)
+    max_price = DecimalField(decimal_places=2, max_digits=7, required=False)
+    min_width = IntegerField(min_value=0, required=False)
+    max_width = IntegerField(min_value=0, required=False)
+    min_height = IntegerField(min_value=0, required=False)
+    max_height = IntegerField(min_value=0, required=False)
+    color = CharField(required=False)
+    ordering = ChoiceField(choices=ORDERING_CHOICES, required=False)
+
+    def validate_genre(self, value):
+        return sorted({slugify(slug) for slug in value.split(",") if slug.strip()})
+
+    def validate_color(self, value):
+        rgb = parse_hex_color(value)
+        if rgb is None:
+            raise ValidationError("Enter a colour in the #rrggbb format.", code="invalid")
+        return "#{:02x}{:02x}{:02x}".format(*rgb)
+
+    def validate(self, data):
+        for field in ["price", "width", "height"]:
+            minimum, maximum = data.get(f"min_{field}"), data.get(f"max_{field}")
+            if None not in (minimum, maximum) and minimum > maximum:
+                raise ValidationError(
+                    {field: f"min_{field} cannot be greater than max_{field}."}, code="invalid"
+                )
+        
+        return data
+
+
+class ArtworkExportSerializer(Serializer):
+    """
+    Validates the query parameters of a catalog export.
+    `updated_since` limits the export to the artworks updated at or after it.
+    """
+    FORMAT_CHOICES = ["ndjson", "csv"]
+    export_format = ChoiceField(choices=FORMAT_CHOICES, required=False, default="ndjson")
+    updated_since = DateTimeField(required=False)
 
 
 class CartUpdateSerializer(Serializer):
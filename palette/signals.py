@@ -0,0 +1,132 @@
+from django.db.models.signals import post_delete, post_save, pre_save, pre_delete, m2m_changed, post_migrate
+from django.db import connections
+from django.db.transaction import on_commit
+from django.dispatch import receiver
+
+from .models import Artwork, Genre, MediaDeletion, ArtworkGenre
+from .utils import invalidate_artwork_cache, bump_list_generation, get_artist_artwork_list_type, GENRE_SLUG_MAP_KEY
+from .facets import update_genre_counts, record_genre_links, record_availability_change
+from .popularity import get_artwork_viewers_key, get_artist_viewers_key, delete_viewers
+from portal.cache import invalidate_tiered
+from user.models import Artist
+
+
+@receiver(post_delete, sender=Artwork)
+def record_artwork_image_deletion(sender, instance, **kwargs):
+    """
+    Queues the deleted artwork's image and its variants for removal from cloudinary.
+    Runs for cascaded deletes too, and is rolled back along with the delete.
+    """
+    public_ids = list(instance.image_variants.values())
+    if instance.image:
+        public_ids.append(instance.image.name)
+    MediaDeletion.objects.bulk_create(
+        [MediaDeletion(public_id=public_id, resource_type="image") for public_id in public_ids]
+    )
+
+
+@receiver(post_delete, sender=Artwork)
+def invalidate_deleted_artwork_cache(sender, instance, **kwargs):
+    # Cascaded deletes bypass the views, so cached copies are dropped here once the delete commits
+    artwork_id, slug = instance.id, instance.slug  # The primary key is cleared after the delete
+    on_commit(lambda: invalidate_artwork_cache(artwork_id, slug))
+
+
+@receiver(post_delete, sender=Artwork)
+@receiver(post_delete, sender=Artist)
+def delete_viewer_estimates(sender, instance, **kwargs):
+    # The viewer HyperLogLogs have no expiry, so they are deleted once the artwork/artist delete commits
+    viewers_key = (get_artwork_viewers_key if sender is Artwork else get_artist_viewers_key)(instance.id)
+    on_commit(lambda: delete_viewers(viewers_key))
+
+
+@receiver(post_save, sender=Artwork)
+@receiver(post_delete, sender=Artwork)
+def invalidate_artist_artwork_list(sender, instance, **kwargs):
+    """
+    Drops the cached pages of the artist's artworks on every write to one of them, including cascades.
+    The generation is bumped again after the commit, so that a refill racing the transaction can't keep the old page.
+    """
+    list_type = get_artist_artwork_list_type(instance.artist_id)
+    bump_list_generation(list_type)
+    on_commit(lambda: bump_list_generation(list_type))
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genre_slug_map(sender, instance, **kwargs):
+    """
+    Drops the cached genre slug map on every genre write, including admin and shell writes.
+    It is dropped again after the commit, so that a refill racing the transaction can't keep the old map.
+    """
+    invalidate_tiered(GENRE_SLUG_MAP_KEY)
+    on_commit(lambda: invalidate_tiered(GENRE_SLUG_MAP_KEY))
+
+
+@receiver(pre_save, sender=Artwork)
+def count_artwork_availability_change(sender, instance, update_fields=None, **kwargs):
+    # Moves the artwork between its genres' available counts when `is_available` changes
+    if update_fields is not None and "is_available" not in update_fields:
+        return
+    
+    if not instance._state.adding:
+        was_available = getattr(instance, "_loaded_is_available", None)
+        if was_available is None:
+            was_available = Artwork.objects.filter(id=instance.id).values_list("is_available", flat=True).first()
+        if was_available is not None and was_available != instance.is_available:
+            record_availability_change(instance.id, instance.is_available)
+    instance._loaded_is_available = instance.is_available
+
+
+@receiver(pre_delete, sender=Artwork)
+def count_deleted_artwork_genres(sender, instance, **kwargs):
+    # Runs before the cascade removes the artwork's genre links, for cascaded deletes too
+    genre_ids = ArtworkGenre.objects.filter(artwork_id=instance.id).values_list("genre_id", flat=True)
+    update_genre_counts({genre_id: (-1, -int(instance.is_available)) for genre_id in genre_ids})
+
+
+@receiver(m2m_changed, sender=Artwork.genre.through)
+def count_genre_link_changes(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Counts genre links written through the related managers (e.g. `artwork.genre.set()` or the admin).
+    Links inserted with `ArtworkGenre.objects.bulk_create` send no signal, and are counted by their callers.
+    Removed links are read before the removal, as `pk_set` may include ids that weren't linked.
+    """
+    instance_field = "genre_id" if reverse else "artwork_id"
+    related_field = "artwork_id" if reverse else "genre_id"
+    if action in ("pre_remove", "pre_clear"):
+        links = ArtworkGenre.objects.filter(**{instance_field: instance.pk})
+        if pk_set is not None:
+            links = links.filter(**{f"{related_field}__in": pk_set})
+        instance._removed_genre_links = list(links.values_list("artwork_id", "genre_id"))
+    elif action in ("post_remove", "post_clear"):
+        record_genre_links(instance.__dict__.pop("_removed_genre_links", []), sign=-1)
+    elif action == "post_add":
+        record_genre_links(
+            [(pk, instance.pk) if reverse else (instance.pk, pk) for pk in pk_set]
+        )
+
+
+ARTWORK_GENRE_INDEX = "artwork_genre_genre_artwork_idx"
+
+
+@receiver(post_migrate)
+def create_artwork_genre_index(sender, using, **kwargs):
+    """
+    Creates the `(genre_id, artwork_id)` index backing genre filtering on the `artwork_genre` table.
+    The table is auto-created for `Artwork.genre` and can't declare indexes, so the index is added after
+    every migration instead; existing databases get it without changes to the table's migrations.
+    """
+    if sender.name != "palette":
+        return
+
+    connection = connections[using]
+    table = ArtworkGenre._meta.db_table
+    if table not in connection.introspection.table_names():
+        return
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {quote(ARTWORK_GENRE_INDEX)} "
+            f"ON {quote(table)} ({quote('genre_id')}, {quote('artwork_id')})"
+        )
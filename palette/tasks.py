@@ -1,36 +1,299 @@
 from django.core.cache import cache
+from django.db.transaction import atomic
+from django.db.models import F
+from django.conf import settings
+from django.core.files import File
 
-from .models import Artwork, Genre
+from .models import Artwork, ArtworkColor, ArtworkImageHash, CartItem, MediaDeletion
+from .utils import (
+    bump_list_generation,
+    get_staging_storage,
+    load_palette_object,
+    cache_artwork,
+    invalidate_artwork_cache,
+    get_artwork_cache_key,
+    get_artist_artwork_list_type,
+)
+from portal.cache import invalidate_tiered
+from portal.codec import dumps
+from .imaging import process_image
+from .facets import reconcile_genre_counts
+from .popularity import flush_popularity
+from .recommendations import build_similar_artworks
+from .colors import get_color_buckets
+from .cart import CART_DIRTY_SET, CART_LOADED_FIELD
+from portal.redis_client import get_redis_connection
 
 from celery import shared_task
-import pickle
+from cloudinary.api import delete_resources
+from itertools import groupby
+
+
+def fill_palette_object_cache(slug, object_type):
+    """
+    Caches a genre/artwork object and returns it.
+    Genres are cached by slug; artworks by id, with a slug alias.
+    """
+    item = load_palette_object(slug, object_type)
+    if item is None:
+        return
+
+    if object_type == "artwork":
+        cache_artwork(item)
+    else:
+        cache.set(f"{object_type}_{slug}", dumps(item))
+    return item
+
+
+def index_artwork_colors(artwork):
+    # Replaces the colour buckets of an artwork with those of its current dominant colours
+    with atomic():
+        ArtworkColor.objects.filter(artwork=artwork).delete()
+        ArtworkColor.objects.bulk_create(
+            [ArtworkColor(artwork=artwork, bucket=bucket) for bucket in get_color_buckets(artwork.dominant_colors)]
+        )
 
 
 @shared_task
 def update_palette_cache_details(slug, object_type, is_delete=False, object_id=None):
     """
     Updates genre/artworks cache when an object is created, updated, or deleted.
+    The list generation is bumped in O(1); cached list pages are rebuilt lazily by readers.
     """
-    objects_cache_ids = []
-    object_model = Genre if object_type == "genre" else Artwork
-    item = object_model.objects.filter(slug=slug).first()
-        
-    if is_delete:
-        cache.delete(f"{object_type}_{slug}")
-    elif object_id is not None:
-        cache.set(f"{object_type}_{object_id}", pickle.dumps(item))
+    if object_type == "artwork":
+        if is_delete:
+            invalidate_artwork_cache(object_id, slug)
+        else:
+            item = fill_palette_object_cache(slug, object_type)
+            if item is not None:
+                cache.delete(f"artwork_snapshot_{item.id}")
     else:
-        cache.set(f"{object_type}_{slug}", pickle.dumps(item))
-        
-    objects_cache = cache.get(f"{object_type}_list")
-    if objects_cache is not None:
-        objects_cache = pickle.loads(objects_cache)
-        objects_cache_ids = [i.id for i in objects_cache if i.slug != slug]
-        
-    if not is_delete:
-        objects_cache_ids.append(item.id)
+        if is_delete:
+            cache.delete(f"{object_type}_{slug}")
+        else:
+            fill_palette_object_cache(slug, object_type)
+        # The shared copy was refreshed above; other processes drop their in-process copies
+        invalidate_tiered(f"{object_type}_{slug}", shared=False)
+
+    bump_list_generation(object_type)
+
+
+@shared_task
+def update_artwork_batch_cache_details(artist_id, artwork_ids=()):
+    """
+    Updates the artwork caches once for a batch of an artist's created/updated artworks.
+    Cached copies of the updated artworks are dropped, and the artwork list generations are bumped once.
+    """
+    cache.delete_many(
+        [
+            cache_key
+            for artwork_id in artwork_ids
+            for cache_key in (get_artwork_cache_key(artwork_id), f"artwork_snapshot_{artwork_id}")
+        ]
+    )
+    bump_list_generation("artwork")
+    bump_list_generation(get_artist_artwork_list_type(artist_id))
+
+
+@shared_task
+def persist_carts():
+    """
+    Writes the redis carts that changed since the last run to `CartItem`, in batches.
+    Carts whose hash has expired keep their last persisted copy.
+    """
+    redis = get_redis_connection()
+    while True:
+        user_ids = [user_id.decode() for user_id in redis.spop(CART_DIRTY_SET, settings.CART_PERSIST_BATCH_SIZE)]
+        if not user_ids:
+            break
+
+        try:
+            pipeline = redis.pipeline(transaction=False)
+            for user_id in user_ids:
+                pipeline.hgetall(f"cart_{user_id}")
+            carts = dict(zip(user_ids, pipeline.execute()))
+
+            cart_items = {
+                (user_id, field.decode()): int(quantity)
+                for user_id, cart in carts.items()
+                for field, quantity in cart.items()
+                if field.decode() != CART_LOADED_FIELD and int(quantity) > 0
+            }
+            existing_artwork_ids = {
+                str(artwork_id) for artwork_id in Artwork.objects.filter(
+                    id__in={artwork_id for _, artwork_id in cart_items}
+                ).values_list("id", flat=True)
+            }
+            
+            persisted_user_ids = [user_id for user_id, cart in carts.items() if cart]
+            with atomic():
+                CartItem.objects.filter(user_id__in=persisted_user_ids).delete()
+                CartItem.objects.bulk_create(
+                    [
+                        CartItem(user_id=user_id, artwork_id=artwork_id, quantity=quantity)
+                        for (user_id, artwork_id), quantity in cart_items.items()
+                        if artwork_id in existing_artwork_ids
+                    ]
+                )
+        except Exception:
+            # The popped carts are marked dirty again, so the next run persists them before their hash expires
+            redis.sadd(CART_DIRTY_SET, *user_ids)
+            raise
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def ingest_artwork_image(self, artwork_id, staged_name):
+    """
+    Pushes a staged artwork image to the storage backend, outside of the request and its transaction.
+    The artwork is marked as ready once uploaded, or as failed once retries are exhausted.
+    """
+    staging_storage = get_staging_storage()
+    artwork = Artwork.objects.filter(id=artwork_id).first()
+    if artwork is None:
+        staging_storage.delete(staged_name)
+        return
+
+    try:
+        with staging_storage.open(staged_name, "rb") as staged_file:
+            image_name = staged_name.split("_", 1)[1]  # Removes the staging prefix
+            # Metadata and variants are read from the local staged copy, before it is uploaded
+            image_details = process_image(staged_file, image_name, artwork.image.storage)
+            staged_file.seek(0)
+            artwork.image.save(image_name, File(staged_file), save=False)
+    except Exception as exc:
+        if self.request.retries >= self.max_retries:
+            artwork.image_status = Artwork.ImageStatus.FAILED
+            artwork.save(update_fields=["image_status", "updated"])
+            # The image was never stored, so it mustn't block a new upload of it as a near-duplicate
+            ArtworkImageHash.objects.filter(artwork=artwork).delete()
+            staging_storage.delete(staged_name)
+            update_palette_cache_details(artwork.slug, "artwork")
+            raise
+        raise self.retry(exc=exc)
+
+    for field, value in image_details.items():
+        setattr(artwork, field, value)
+    artwork.image_status = Artwork.ImageStatus.READY
+    artwork.save(update_fields=["image", "image_status", *image_details, "updated"])
+    index_artwork_colors(artwork)
+    staging_storage.delete(staged_name)
+    update_palette_cache_details(artwork.slug, "artwork")
+
+
+@shared_task
+def process_artwork_image(artwork_id):
+    """
+    Fills an artwork's image dimensions, file size and dominant colours, and generates its WebP variants.
+    Used for images uploaded synchronously; ingested images are processed in `ingest_artwork_image`.
+    """
+    artwork = Artwork.objects.filter(id=artwork_id).first()
+    if artwork is None or not artwork.image:
+        return
+    
+    with artwork.image.open("rb") as image_file:
+        image_details = process_image(image_file, artwork.image.name, artwork.image.storage)
         
-    object_list = object_model.objects.filter(id__in=objects_cache_ids)
-    cache.set(f"{object_type}_list", pickle.dumps(object_list))
+    for field, value in image_details.items():
+        setattr(artwork, field, value)
+    artwork.save(update_fields=[*image_details, "updated"])
+    index_artwork_colors(artwork)
+    update_palette_cache_details(artwork.slug, "artwork")
+
+
+@shared_task
+def purge_deleted_media():
+    """
+    Drains the media deletion outbox with bulk cloudinary deletes, one batch of public ids per call.
+    Failed batches are retried on later runs until `MEDIA_DELETION_MAX_ATTEMPTS` is reached.
+    """
+    # Prevents overlapping runs from deleting the same batches
+    if not cache.add("purge_deleted_media_lock", 1, 60 * 10):
+        return
+    
+    try:
+        last_id = 0
+        while True:
+            batch = list(
+                MediaDeletion.objects.filter(
+                    id__gt=last_id, attempts__lt=settings.MEDIA_DELETION_MAX_ATTEMPTS
+                ).order_by("id")[: settings.MEDIA_DELETION_BATCH_SIZE]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            batch.sort(key=lambda deletion: deletion.resource_type)
+            for resource_type, deletions in groupby(batch, key=lambda deletion: deletion.resource_type):
+                deletions = list(deletions)
+                try:
+                    response = delete_resources(
+                        [deletion.public_id for deletion in deletions],
+                        resource_type=resource_type,
+                        api_key=settings.CLOUDINARY_STORAGE["API_KEY"],
+                        api_secret=settings.CLOUDINARY_STORAGE["API_SECRET"],
+                        cloud_name=settings.CLOUDINARY_STORAGE["CLOUD_NAME"],
+                    )
+                except Exception as exc:
+                    MediaDeletion.objects.filter(id__in=[deletion.id for deletion in deletions]).update(
+                        attempts=F("attempts") + 1, last_error=str(exc)
+                    )
+                    continue
+
+                # Files that are already gone count as deleted
+                deleted = response.get("deleted", {})
+                purged_ids = [
+                    deletion.id for deletion in deletions
+                    if deleted.get(deletion.public_id) in ("deleted", "not_found")
+                ]
+                MediaDeletion.objects.filter(id__in=purged_ids).delete()
+                MediaDeletion.objects.filter(
+                    id__in=[deletion.id for deletion in deletions if deletion.id not in purged_ids]
+                ).update(attempts=F("attempts") + 1, last_error="Not deleted by cloudinary.")
+    finally:
+        cache.delete("purge_deleted_media_lock")
 
-    
\ No newline at end of file
+
+@shared_task
+def reconcile_palette_genre_counts():
+    """
+    Recomputes the genre counts from the `artwork_genre` table, correcting counts that drifted
+    (e.g. through queryset updates that send no signals). Returns the number of corrected genres.
+    """
+    if not cache.add("reconcile_genre_counts_lock", 1, 60 * 10):
+        return
+    
+    try:
+        return reconcile_genre_counts()
+    finally:
+        cache.delete("reconcile_genre_counts_lock")
+
+
+@shared_task
+def flush_popularity_counts():
+    """
+    Writes the artwork view and cart add counts recorded in redis to the stats tables in bulk.
+    Returns the number of updated artworks.
+    """
+    if not cache.add("flush_popularity_counts_lock", 1, 60 * 10):
+        return
+    
+    try:
+        return flush_popularity()
+    finally:
+        cache.delete("flush_popularity_counts_lock")
+
+
+@shared_task
+def build_palette_similar_artworks():
+    """
+    Recomputes the precomputed similar artworks of every artwork.
+    Returns the number of artworks processed.
+    """
+    if not cache.add("build_similar_artworks_lock", 1, 60 * 10):
+        return
+    
+    try:
+        # The lock is renewed after each block, so it lasts as long as the run but expires soon after a crash
+        return build_similar_artworks(on_block=lambda: cache.touch("build_similar_artworks_lock", 60 * 10))
+    finally:
+        cache.delete("build_similar_artworks_lock")
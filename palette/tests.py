@@ -3,18 +3,63 @@ from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
 from django.contrib.auth import get_user_model
-
-from .models import Genre, Artwork
-from .cart import Cart
+from django.utils.text import slugify
+from django.utils import timezone
+from django.db import connection, DatabaseError
+from django.apps import apps
+
+from .models import Genre, Artwork, ArtworkGenre, ArtworkImageHash, CartItem, MediaDeletion, ArtworkStats, ArtistStats
+from .serializers import ArtworkSerializer
+from .cart import Cart, CART_DIRTY_SET
+from .utils import (
+    get_list_generation,
+    get_palette_object,
+    get_cache_stats,
+    get_artwork,
+    resolve_genre_ids,
+    get_artist_artwork_list_type,
+)
+from .views import PalettePagination
+from .tasks import (
+    persist_carts,
+    update_palette_cache_details,
+    purge_deleted_media,
+    reconcile_palette_genre_counts,
+    flush_popularity_counts,
+    build_palette_similar_artworks,
+    index_artwork_colors,
+    ingest_artwork_image,
+)
+from .facets import get_genre_counts
+from .signals import create_artwork_genre_index, ARTWORK_GENRE_INDEX
+from .popularity import ARTWORK_VIEWS_KEY, ARTWORK_CART_ADDS_KEY, get_artwork_viewers_key, get_artist_viewers_key
+from .colors import extract_dominant_colors
+from .export import export_artworks, iterate_export_chunks
+from .recommendations import load_artwork_features, get_profiles, COLOR_LEVELS, COLOR_WEIGHT
+from portal.redis_client import get_redis_connection
+from portal.cache import LocalCache, local_cache
+from portal.codec import dumps, loads
 from user.models import Artist, Collector
 
 from rest_framework.test import APITestCase, override_settings
+from asgiref.sync import async_to_sync
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.throttling import SimpleRateThrottle
 from cloudinary.api import resource
+from PIL import Image
+from io import BytesIO
 import os
-from time import sleep
+import tempfile
+import shutil
 import pickle
+import json
+from time import sleep
 from uuid import uuid4
+from unittest.mock import patch
+from types import SimpleNamespace
+from decimal import Decimal
+import numpy as np
 
 
 User = get_user_model()
@@ -22,6 +67,24 @@ static_dir = settings.STATICFILES_DIRS[0]
 image_file = settings.BASE_DIR/"static/image/test.png"
 
 
+def isolate_test(test_case):
+    """
+    Clears the caches and redis before and after a test, and lifts the throttle rates while it runs,
+    so it doesn't depend on the state left by other tests or have to wait for the throttle window to pass.
+    `SimpleRateThrottle` reads the rates setting once, at import, so they are patched rather than overridden.
+    """
+    def clear():
+        cache.clear()
+        local_cache.clear()
+        get_redis_connection().flushdb()
+
+    clear()
+    test_case.addCleanup(clear)
+    throttle_rates = patch.object(SimpleRateThrottle, "THROTTLE_RATES", {"anon": None, "user": None})
+    throttle_rates.start()
+    test_case.addCleanup(throttle_rates.stop)
+
+
 @override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
 class GenreListTestViewCase(APITestCase):
     def setUp(self):
@@ -50,44 +113,47 @@ class GenreListTestViewCase(APITestCase):
         cache.clear()
 
         # Anonymous user
-        self.client.get(self.genre_list)
-        self.assertIsNotNone(cache.get("genre_list"))
+        response = self.client.get(self.genre_list)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 3)
+        self.assertEqual(response.json()["results"][0]["name"], genre.name)
         
         # Logged-in user
-        self.client.get(
-            self.genre_list,
-            headers={"Authorization": f"Bearer {self.token.data["access"]}"}
-        )
-        # Checks that queries are cached properly
-        self.assertIsNotNone(cache.get("genre_list"))
-        cache.clear()
-        
         response1 = self.client.get(
             self.genre_list,
             headers={"Authorization": f"Bearer {self.token.data["access"]}"}
         )
         self.assertEqual(response1.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response1.data), 3)
-        self.assertEqual(response1.data["results"][0]["name"], genre.name)
-        self.assertIsNotNone(cache.get("genre_list"))
+        self.assertEqual(len(response1.json()), 3)
+        self.assertEqual(response1.json()["results"][0]["name"], genre.name)
 
     def test_get_genres_from_cache_success(self):
         genre = Genre.objects.create(name="Vector")
-        genres = Genre.objects.all()
-        cache.set("genre_list", pickle.dumps(genres))
+        cache.clear()
         
         response = self.client.get(self.genre_list)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 3)
-        self.assertEqual(response.data["results"][0]["name"], genre.name)
+        self.assertEqual(response.json()["results"][0]["name"], genre.name)
 
-        response1 = self.client.get(
+        # Checks that cached pages are served without querying the database
+        with self.assertNumQueries(0):
+            response1 = self.client.get(self.genre_list)
+        self.assertEqual(response1.status_code, status.HTTP_200_OK)
+        self.assertEqual(response1.content, response.content)
+        
+    def test_get_genres_cache_invalidated_on_create(self):
+        cache.clear()
+        self.client.get(self.genre_list)
+        
+        self.client.post(
             self.genre_list,
-            headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+            data={"name": "Cubism"},
+            headers={"Authorization": f"Bearer {self.token.data["access"]}"}   
         )
-        self.assertEqual(response1.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response1.data), 3)
-        self.assertEqual(response1.data["results"][0]["name"], genre.name)
+        response = self.client.get(self.genre_list)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"]), 2)
+        self.assertEqual(response.json()["results"][0]["name"], "Cubism")
 
     def test_create_genre_success(self):
         data = {"name": "Cubism"}
@@ -191,12 +257,31 @@ class GenreDetailViewTestCase(APITestCase):
         self.assertIsInstance(response.data, dict)
 
     def test_get_genre_from_cache_success(self):
-        cache.set(f"genre_{self.genre.slug}", pickle.dumps(self.genre))
+        cache.set(f"genre_{self.genre.slug}", dumps(self.genre))
         
         response = self.client.get(self.genre_detail)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["name"], self.genre.name)
 
+    def test_get_genre_from_local_cache_success(self):
+        cache.clear()
+        local_cache.clear()
+        self.client.get(self.genre_detail)
+        self.client.get(self.genre_detail)  # Copies the redis entry into the in-process cache
+        
+        cache.delete(f"genre_{self.genre.slug}")
+        with self.assertNumQueries(0):
+            response = self.client.get(self.genre_detail)
+        self.assertEqual(response.data["name"], self.genre.name)
+        
+        self.client.put(
+            self.genre_detail,
+            data={"name": "Cubism"},
+            headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+        )
+        self.assertIsNone(local_cache.get(f"genre_{self.genre.slug}"))
+        self.assertIsNone(local_cache.get("genre_list_generation"))
+
     def test_get_genre_failure(self):
         url = reverse("palette:genre-detail", kwargs={"slug": "not-a-genre"})
 
@@ -221,6 +306,60 @@ class GenreDetailViewTestCase(APITestCase):
         self.assertEqual(response1.status_code, 200)
         self.assertEqual(response1.data["slug"], "cubism")
 
+    def test_put_genre_bumps_list_generation(self):
+        genre_list = reverse("palette:genre-list")
+        generation = get_list_generation("genre")
+        response = self.client.get(genre_list)
+        self.assertEqual(response.json()["results"][0]["name"], "Abstract")
+
+        self.client.put(
+            self.genre_detail,
+            data={"name": "Cubism"},
+            headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+        )
+        self.assertEqual(get_list_generation("genre"), generation + 1)
+        
+        response1 = self.client.get(genre_list)
+        self.assertEqual(response1.json()["results"][0]["name"], "Cubism")
+
+    def test_get_genre_not_modified(self):
+        response = self.client.get(self.genre_detail)
+        etag = response.headers["ETag"]
+        # Genre counts change without updating the genre, so no Last-Modified date is given
+        self.assertNotIn("Last-Modified", response.headers)
+        
+        response1 = self.client.get(self.genre_detail, headers={"If-None-Match": etag})
+        self.assertEqual(response1.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response1.content, b"")
+        
+        self.client.put(
+            self.genre_detail,
+            data={"name": "Abstract Art"},
+            headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+        )
+        genre_detail1 = reverse("palette:genre-detail", kwargs={"slug": "abstract-art"})
+        response2 = self.client.get(genre_detail1, headers={"If-None-Match": etag})
+        self.assertEqual(response2.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response2.headers["ETag"], etag)
+        
+    def test_get_genre_list_not_modified(self):
+        genre_list = reverse("palette:genre-list")
+        etag = self.client.get(genre_list).headers["ETag"]
+        
+        # Cached and uncached pages of the same generation share an ETag
+        response = self.client.get(genre_list, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.get(genre_list).headers["ETag"], etag)
+        
+        self.client.put(
+            self.genre_detail,
+            data={"name": "Cubism"},
+            headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+        )
+        response1 = self.client.get(genre_list, headers={"If-None-Match": etag})
+        self.assertEqual(response1.status_code, status.HTTP_200_OK)
+        self.assertEqual(response1.json()["results"][0]["name"], "Cubism")
+
     def test_put_genre_failure(self):
         response = self.client.put(
             self.genre_detail,
@@ -316,27 +455,44 @@ class ArtworkListTestViewCase(APITestCase):
         artwork.genre.set([self.genre.id])
         cache.clear()
 
-        self.client.get(self.artwork_list)
-        # Checks that queries are cached properly
-        self.assertIsNotNone(cache.get("artwork_list"))
-        cache.clear()
-
         response = self.client.get(self.artwork_list)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 3)
-        self.assertEqual(response.data["results"][0]["name"], artwork.name)
-        self.assertIsNotNone(cache.get("artwork_list"))
+        self.assertEqual(len(response.json()), 3)
+        self.assertEqual(response.json()["results"][0]["name"], artwork.name)
+        self.assertEqual(response.json()["results"][0]["genre"], [self.genre.name])
+
+    def test_get_artworks_after_genre_update(self):
+        artwork = Artwork.objects.create(name="Mona Lisa", artist=self.artist)
+        artwork.genre.set([self.genre.id])
+        artist_artwork_list = reverse("palette:artist-artwork-list", kwargs={"artist_id": self.artist.id})
+        etag = self.client.get(self.artwork_list).headers["ETag"]
+        etag1 = self.client.get(artist_artwork_list).headers["ETag"]
+        
+        # Cached pages render genre names, so renaming a genre invalidates them
+        self.genre.name = "Appropriation Art"
+        self.genre.save()
+        update_palette_cache_details(self.genre.slug, "genre")
+        response = self.client.get(self.artwork_list, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"][0]["genre"], ["Appropriation Art"])
+        response1 = self.client.get(artist_artwork_list, headers={"If-None-Match": etag1})
+        self.assertEqual(response1.status_code, status.HTTP_200_OK)
+        self.assertEqual(response1.json()["results"][0]["genre"], ["Appropriation Art"])
 
     def test_get_artwork_from_cache_success(self):
         artwork = Artwork.objects.create(name="Scream", artist=self.artist)
         artwork.genre.set([self.genre.id])
-        artworks = Artwork.objects.all()
-        cache.set("artwork_list", pickle.dumps(artworks))
+        cache.clear()
 
         response = self.client.get(self.artwork_list)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 3)
-        self.assertEqual(response.data["results"][0]["name"], artwork.name)
+        self.assertEqual(response.json()["results"][0]["name"], artwork.name)
+
+        # Checks that cached pages are served without querying the database
+        with self.assertNumQueries(0):
+            response1 = self.client.get(self.artwork_list)
+        self.assertEqual(response1.status_code, status.HTTP_200_OK)
+        self.assertEqual(response1.content, response.content)
 
     def test_create_artwork_success(self):
         name = str(uuid4())
@@ -392,6 +548,816 @@ class ArtworkListTestViewCase(APITestCase):
         sleep(15)
 
 
+def get_noise_image(name, seed, size=(400, 300), image_format="PNG"):
+    # Detailed image whose near-duplicates (e.g. resized or re-encoded copies) share its perceptual hash
+    pixels = np.random.default_rng(seed).integers(0, 256, (24, 32, 3), dtype=np.uint8)
+    buffer = BytesIO()
+    Image.fromarray(pixels).resize(size, Image.BICUBIC).save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f"image/{image_format.lower()}")
+
+
+local_media_root = tempfile.mkdtemp()
+local_storages = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@override_settings(
+    CELERY_TASK_ALWAYS_EAGER=True,
+    CELERY_TASK_EAGER_PROPAGATES=True,
+    ARTWORK_ASYNC_INGESTION=True,
+    STORAGES=local_storages,  # Local filesystem stand-in for cloudinary
+    MEDIA_ROOT=local_media_root,
+    ARTWORK_STAGING_ROOT=os.path.join(local_media_root, "temp_uploads"),
+)
+class ArtworkIngestionTestCase(APITestCase):
+    def setUp(self):
+        isolate_test(self)
+        # Files left by other tests would change the staged file counts, and the names new files are stored under
+        shutil.rmtree(local_media_root, ignore_errors=True)
+        self.user1 = User.objects.create_user(
+            email="user1@gmail.com", username="user1", password="Test,123"
+        )
+        self.artist = Artist.objects.create(user=self.user1)
+        Genre.objects.create(name="Appropriation", slug="appropriation")
+        
+        self.artwork_list = reverse("palette:artwork-list")
+        self.jwt_login = reverse("user:jwt-login")
+        self.token = self.client.post(
+            self.jwt_login, data={"email": self.user1.email, "password": "Test,123"}
+        )
+
+    def test_create_artwork_async_success(self):
+        with open(image_file, "rb") as image:
+            data = {"name": "Staged", "genres": ["Appropriation"], "image": image}
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.post(
+                    self.artwork_list,
+                    data,
+                    headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+                )
+                
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["image_status"], Artwork.ImageStatus.PROCESSING)
+        self.assertIsNone(response.data["image"])
+        self.assertEqual(len(os.listdir(settings.ARTWORK_STAGING_ROOT)), 1)
+        
+        # Runs the ingestion task queued after the commit
+        for callback in callbacks:
+            callback()
+        
+        artwork = Artwork.objects.get(id=response.data["id"])
+        self.assertEqual(artwork.image_status, Artwork.ImageStatus.READY)
+        self.assertTrue(artwork.image.name.startswith("images/"))
+        self.assertTrue(os.path.exists(artwork.image.path))
+        self.assertEqual(len(os.listdir(settings.ARTWORK_STAGING_ROOT)), 0)
+
+    def test_create_artwork_async_insert_failure(self):
+        os.makedirs(settings.ARTWORK_STAGING_ROOT, exist_ok=True)
+        staged_names = set(os.listdir(settings.ARTWORK_STAGING_ROOT))
+        with (
+            patch.object(Artwork.objects, "create", side_effect=DatabaseError),
+            self.assertRaises(DatabaseError),
+            open(image_file, "rb") as image,
+        ):
+            self.client.post(
+                self.artwork_list,
+                {"name": "Staged", "genres": ["Appropriation"], "image": image},
+                headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+            )
+        # The staged image is deleted along with the failed artwork
+        self.assertEqual(set(os.listdir(settings.ARTWORK_STAGING_ROOT)), staged_names)
+
+    def test_create_artwork_image_variants(self):
+        buffer = BytesIO()
+        Image.new("RGB", (1600, 1200), "teal").save(buffer, "JPEG")
+        image = SimpleUploadedFile("large.jpg", buffer.getvalue(), content_type="image/jpeg")
+        data = {"name": "Large", "genres": ["Appropriation"], "image": image, "width": 1}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.artwork_list,
+                data,
+                headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        
+        artwork = Artwork.objects.get(id=response.data["id"])
+        self.assertEqual((artwork.width, artwork.height), (1600, 1200))
+        self.assertEqual(artwork.file_size, len(buffer.getvalue()))
+        self.assertEqual(sorted(artwork.image_variants), ["1024", "320", "640"])
+        with Image.open(artwork.image.storage.path(artwork.image_variants["320"])) as variant:
+            self.assertEqual((variant.format, variant.size), ("WEBP", (320, 240)))
+        
+        data = ArtworkSerializer(artwork).data
+        self.assertTrue(data["image_variants"]["640"].endswith("_640w.webp"))
+        
+        # Dominant colours are indexed for colour searches
+        self.assertEqual(len(artwork.dominant_colors), 1)
+        response1 = self.client.get(self.artwork_list, {"color": "#008080"})
+        self.assertEqual([artwork["name"] for artwork in response1.json()["results"]], ["Large"])
+        
+        # Variants are queued for remote deletion along with the original image
+        artwork.delete()
+        self.assertEqual(MediaDeletion.objects.count(), 4)
+        
+    def test_create_artwork_png_image_variants(self):
+        # Formats that can't be downscaled while decoding are reduced before being converted
+        image = get_noise_image("large.png", 3, size=(2400, 1800))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.artwork_list,
+                {"name": "Large", "genres": ["Appropriation"], "image": image},
+                headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        artwork = Artwork.objects.get(id=response.data["id"])
+        self.assertEqual(artwork.image_status, Artwork.ImageStatus.READY)
+        self.assertEqual((artwork.width, artwork.height), (2400, 1800))
+        with Image.open(artwork.image.storage.path(artwork.image_variants["1024"])) as variant:
+            self.assertEqual((variant.format, variant.size), ("WEBP", (1024, 768)))
+
+    def test_create_artwork_too_large_failure(self):
+        with override_settings(ARTWORK_IMAGE_MAX_PIXELS=1000 * 1000):
+            response = self.client.post(
+                self.artwork_list,
+                {"name": "Huge", "genres": ["Appropriation"], "image": get_noise_image("huge.png", 4, (1200, 900))},
+                headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual("Image error. This image has too many pixels.", response.data)
+        self.assertFalse(Artwork.objects.filter(name="Huge").exists())
+
+    def test_create_artwork_duplicate_failure(self):
+        with self.captureOnCommitCallbacks():
+            response = self.client.post(
+                self.artwork_list,
+                {"name": "Original", "genres": ["Appropriation"], "image": get_noise_image("original.png", 1)},
+                headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        
+        # A resized, re-encoded copy is rejected before it is staged
+        copy = get_noise_image("copy.jpg", 1, size=(800, 600), image_format="JPEG")
+        response1 = self.client.post(
+            self.artwork_list,
+            {"name": "Copy", "genres": ["Appropriation"], "image": copy},
+            headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+        )
+        self.assertEqual(response1.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual("Image error. This image is a near-duplicate of the artwork 'Original'.", response1.data)
+        self.assertEqual(len(os.listdir(settings.ARTWORK_STAGING_ROOT)), 1)
+        
+        with self.captureOnCommitCallbacks():
+            response2 = self.client.post(
+                self.artwork_list,
+                {"name": "Other", "genres": ["Appropriation"], "image": get_noise_image("other.png", 2)},
+                headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+            )
+        self.assertEqual(response2.status_code, status.HTTP_202_ACCEPTED)
+        
+    def test_create_artwork_after_failed_ingestion(self):
+        # The hash of an image whose ingestion failed doesn't block uploading it again
+        with (
+            patch("palette.tasks.process_image", side_effect=OSError),
+            patch.object(ingest_artwork_image, "max_retries", 0),  # Runs as the last retry
+            self.assertRaises(OSError),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            response = self.client.post(
+                self.artwork_list,
+                {"name": "Failed", "genres": ["Appropriation"], "image": get_noise_image("failed.png", 5)},
+                headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+            )
+        artwork = Artwork.objects.get(name="Failed")
+        self.assertEqual(artwork.image_status, Artwork.ImageStatus.FAILED)
+        self.assertFalse(ArtworkImageHash.objects.filter(artwork=artwork).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.artwork_list,
+                {"name": "Retried", "genres": ["Appropriation"], "image": get_noise_image("failed.png", 5)},
+                headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(Artwork.objects.get(name="Retried").image_status, Artwork.ImageStatus.READY)
+
+    def test_put_artwork_image_not_hashed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                self.artwork_list,
+                {"name": "Original", "genres": ["Appropriation"], "image": get_noise_image("original.png", 1)},
+                headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+            )
+        # Images can't be updated, so they aren't hashed (or reported as a near-duplicate of themselves)
+        with patch("palette.serializers.compute_image_hash") as compute_image_hash:
+            response = self.client.put(
+                reverse("palette:artwork-detail", kwargs={"slug": "original"}),
+                {"image": get_noise_image("original.png", 1)},
+                headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual("Update error. You cannot edit the value of ['image'].", response.data)
+        compute_image_hash.assert_not_called()
+
+    def test_extract_dominant_colors(self):
+        image = Image.new("RGB", (100, 100), "#ff0000")
+        image.paste((0, 0, 255), (70, 0, 100, 100))
+        self.assertEqual(extract_dominant_colors(image), ["#ff0000", "#0000ff"])
+        
+        # Transparent pixels are left out
+        image1 = Image.new("RGBA", (100, 100), (0, 0, 0, 0))
+        image1.paste((0, 128, 0, 255), (0, 0, 10, 100))
+        self.assertEqual(extract_dominant_colors(image1), ["#008000"])
+
+
+@override_settings(
+    CELERY_TASK_ALWAYS_EAGER=True,
+    CELERY_TASK_EAGER_PROPAGATES=True,
+    STORAGES=local_storages,
+    MEDIA_ROOT=local_media_root,
+    ARTWORK_STAGING_ROOT=os.path.join(local_media_root, "temp_uploads"),
+)
+class ArtworkBulkTestCase(APITestCase):
+    def setUp(self):
+        isolate_test(self)
+        self.user1 = User.objects.create_user(
+            email="user1@gmail.com", username="user1", password="Test,123"
+        )
+        self.user2 = User.objects.create_user(
+            email="user2@gmail.com", username="user2", password="Test,123"
+        )
+        self.artist = Artist.objects.create(user=self.user1)
+        self.other_artist = Artist.objects.create(user=self.user2)
+        self.genre = Genre.objects.create(name="Appropriation", slug="appropriation")
+        
+        self.artwork_bulk = reverse("palette:artwork-bulk")
+        self.jwt_login = reverse("user:jwt-login")
+        self.token = self.client.post(
+            self.jwt_login, data={"email": self.user1.email, "password": "Test,123"}
+        )
+        
+    def get_images(self, count):
+        images = []
+        for i in range(count):
+            buffer = BytesIO()
+            Image.new("RGB", (40, 30), "teal").save(buffer, "PNG")
+            images.append(SimpleUploadedFile(f"image{i}.png", buffer.getvalue(), content_type="image/png"))
+        return images
+
+    def test_bulk_create_artworks_success(self):
+        artworks = [
+            {"name": f"Artwork {i}", "genres": ["Appropriation", "Not a genre"], "price": "10.00"} for i in range(3)
+        ]
+        generation = get_list_generation("artwork")
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                self.artwork_bulk,
+                {"artworks": json.dumps(artworks), "images": self.get_images(3)},
+                headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual([artwork["name"] for artwork in response.data], ["Artwork 0", "Artwork 1", "Artwork 2"])
+        self.assertEqual(response.data[0]["genre"], ["Appropriation"])
+        self.assertEqual(response.data[0]["image_status"], Artwork.ImageStatus.PROCESSING)
+        # The list generation is bumped once for the whole batch
+        self.assertEqual(get_list_generation("artwork"), generation + 1)
+        
+        for callback in callbacks:
+            callback()
+        self.genre.refresh_from_db()
+        self.assertEqual(self.genre.artwork_count, 3)
+        self.assertEqual(
+            Artwork.objects.filter(image_status=Artwork.ImageStatus.READY, width=40).count(), 3
+        )
+        
+    def test_bulk_create_artworks_failure(self):
+        Artwork.objects.create(name="Existing", artist=self.artist)
+        invalid_batches = [
+            ([{"name": "Artwork", "genres": []}], 2, "Expected one image per artwork."),
+            ([{"name": "Artwork", "genres": []}] * 2, 2, "Artwork names must be unique."),
+            ([{"name": "Existing", "genres": []}], 1, "Artwork with this name already exists: Existing."),
+            ([{"name": "", "genres": []}], 1, "Artwork 1: name - This field may not be blank."),
+        ]
+        for artworks, image_count, error in invalid_batches:
+            response = self.client.post(
+                self.artwork_bulk,
+                {"artworks": json.dumps(artworks), "images": self.get_images(image_count)},
+                headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(error, response.data)
+        self.assertEqual(Artwork.objects.count(), 1)
+        
+        # Near-duplicate images are rejected within the batch too
+        response1 = self.client.post(
+            self.artwork_bulk,
+            {
+                "artworks": json.dumps([{"name": f"Artwork {i}", "genres": []} for i in range(2)]),
+                "images": [get_noise_image("image0.png", 1), get_noise_image("image1.jpg", 1, image_format="JPEG")],
+            },
+            headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+        )
+        self.assertIn("Artwork 2: image - This image is a near-duplicate of another image in the batch.", response1.data)
+        self.assertEqual(Artwork.objects.count(), 1)
+
+    def test_bulk_create_artworks_insert_failure(self):
+        os.makedirs(settings.ARTWORK_STAGING_ROOT, exist_ok=True)
+        staged_names = set(os.listdir(settings.ARTWORK_STAGING_ROOT))
+        artworks = [{"name": f"Artwork {i}", "genres": []} for i in range(2)]
+        with (
+            patch.object(Artwork.objects, "bulk_create", side_effect=DatabaseError),
+            self.assertRaises(DatabaseError),
+        ):
+            self.client.post(
+                self.artwork_bulk,
+                {"artworks": json.dumps(artworks), "images": self.get_images(2)},
+                headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+            )
+        # The images staged for the batch are deleted along with it
+        self.assertEqual(set(os.listdir(settings.ARTWORK_STAGING_ROOT)), staged_names)
+        self.assertEqual(Artwork.objects.count(), 0)
+
+    def test_bulk_update_artworks_success(self):
+        artworks = [Artwork.objects.create(name=f"Artwork {i}", artist=self.artist) for i in range(2)]
+        artworks[0].genre.add(self.genre)
+        get_artwork(artworks[0].id)
+        
+        data = {
+            "artworks": [
+                {"id": str(artworks[0].id), "is_available": False, "price": "20.00"},
+                {"id": str(artworks[1].id), "genres": ["Appropriation"]},
+            ]
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                self.artwork_bulk,
+                data,
+                format="json",
+                headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data[0]["price"], "20.00")
+        self.assertFalse(response.data[0]["is_available"])
+        self.assertEqual(response.data[1]["genre"], ["Appropriation"])
+        
+        # The cached copy of the updated artwork is dropped
+        self.assertFalse(get_artwork(artworks[0].id).is_available)
+        self.genre.refresh_from_db()
+        self.assertEqual((self.genre.artwork_count, self.genre.available_artwork_count), (2, 1))
+        
+    def test_bulk_update_artworks_failure(self):
+        other_artwork = Artwork.objects.create(name="Other", artist=self.other_artist)
+        response = self.client.put(
+            self.artwork_bulk,
+            {"artworks": [{"id": str(other_artwork.id), "is_available": False}]},
+            format="json",
+            headers={"Authorization": f"Bearer {self.token.data["access"]}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Artwork does not exist or was not created by you", response.data)
+        other_artwork.refresh_from_db()
+        self.assertTrue(other_artwork.is_available)
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+class ArtworkFilterTestCase(APITestCase):
+    def setUp(self):
+        isolate_test(self)
+        self.user1 = User.objects.create_user(
+            email="user1@gmail.com", username="user1", password="Test,123"
+        )
+        self.user2 = User.objects.create_user(
+            email="user2@gmail.com", username="user2", password="Test,123"
+        )
+        self.artist1 = Artist.objects.create(user=self.user1)
+        self.artist2 = Artist.objects.create(user=self.user2)
+        
+        self.artwork_list = reverse("palette:artwork-list")
+        self.abstract = Genre.objects.create(name="Abstract", slug="abstract")
+        self.cubism = Genre.objects.create(name="Cubism", slug="cubism")
+        
+        self.artwork1 = Artwork.objects.create(
+            name="Artwork 1", artist=self.artist1, price=100, width=50, height=40
+        )
+        self.artwork1.genre.set([self.abstract.id])
+        self.artwork2 = Artwork.objects.create(
+            name="Artwork 2", artist=self.artist1, price=500, width=120, height=90, is_available=False
+        )
+        self.artwork2.genre.set([self.abstract.id, self.cubism.id])
+        self.artwork3 = Artwork.objects.create(
+            name="Artwork 3", artist=self.artist2, price=900, width=200, height=150
+        )
+        self.artwork3.genre.set([self.cubism.id])
+        cache.clear()
+        
+    def get_names(self, params):
+        response = self.client.get(self.artwork_list, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [artwork["name"] for artwork in response.json()["results"]]
+
+    def test_filter_artworks_success(self):
+        self.assertEqual(self.get_names({"genre": "abstract"}), ["Artwork 2", "Artwork 1"])
+        self.assertEqual(
+            self.get_names({"genre": "abstract,cubism"}), ["Artwork 3", "Artwork 2", "Artwork 1"]
+        )
+        self.assertEqual(self.get_names({"artist": str(self.artist2.id)}), ["Artwork 3"])
+        self.assertEqual(self.get_names({"is_available": "false"}), ["Artwork 2"])
+        self.assertEqual(self.get_names({"min_price": "200", "max_price": "600"}), ["Artwork 2"])
+        self.assertEqual(self.get_names({"min_width": "100", "max_height": "100"}), ["Artwork 2"])
+        self.assertEqual(
+            self.get_names({"genre": "cubism", "is_available": "true"}), ["Artwork 3"]
+        )
+        
+    def test_filter_artworks_by_color_success(self):
+        for artwork, colors in (
+            (self.artwork1, ["#1e3a8a", "#f5f5f4"]), (self.artwork2, ["#22348f"]), (self.artwork3, ["#b91c1c"])
+        ):
+            artwork.dominant_colors = colors
+            artwork.save()
+            index_artwork_colors(artwork)
+        
+        # Nearby colours match, including across a bucket boundary
+        self.assertEqual(self.get_names({"color": "#1f3b8c"}), ["Artwork 2", "Artwork 1"])
+        self.assertEqual(self.get_names({"color": "20409F"}), ["Artwork 2", "Artwork 1"])
+        self.assertEqual(self.get_names({"color": "#b91c1c", "is_available": "true"}), ["Artwork 3"])
+        self.assertEqual(self.get_names({"color": "#00ff00"}), [])
+        
+    def test_filter_artworks_pagination_success(self):
+        with patch.object(PalettePagination, "page_size", 1):
+            response = self.client.get(self.artwork_list, {"genre": "abstract"})
+            self.assertEqual(response.json()["results"][0]["name"], "Artwork 2")
+            self.assertIn("genre=abstract", response.json()["next"])
+            
+            response1 = self.client.get(response.json()["next"])
+            self.assertEqual(response1.json()["results"][0]["name"], "Artwork 1")
+            self.assertIsNone(response1.json()["next"])
+
+    def test_sort_artworks_success(self):
+        Artwork.objects.create(name="Artwork 4", artist=self.artist2, price=100)
+        Artwork.objects.create(name="Artwork 5", artist=self.artist2)
+        self.artwork2.save()
+        
+        self.assertEqual(
+            self.get_names({"ordering": "name"}), ["Artwork 1", "Artwork 2", "Artwork 3", "Artwork 4", "Artwork 5"]
+        )
+        self.assertEqual(self.get_names({"ordering": "-updated"})[0], "Artwork 2")
+        self.assertEqual(self.get_names({"ordering": "-price", "genre": "cubism"}), ["Artwork 3", "Artwork 2"])
+        
+        # Artworks sharing a price are paged through by id, and unpriced artworks are left out
+        for ordering, expected_prices in (("price", [100, 100, 500, 900]), ("-price", [900, 500, 100, 100])):
+            names, prices = [], []
+            with patch.object(PalettePagination, "page_size", 1):
+                url, params = self.artwork_list, {"ordering": ordering}
+                while url:
+                    response = self.client.get(url, params).json()
+                    names.extend(artwork["name"] for artwork in response["results"])
+                    prices.extend(float(artwork["price"]) for artwork in response["results"])
+                    url, params = response["next"], None
+            self.assertEqual(prices, expected_prices)
+            self.assertEqual(len(set(names)), 4)
+            cache.clear()
+
+    def test_artwork_genre_index_exists(self):
+        # Created after migrations; running it again leaves the index as it is
+        create_artwork_genre_index(apps.get_app_config("palette"), using="default")
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, ArtworkGenre._meta.db_table)
+        self.assertEqual(constraints[ARTWORK_GENRE_INDEX]["columns"], ["genre_id", "artwork_id"])
+        self.assertTrue(constraints[ARTWORK_GENRE_INDEX]["index"])
+
+    def test_filter_artworks_failure(self):
+        response = self.client.get(self.artwork_list, {"min_price": "600", "max_price": "200"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual("Price error. min_price cannot be greater than max_price.", response.data)
+        
+        response1 = self.client.get(self.artwork_list, {"artist": "not-an-artist"})
+        self.assertEqual(response1.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response2 = self.client.get(self.artwork_list, {"ordering": "artist"})
+        self.assertEqual(response2.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response3 = self.client.get(self.artwork_list, {"color": "blue"})
+        self.assertEqual(response3.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual("Color error. Enter a colour in the #rrggbb format.", response3.data)
+
+
+class ArtworkSerializerGenreTestCase(APITestCase):
+    def setUp(self):
+        isolate_test(self)
+        user = User.objects.create_user(
+            email="user1@gmail.com", username="user1", password="Test,123"
+        )
+        self.artist = Artist.objects.create(user=user)
+        self.artwork = Artwork.objects.create(name="Artwork", artist=self.artist)
+        self.genre_names = [f"Genre {i}" for i in range(15)]
+        for name in self.genre_names:
+            Genre.objects.create(name=name, slug=slugify(name))
+
+    def test_update_artwork_genres_in_bulk_success(self):
+        serializer = ArtworkSerializer(
+            self.artwork, data={"genres": self.genre_names}, partial=True
+        )
+        self.assertTrue(serializer.is_valid())
+        
+        # Queries to fill the genre slug map, update the artwork, read its current links, insert the new links
+        # and increment the genre counts
+        with self.assertNumQueries(5):
+            serializer.save()
+        self.assertEqual(self.artwork.genre.count(), 15)
+        
+        # The genre slug map is then served from the in-process cache
+        with self.assertNumQueries(0):
+            self.assertEqual(len(resolve_genre_ids(self.genre_names)), 15)
+            
+    def test_genre_slug_map_invalidated_on_write(self):
+        self.assertNotIn("genre-15", resolve_genre_ids(["Genre 15"]))
+        genre = Genre.objects.create(name="Genre 15", slug="genre-15")
+        self.assertIsNone(local_cache.get("genre_slug_map"))
+        self.assertEqual(resolve_genre_ids(["Genre 15"]), {"genre-15": genre.id})
+
+    def test_update_artwork_genres_failure(self):
+        serializer = ArtworkSerializer(
+            self.artwork, data={"genres": ["Genre 1", "Not a genre"]}, partial=True
+        )
+        self.assertTrue(serializer.is_valid())
+        with self.assertRaises(ValidationError):
+            serializer.save()
+        self.assertEqual(self.artwork.genre.count(), 0)
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+class GenreCountTestCase(APITestCase):
+    def setUp(self):
+        isolate_test(self)
+        user = User.objects.create_user(
+            email="user1@gmail.com", username="user1", password="Test,123"
+        )
+        self.artist = Artist.objects.create(user=user)
+        self.artwork = Artwork.objects.create(name="Artwork", artist=self.artist)
+        self.genre1 = Genre.objects.create(name="Abstract", slug="abstract")
+        self.genre2 = Genre.objects.create(name="Cubism", slug="cubism")
+
+    def assertGenreCounts(self, genre, artwork_count, available_artwork_count):
+        genre.refresh_from_db()
+        self.assertEqual((genre.artwork_count, genre.available_artwork_count), (artwork_count, available_artwork_count))
+        self.assertEqual(get_genre_counts([genre.id])[genre.id], (artwork_count, available_artwork_count))
+
+    def test_genre_counts_maintained_on_write(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.artwork.genre.set([self.genre1, self.genre2])
+        self.assertGenreCounts(self.genre1, 1, 1)
+        self.assertGenreCounts(self.genre2, 1, 1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.artwork.is_available = False
+            self.artwork.save()
+        self.assertGenreCounts(self.genre1, 1, 0)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.artwork.genre.remove(self.genre2)
+        self.assertGenreCounts(self.genre2, 0, 0)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.artist.delete()
+        self.assertGenreCounts(self.genre1, 0, 0)
+
+    def test_genre_counts_maintained_on_serializer_update(self):
+        serializer = ArtworkSerializer(
+            self.artwork, data={"genres": ["Abstract", "Cubism"], "is_available": False}, partial=True
+        )
+        self.assertTrue(serializer.is_valid())
+        with self.captureOnCommitCallbacks(execute=True):
+            serializer.save()
+        self.assertGenreCounts(self.genre1, 1, 0)
+        self.assertGenreCounts(self.genre2, 1, 0)
+
+    def test_reconcile_genre_counts(self):
+        # Links inserted without counting them drift from the count columns
+        ArtworkGenre.objects.create(artwork=self.artwork, genre=self.genre1)
+        self.genre1.refresh_from_db()
+        self.assertEqual(self.genre1.artwork_count, 0)
+        
+        self.assertEqual(reconcile_palette_genre_counts(), 1)
+        self.assertGenreCounts(self.genre1, 1, 1)
+        self.assertGenreCounts(self.genre2, 0, 0)
+        self.assertEqual(reconcile_palette_genre_counts(), 0)
+
+    def test_get_genre_counts_from_mirror(self):
+        genre_detail = reverse("palette:genre-detail", kwargs={"slug": self.genre1.slug})
+        response = self.client.get(genre_detail)
+        self.assertEqual(response.data["artwork_count"], 0)
+        etag = response.headers["ETag"]
+        
+        # The cached genre object is served with the counts from the redis mirror
+        with self.captureOnCommitCallbacks(execute=True):
+            self.artwork.genre.add(self.genre1)
+        response1 = self.client.get(genre_detail, headers={"If-None-Match": etag})
+        self.assertEqual(response1.status_code, status.HTTP_200_OK)
+        self.assertEqual(response1.data["artwork_count"], 1)
+        self.assertEqual(response1.data["available_artwork_count"], 1)
+        
+        response2 = self.client.get(reverse("palette:genre-list"))
+        self.assertEqual(response2.json()["results"][-1]["artwork_count"], 1)
+
+
+class LocalCacheTestCase(APITestCase):
+    def test_local_cache_evicts_least_recently_used(self):
+        local = LocalCache(max_entries=2, timeout=10)
+        local.set("a", 1)
+        local.set("b", 2)
+        local.get("a")
+        local.set("c", 3)
+        self.assertIsNone(local.get("b"))
+        self.assertEqual(local.get("a"), 1)
+        self.assertEqual(local.get("c"), 3)
+        
+    def test_local_cache_expiry(self):
+        local = LocalCache(max_entries=2, timeout=0)
+        local.set("a", 1)
+        self.assertIsNone(local.get("a"))
+
+
+class CacheCodecTestCase(APITestCase):
+    def setUp(self):
+        isolate_test(self)
+        user = User.objects.create_user(
+            email="user1@gmail.com", username="user1", password="Test,123"
+        )
+        artist = Artist.objects.create(user=user)
+        self.genre = Genre.objects.create(name="Abstract", slug="abstract")
+        artwork = Artwork.objects.create(name="Artwork", artist=artist, price=Decimal("10.50"))
+        artwork.genre.set([self.genre.id])
+        self.artwork = Artwork.objects.for_listing().get(id=artwork.id)
+
+    def test_artwork_round_trip(self):
+        serialized_artwork = ArtworkSerializer(self.artwork).data
+        cached_artwork = loads(dumps(self.artwork))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(ArtworkSerializer(cached_artwork).data, serialized_artwork)
+        self.assertEqual(cached_artwork.id, self.artwork.id)
+        self.assertEqual(cached_artwork.price, Decimal("10.50"))
+        self.assertEqual(cached_artwork.created, self.artwork.created)
+        self.assertEqual(cached_artwork.artist.user.username, "user1")
+
+    def test_plain_data_round_trip(self):
+        data = {"ids": [self.artwork.id], "slug": self.genre.slug, "count": 1}
+        self.assertEqual(loads(dumps(data)), data)
+
+    def test_other_versions_decode_as_miss(self):
+        self.assertIsNone(loads(None))
+        self.assertIsNone(loads(b"\x00" + dumps(self.genre)[1:]))
+        self.assertIsNone(loads(pickle.dumps(self.genre)))
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+class ArtworkListingQueryTestCase(APITestCase):
+    def setUp(self):
+        isolate_test(self)
+        self.artwork_list = reverse("palette:artwork-list")
+        self.genres = [
+            Genre.objects.create(name=f"Genre {i}", slug=f"genre-{i}") for i in range(3)
+        ]
+        
+        for i in range(20):
+            user = User.objects.create_user(
+                email=f"artist{i}@gmail.com", username=f"artist{i}", password="Test,123"
+            )
+            artist = Artist.objects.create(user=user)
+            artwork = Artwork.objects.create(name=f"Artwork {i}", artist=artist)
+            artwork.genre.set([genre.id for genre in self.genres])
+
+    def test_artwork_list_query_count_is_constant(self):
+        # One query for the page of artworks (joined with artists and users) and one for their genres
+        for page_size in (5, 15):
+            cache.clear()
+            with patch.object(PalettePagination, "page_size", page_size):
+                with self.assertNumQueries(2):
+                    response = self.client.get(self.artwork_list)
+                    
+            self.assertEqual(len(response.json()["results"]), page_size)
+            self.assertEqual(len(response.json()["results"][0]["genre"]), 3)
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+class KeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        isolate_test(self)
+        self.artwork_list = reverse("palette:artwork-list")
+        user = User.objects.create_user(
+            email="artist@gmail.com", username="artist", password="Test,123"
+        )
+        artist = Artist.objects.create(user=user)
+        for i in range(7):
+            Artwork.objects.create(name=f"Artwork {i}", artist=artist)
+        # Rows sharing a `created` value, as written by bulk inserts
+        Artwork.objects.update(created=timezone.now())
+
+    def test_pages_with_tied_created_values(self):
+        names = []
+        with patch.object(PalettePagination, "page_size", 3):
+            response = self.client.get(self.artwork_list)
+            pages = [response.json()]
+            while pages[-1]["next"]:
+                pages.append(self.client.get(pages[-1]["next"]).json())
+            
+            # Following `previous` from the last page returns the page before it
+            previous_page = self.client.get(pages[-1]["previous"]).json()
+            
+        for page in pages:
+            names.extend(artwork["name"] for artwork in page["results"])
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(sorted(names), [f"Artwork {i}" for i in range(7)])
+        self.assertEqual(previous_page["results"], pages[1]["results"])
+
+    def test_position_filter_bounds_leading_field(self):
+        # The leading field is bounded on its own, so the ordering's index scan starts at the cursor
+        paginator = PalettePagination()
+        artwork = Artwork.objects.first()
+        position_filter = paginator.get_position_filter(Artwork, paginator.ordering, paginator.get_position(artwork))
+        self.assertEqual(position_filter.children[0], ("created__lte", artwork.created))
+        
+        paginator.set_ordering("name")
+        position_filter1 = paginator.get_position_filter(Artwork, paginator.ordering, paginator.get_position(artwork))
+        self.assertEqual(position_filter1.children[0], ("name__gte", artwork.name))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.artwork_list, {"cursor": "cD1bIm5vdC1hLWRhdGUiXQ=="})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+class ArtistArtworkListTestCase(APITestCase):
+    def setUp(self):
+        isolate_test(self)
+        self.artists = []
+        for i in range(2):
+            user = User.objects.create_user(
+                email=f"artist{i}@gmail.com", username=f"artist{i}", password="Test,123"
+            )
+            artist = Artist.objects.create(user=user)
+            self.artists.append(artist)
+            for j in range(3):
+                Artwork.objects.create(name=f"Artwork {i}-{j}", artist=artist, is_available=j != 0)
+        
+        self.artist_artwork_list = reverse(
+            "palette:artist-artwork-list", kwargs={"artist_id": self.artists[0].id}
+        )
+        self.other_artist_artwork_list = reverse(
+            "palette:artist-artwork-list", kwargs={"artist_id": self.artists[1].id}
+        )
+
+    def test_get_artist_artworks_success(self):
+        response = self.client.get(self.artist_artwork_list)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [artwork["name"] for artwork in response.json()["results"]],
+            ["Artwork 0-2", "Artwork 0-1", "Artwork 0-0"],
+        )
+        
+        # The first page is served from the cache
+        with self.assertNumQueries(0):
+            response1 = self.client.get(self.artist_artwork_list)
+        self.assertEqual(response1.content, response.content)
+        
+        response2 = self.client.get(self.artist_artwork_list, {"is_available": "false"})
+        self.assertEqual(len(response2.json()["results"]), 1)
+
+    def test_get_artist_artworks_pagination_success(self):
+        with patch.object(PalettePagination, "page_size", 2):
+            response = self.client.get(self.artist_artwork_list)
+            self.assertEqual(len(response.json()["results"]), 2)
+            
+            response1 = self.client.get(response.json()["next"])
+        self.assertEqual(response1.status_code, status.HTTP_200_OK)
+        self.assertEqual([artwork["name"] for artwork in response1.json()["results"]], ["Artwork 0-0"])
+
+    def test_get_artist_artworks_invalidated_on_write(self):
+        self.client.get(self.artist_artwork_list)
+        self.client.get(self.other_artist_artwork_list)
+        
+        Artwork.objects.create(name="Artwork 0-3", artist=self.artists[0])
+        response = self.client.get(self.artist_artwork_list)
+        self.assertEqual(len(response.json()["results"]), 4)
+        
+        # Other artists' cached pages are kept
+        with self.assertNumQueries(0):
+            self.client.get(self.other_artist_artwork_list)
+            
+        Artwork.objects.filter(name="Artwork 0-3").delete()
+        response1 = self.client.get(self.artist_artwork_list)
+        self.assertEqual(len(response1.json()["results"]), 3)
+
+    def test_get_artist_artworks_failure(self):
+        response = self.client.get(
+            reverse("palette:artist-artwork-list", kwargs={"artist_id": uuid4()})
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data, "Artist does not exist.")
+
+
 @override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
 class ArtworkDetailViewTestCase(APITestCase):
     def setUp(self):
@@ -441,21 +1407,79 @@ class ArtworkDetailViewTestCase(APITestCase):
         cache.clear()
 
         self.client.get(self.artwork_detail)
-        # Checks that queries are cached properly
-        self.assertIsNotNone(cache.get(f"artwork_{self.artwork.slug}"))
+        # Checks that queries are cached properly, under the artwork's id and slug alias
+        self.assertIsNotNone(cache.get(f"artwork_{self.artwork.id}"))
+        self.assertEqual(loads(cache.get(f"artwork_slug_{self.artwork.slug}")), str(self.artwork.id))
         cache.clear()
 
         response = self.client.get(self.artwork_detail)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(self.name, response.data["name"])
 
+    def test_get_artwork_single_flight_success(self):
+        cache.clear()
+        stats = get_cache_stats()
+        cache_key = f"artwork_slug_{self.artwork.slug}"
+        # Simulates a concurrent request that holds the fill lock and fills the cache while this one waits
+        cache.add(f"{cache_key}_fill_lock", 1)
+        cache.set(f"artwork_{self.artwork.id}", dumps(self.artwork))
+        fill_cache = lambda seconds: cache.set(cache_key, dumps(str(self.artwork.id)))
+        with patch("palette.utils.sleep", side_effect=fill_cache), self.assertNumQueries(0):
+            artwork = get_palette_object(self.artwork.slug, "artwork")
+            
+        self.assertEqual(artwork.id, self.artwork.id)
+        self.assertEqual(get_cache_stats().get("collapsed", 0), stats.get("collapsed", 0) + 1)
+        
+    def test_get_artwork_single_flight_fallback(self):
+        cache.clear()
+        stats = get_cache_stats()
+        cache.add(f"artwork_slug_{self.artwork.slug}_fill_lock", 1)
+        with patch("palette.utils.FILL_WAIT_TIMEOUT", 0):
+            artwork = get_palette_object(self.artwork.slug, "artwork")
+            
+        self.assertEqual(artwork.id, self.artwork.id)
+        self.assertIsNone(cache.get(f"artwork_slug_{self.artwork.slug}"))
+        self.assertEqual(get_cache_stats().get("fallbacks", 0), stats.get("fallbacks", 0) + 1)
+        
+    def test_get_cache_stats(self):
+        url = reverse("palette:cache-stats")
+        response = self.client.get(url, headers={"Authorization": f"Bearer {self.token1.data["access"]}"})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        
+        admin = User.objects.create_superuser(
+            email="admin@gmail.com", username="admin", password="Test,123"
+        )
+        token = self.client.post(self.jwt_login, data={"email": admin.email, "password": "Test,123"})
+        cache.clear()
+        self.client.get(self.artwork_detail)
+        response1 = self.client.get(url, headers={"Authorization": f"Bearer {token.data["access"]}"})
+        self.assertEqual(response1.status_code, status.HTTP_200_OK)
+        self.assertGreaterEqual(response1.data["fills"], 1)
+
     def test_get_artwork_from_cache_success(self):
-        cache.set(f"artwork_{self.artwork.slug}", pickle.dumps(self.artwork))
+        cache.set(f"artwork_slug_{self.artwork.slug}", dumps(str(self.artwork.id)))
+        cache.set(f"artwork_{self.artwork.id}", dumps(self.artwork))
 
         response = self.client.get(self.artwork_detail)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["name"], self.artwork.name)
 
+    def test_put_artwork_refreshes_cart_cache(self):
+        # Cart endpoints read the same id-keyed entry as the detail view
+        self.client.get(self.artwork_detail)
+        self.client.put(
+            self.artwork_detail,
+            data={"price": "250.00", "is_available": False},
+            headers={"Authorization": f"Bearer {self.token1.data["access"]}"}
+        )
+        self.assertEqual(get_artwork(self.artwork.id).price, Decimal("250.00"))
+        
+        url = reverse("palette:cart-detail", kwargs={"artwork_id": self.artwork.id})
+        response = self.client.post(
+            url, data={"quantity": 1}, headers={"Authorization": f"Bearer {self.token3.data["access"]}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_get_artwork_failure(self):
         url = reverse("palette:artwork-detail", kwargs={"slug": "not-an-artwork"})
 
@@ -472,6 +1496,19 @@ class ArtworkDetailViewTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
         self.assertEqual(False, response.data["is_available"])
         
+    def test_put_artwork_genres_success(self):
+        # The cached copy carries the artwork's prefetched genres
+        self.client.get(self.artwork_detail)
+        Genre.objects.create(name="Cubism", slug="cubism")
+        response = self.client.put(
+            self.artwork_detail,
+            data={"genres": ["Cubism"]},
+            headers={"Authorization": f"Bearer {self.token1.data["access"]}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(sorted(response.data["genre"]), ["Abstract", "Cubism"])
+        self.assertEqual(sorted(self.client.get(self.artwork_detail).data["genre"]), ["Abstract", "Cubism"])
+        
     def test_put_artwork_failure(self):
         response2 = self.client.put(
             self.artwork_detail,
@@ -497,13 +1534,11 @@ class ArtworkDetailViewTestCase(APITestCase):
 
     def test_delete_artwork_success(self):
         url2 = reverse("palette:artwork-list")
-        self.client.get(url2)
-        self.assertIsNotNone(cache.get("artwork_list"))
+        response1 = self.client.get(url2)
+        self.assertEqual(1, len(response1.json()["results"]))
         
-        cache.set(f"artwork_{self.artwork.slug}", pickle.dumps(self.artwork))
-
         self.client.get(self.artwork_detail)
-        self.assertIsNotNone(cache.get(f"artwork_{self.artwork.slug}"))
+        self.assertIsNotNone(cache.get(f"artwork_{self.artwork.id}"))
 
         public_id = self.artwork.image.name
         response = self.client.delete(
@@ -511,8 +1546,15 @@ class ArtworkDetailViewTestCase(APITestCase):
             headers={"Authorization": f"Bearer {self.token1.data["access"]}"}
         )
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
-        self.assertEqual(0, len(pickle.loads(cache.get("artwork_list"))))
-        self.assertIsNone(cache.get(f"artwork_{self.artwork.slug}"))
+        self.assertIsNone(cache.get(f"artwork_{self.artwork.id}"))
+        self.assertIsNone(cache.get(f"artwork_slug_{self.artwork.slug}"))
+        
+        response2 = self.client.get(url2)
+        self.assertEqual(0, len(response2.json()["results"]))
+        
+        self.assertTrue(MediaDeletion.objects.filter(public_id=public_id, resource_type="image").exists())
+        purge_deleted_media()
+        self.assertFalse(MediaDeletion.objects.filter(public_id=public_id).exists())
 
         result = None
         try:
@@ -523,6 +1565,15 @@ class ArtworkDetailViewTestCase(APITestCase):
 
         self.assertIn("Resource not found", result)
         
+    def test_purge_deleted_media_failure(self):
+        MediaDeletion.objects.create(public_id="artworks/missing")
+        with patch("palette.tasks.delete_resources", side_effect=Exception("Service unavailable.")):
+            purge_deleted_media()
+            
+        deletion = MediaDeletion.objects.get(public_id="artworks/missing")
+        self.assertEqual(deletion.attempts, 1)
+        self.assertEqual(deletion.last_error, "Service unavailable.")
+        
     def test_delete_artwork_failure(self):
         response = self.client.delete(self.artwork_detail)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -597,6 +1648,50 @@ class CartListTestCase(APITestCase):
         sleep(15)
 
 
+class CartReadModelTestCase(APITestCase):
+    def setUp(self):
+        isolate_test(self)
+        user1 = User.objects.create_user(
+            email="user1@gmail.com", username="user1", password="Test,123"
+        )
+        self.user2 = User.objects.create_user(
+            email="user2@gmail.com", username="user2", password="Test,123"
+        )
+        artist = Artist.objects.create(user=user1)
+        self.artworks = [
+            Artwork.objects.create(
+                name=f"Artwork {i}", slug=f"artwork-{i}", artist=artist, price=f"{i}0.50"
+            )
+            for i in range(1, 6)
+        ]
+        cache.clear()
+        
+    def test_cart_items_query_count_is_constant(self):
+        cart = Cart(SimpleNamespace(user=self.user2))
+        for artwork in self.artworks:
+            cart.add(artwork, 2)
+        
+        # Snapshots are loaded with one bulk query, then served from the cache
+        with self.assertNumQueries(1):
+            items, total_price = cart.get_items()
+        with self.assertNumQueries(0):
+            items, total_price = cart.get_items()
+            
+        self.assertEqual(len(items), 5)
+        self.assertEqual(total_price, Decimal("305.00"))
+        self.assertEqual(items[0]["artwork"]["name"], self.artworks[0].name)
+        self.assertEqual(items[0]["total_price"], "21.00")
+        
+    def test_cart_snapshot_invalidated_on_update(self):
+        cart = Cart(SimpleNamespace(user=self.user2))
+        cart.add(self.artworks[0])
+        cart.get_items()
+        
+        Artwork.objects.filter(id=self.artworks[0].id).update(price="99.00")
+        update_palette_cache_details(self.artworks[0].slug, "artwork")
+        self.assertEqual(cart.get_total_price(), Decimal("99.00"))
+
+
 @override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
 class CartDetailTestCase(APITestCase):
     def setUp(self):
@@ -720,9 +1815,331 @@ class CartDetailTestCase(APITestCase):
         response = self.client.delete(self.cart_detail)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         self.assertEqual("Authentication credentials were not provided.", response.data)
+
+    def test_persist_and_restore_cart_success(self):
+        self.client.post(
+            self.cart_detail,
+            data={"quantity": 2},
+            headers={"Authorization": f"Bearer {self.token2.data["access"]}"}
+        )
+        persist_carts()
+        cart_item = CartItem.objects.get(user=self.user2)
+        self.assertEqual(cart_item.artwork_id, self.artwork.id)
+        self.assertEqual(cart_item.quantity, 2)
+        
+        # An expired cart hash is restored from the persisted copy
+        get_redis_connection().delete(f"cart_{self.user2.id}")
+        response = self.client.get(
+            reverse("palette:cart-list"),
+            headers={"Authorization": f"Bearer {self.token2.data["access"]}"}
+        )
+        self.assertEqual(2, list(response.data)[0]["quantity"])
+        
+        self.client.delete(
+            self.cart_detail,
+            headers={"Authorization": f"Bearer {self.token2.data["access"]}"}
+        )
+        persist_carts()
+        self.assertFalse(CartItem.objects.filter(user=self.user2).exists())
+        
+    def test_persist_carts_failure_keeps_carts_dirty(self):
+        self.client.post(
+            self.cart_detail,
+            data={"quantity": 2},
+            headers={"Authorization": f"Bearer {self.token2.data["access"]}"}
+        )
+        with patch.object(CartItem.objects, "bulk_create", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                persist_carts()
+        self.assertTrue(get_redis_connection().sismember(CART_DIRTY_SET, str(self.user2.id)))
+        
+        persist_carts()
+        self.assertEqual(CartItem.objects.get(user=self.user2).quantity, 2)
         
     def tearDown(self):
         artwork = Artwork.objects.filter(id=self.artwork.id)
         artwork.delete()
         super().tearDown()
         sleep(15)
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+class PopularityTestCase(APITestCase):
+    def setUp(self):
+        isolate_test(self)
+        self.jwt_login = reverse("user:jwt-login")
+        
+        self.user1 = User.objects.create_user(
+            email="user1@gmail.com", username="user1", password="Test,123"
+        )
+        self.user2 = User.objects.create_user(
+            email="user2@gmail.com", username="user2", password="Test,123"
+        )
+        self.artist = Artist.objects.create(user=self.user1)
+        self.collector = Collector.objects.create(user=self.user2)
+        self.artwork = Artwork.objects.create(name="Popular", slug="popular", artist=self.artist)
+        
+        self.artwork_detail = reverse("palette:artwork-detail", kwargs={"slug": self.artwork.slug})
+        self.cart_detail = reverse("palette:cart-detail", kwargs={"artwork_id": self.artwork.id})
+        self.token1 = self.client.post(
+            self.jwt_login, data={"email": self.user1.email, "password": "Test,123"}
+        )
+        self.token2 = self.client.post(
+            self.jwt_login, data={"email": self.user2.email, "password": "Test,123"}
+        )
+        
+    def test_flush_popularity_counts_success(self):
+        response = self.client.get(self.artwork_detail, REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(response.data["popularity"], {"views": 0, "unique_viewers": 0, "cart_adds": 0})
+        self.client.get(self.artwork_detail, REMOTE_ADDR="10.0.0.1")
+        self.client.get(
+            self.artwork_detail, headers={"Authorization": f"Bearer {self.token2.data["access"]}"}
+        )
+        self.client.post(self.cart_detail, headers={"Authorization": f"Bearer {self.token2.data["access"]}"})
+        
+        generation = get_list_generation("artwork")
+        artist_generation = get_list_generation(get_artist_artwork_list_type(self.artist.id))
+        self.assertEqual(flush_popularity_counts(), 1)
+        # List pages show the counts too, so the affected lists move to a new generation
+        self.assertEqual(get_list_generation("artwork"), generation + 1)
+        self.assertEqual(get_list_generation(get_artist_artwork_list_type(self.artist.id)), artist_generation + 1)
+        self.assertEqual(
+            ArtworkStats.objects.values("view_count", "unique_viewers", "cart_add_count").get(artwork=self.artwork),
+            {"view_count": 3, "unique_viewers": 2, "cart_add_count": 1},
+        )
+        self.assertEqual(ArtistStats.objects.get(artist=self.artist).view_count, 3)
+        
+        # The cached artwork is refilled with the flushed counts, under a new ETag
+        response1 = self.client.get(self.artwork_detail, headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(response1.status_code, status.HTTP_200_OK)
+        self.assertEqual(response1.data["popularity"], {"views": 3, "unique_viewers": 2, "cart_adds": 1})
+        
+        response2 = self.client.get(
+            reverse("user:artist-profile-detail", kwargs={"profile_id": self.artist.id}),
+            headers={"Authorization": f"Bearer {self.token1.data["access"]}"},
+        )
+        self.assertEqual(response2.data["popularity"], {"views": 3, "unique_viewers": 2, "cart_adds": 1})
+        
+        # Later counts are added to the flushed ones
+        self.client.get(self.artwork_detail, REMOTE_ADDR="10.0.0.2")
+        flush_popularity_counts()
+        self.assertEqual(ArtworkStats.objects.get(artwork=self.artwork).view_count, 5)
+        self.assertEqual(ArtistStats.objects.get(artist=self.artist).unique_viewers, 4)
+        self.assertEqual(flush_popularity_counts(), 0)
+        
+    def test_flush_popularity_counts_failure(self):
+        self.client.get(self.artwork_detail)
+        self.client.post(self.cart_detail, headers={"Authorization": f"Bearer {self.token2.data["access"]}"})
+        
+        # Counts that could not be written are kept for the next run
+        with patch("palette.popularity.upsert_stats", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                flush_popularity_counts()
+        redis = get_redis_connection()
+        self.assertEqual(int(redis.hget(ARTWORK_VIEWS_KEY, str(self.artwork.id))), 1)
+        self.assertEqual(int(redis.hget(ARTWORK_CART_ADDS_KEY, str(self.artwork.id))), 1)
+        
+        self.assertEqual(flush_popularity_counts(), 1)
+        self.assertEqual(ArtworkStats.objects.get(artwork=self.artwork).cart_add_count, 1)
+
+    def test_delete_viewer_estimates(self):
+        self.client.get(self.artwork_detail)
+        redis = get_redis_connection()
+        viewers_keys = [get_artwork_viewers_key(self.artwork.id), get_artist_viewers_key(self.artist.id)]
+        self.assertEqual(redis.exists(*viewers_keys), 2)
+        
+        # Deleting the artist cascades to its artworks, and both viewer estimates are deleted
+        with self.captureOnCommitCallbacks(execute=True):
+            self.artist.delete()
+        self.assertEqual(redis.exists(*viewers_keys), 0)
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+class ArtworkSimilarTestCase(APITestCase):
+    def setUp(self):
+        isolate_test(self)
+        self.artists = [
+            Artist.objects.create(
+                user=User.objects.create_user(email=f"artist{i}@gmail.com", username=f"artist{i}", password="Test,123")
+            )
+            for i in range(2)
+        ]
+        self.genres = [Genre.objects.create(name=name, slug=slugify(name)) for name in ["Abstract", "Cubism", "Pop"]]
+        
+        def create_artwork(name, artist, genres, price=None, is_available=True):
+            artwork = Artwork.objects.create(
+                name=name, slug=slugify(name), artist=artist, price=price, is_available=is_available
+            )
+            artwork.genre.set(genres)
+            return artwork
+        
+        self.artwork = create_artwork("Base", self.artists[0], self.genres[:2], Decimal("100"))
+        # Same genres and price band, another artist
+        self.close_artwork = create_artwork("Close", self.artists[1], self.genres[:2], Decimal("110"))
+        # One shared genre and the same artist, another price band
+        self.related_artwork = create_artwork("Related", self.artists[0], self.genres[:1], Decimal("1000"))
+        # Nothing in common
+        create_artwork("Unrelated", self.artists[1], self.genres[2:])
+        create_artwork("Sold", self.artists[0], self.genres[:2], Decimal("100"), is_available=False)
+        
+        self.artwork_similar = reverse("palette:artwork-similar", kwargs={"slug": self.artwork.slug})
+        
+    def test_get_similar_artworks_success(self):
+        response = self.client.get(self.artwork_similar)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+        
+        # Small blocks exercise merging the top matches across column blocks
+        with override_settings(ARTWORK_SIMILARITY_BLOCK_SIZE=2, ARTWORK_SIMILAR_COUNT=3):
+            self.assertEqual(build_palette_similar_artworks(), 5)
+        response1 = self.client.get(self.artwork_similar)
+        self.assertEqual([artwork["name"] for artwork in response1.data], ["Close", "Related"])
+        
+        # Artworks made unavailable since the build are left out
+        self.close_artwork.is_available = False
+        self.close_artwork.save()
+        update_palette_cache_details(self.close_artwork.slug, "artwork")
+        response2 = self.client.get(self.artwork_similar)
+        self.assertEqual([artwork["name"] for artwork in response2.data], ["Related"])
+        
+    def test_get_similar_artworks_by_color_success(self):
+        # Near colours (in the same coarse bucket) count towards similarity, and distant ones don't
+        Artwork.objects.filter(name__in=["Base", "Related", "Unrelated"]).update(dominant_colors=["#1030c0"])
+        Artwork.objects.filter(name="Related").update(dominant_colors=["#1838c8", "#f0f0f0"])
+        Artwork.objects.filter(name="Close").update(dominant_colors=["#e02010"])
+        build_palette_similar_artworks()
+        response = self.client.get(self.artwork_similar)
+        self.assertEqual([artwork["name"] for artwork in response.data], ["Related", "Close", "Unrelated"])
+
+    def test_load_artwork_features_sparse_profiles(self):
+        Artwork.objects.filter(name="Base").update(dominant_colors=["#1030c0", "#1838c8"])
+        features = load_artwork_features()
+        # Only the 8 genre links and the merged colour bucket are stored, not a dense row per artwork
+        self.assertEqual(len(features.profile_columns), 9)
+        
+        profiles = get_profiles(features, slice(0, len(features.ids)))
+        self.assertEqual(profiles.shape, (5, 3 + COLOR_LEVELS ** 3))
+        base = profiles[list(features.ids).index(str(self.artwork.id))]
+        # Both colours share a bucket, so the colour part is a single entry worth the colour weight
+        np.testing.assert_allclose(sorted(base[base > 0]), [np.sqrt(COLOR_WEIGHT), 1 / np.sqrt(2), 1 / np.sqrt(2)])
+
+    def test_build_similar_artworks_renews_lock(self):
+        with (
+            override_settings(ARTWORK_SIMILARITY_BLOCK_SIZE=2),
+            patch.object(cache, "touch", wraps=cache.touch) as touch,
+        ):
+            self.assertEqual(build_palette_similar_artworks(), 5)
+        # Renewed after each full block of the 5 artworks
+        self.assertEqual(touch.call_count, 2)
+        touch.assert_called_with("build_similar_artworks_lock", 60 * 10)
+        
+    def test_get_similar_artworks_failure(self):
+        response = self.client.get(reverse("palette:artwork-similar", kwargs={"slug": "missing"}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data, "Artwork does not exist.")
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+class ArtworkExportTestCase(APITestCase):
+    def setUp(self):
+        isolate_test(self)
+        self.admin = User.objects.create_superuser(email="admin@gmail.com", username="admin", password="Test,123")
+        self.user = User.objects.create_user(email="user1@gmail.com", username="user1", password="Test,123")
+        self.artist = Artist.objects.create(user=self.user)
+        self.genres = [Genre.objects.create(name=name, slug=slugify(name)) for name in ["Abstract", "Cubism"]]
+        
+        self.artworks = []
+        for i in range(3):
+            artwork = Artwork.objects.create(
+                name=f"Artwork {i}", slug=f"artwork-{i}", artist=self.artist, price=Decimal("100.50")
+            )
+            artwork.genre.set(self.genres[:i])
+            self.artworks.append(artwork)
+        
+        self.artwork_export = reverse("palette:artwork-export")
+        self.jwt_login = reverse("user:jwt-login")
+        self.admin_token = self.client.post(self.jwt_login, data={"email": self.admin.email, "password": "Test,123"})
+        self.user_token = self.client.post(self.jwt_login, data={"email": self.user.email, "password": "Test,123"})
+        
+    def get_export(self, events=None, **params):
+        """
+        Requests the export through the ASGI handler, returning the response and the parts it was streamed in.
+        Each part received is recorded in `events`, if given.
+        """
+        async def get_streamed_export():
+            response = await self.async_client.get(
+                self.artwork_export, params, headers={"Authorization": f"Bearer {self.admin_token.data["access"]}"}
+            )
+            parts = []
+            if response.streaming:
+                async for part in response.streaming_content:
+                    parts.append(part)
+                    if events is not None:
+                        events.append("part")
+            return response, parts
+        
+        return async_to_sync(get_streamed_export)()
+        
+    def test_export_artworks_ndjson_success(self):
+        response, parts = self.get_export()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertIn("X-Export-Timestamp", response)
+        
+        rows = [json.loads(line) for line in b"".join(parts).decode().splitlines()]
+        self.assertEqual([row["name"] for row in rows], ["Artwork 0", "Artwork 1", "Artwork 2"])
+        self.assertEqual(rows[2]["genres"], ["Abstract", "Cubism"])
+        self.assertEqual(rows[0]["artist"], "user1")
+        self.assertEqual(rows[0]["price"], "100.50")
+        
+        # One query for the artworks and one for the genres of each chunk
+        with override_settings(ARTWORK_EXPORT_CHUNK_SIZE=2), self.assertNumQueries(3):
+            self.assertEqual(len(list(export_artworks("ndjson"))), 2)
+        
+    def test_export_artworks_streamed_in_chunks(self):
+        # Each chunk of artworks is sent before the next one is queried, rather than the whole export at the end
+        events = []
+        
+        def record_chunks(*args, **kwargs):
+            for chunk in iterate_export_chunks(*args, **kwargs):
+                events.append("chunk")
+                yield chunk
+        
+        with (
+            override_settings(ARTWORK_EXPORT_CHUNK_SIZE=2),
+            patch("palette.export.iterate_export_chunks", record_chunks),
+        ):
+            response, parts = self.get_export(events)
+        self.assertTrue(response.is_async)
+        self.assertEqual(events, ["chunk", "part", "chunk", "part"])
+        self.assertEqual([len(part.decode().splitlines()) for part in parts], [2, 1])
+        
+        with override_settings(ARTWORK_EXPORT_CHUNK_SIZE=2):
+            response1, parts1 = self.get_export(export_format="csv")
+        self.assertEqual([len(part.decode().splitlines()) for part in parts1], [1, 2, 1])
+        
+    def test_export_artworks_incremental_csv_success(self):
+        updated_since = timezone.now()
+        self.artworks[1].name = "Updated"
+        self.artworks[1].save()
+        
+        response, parts = self.get_export(export_format="csv", updated_since=updated_since.isoformat())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        
+        lines = b"".join(parts).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("id,name,slug,description,artist,genres"))
+        self.assertIn(",Updated,artwork-1,", lines[1])
+        self.assertIn(",user1,Abstract,", lines[1])
+        
+    def test_export_artworks_failure(self):
+        response = self.client.get(
+            self.artwork_export, headers={"Authorization": f"Bearer {self.user_token.data["access"]}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        
+        response1, _ = self.get_export(export_format="xml")
+        self.assertEqual(response1.status_code, status.HTTP_400_BAD_REQUEST)
+
+
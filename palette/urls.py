@@ -5,8 +5,13 @@ from .views import (
     ArtworkListView,
     GenreDetailView,
     ArtworkDetailView,
+    ArtworkSimilarView,
+    ArtworkBulkView,
+    ArtworkExportView,
+    ArtistArtworkListView,
     CartListView,
     CartDetailView,
+    CacheStatsView,
 )
 
 
@@ -18,6 +23,11 @@ urlpatterns = [
     path("genre/<slug:slug>/", GenreDetailView.as_view(), name="genre-detail"),
     path("artwork/", ArtworkListView.as_view(), name="artwork-list"),
     path("artwork/<slug:slug>/", ArtworkDetailView.as_view(), name="artwork-detail"),
+    path("artwork/<slug:slug>/similar/", ArtworkSimilarView.as_view(), name="artwork-similar"),
+    path("bulk/artwork/", ArtworkBulkView.as_view(), name="artwork-bulk"),
+    path("export/artwork/", ArtworkExportView.as_view(), name="artwork-export"),
+    path("artist/<uuid:artist_id>/artworks/", ArtistArtworkListView.as_view(), name="artist-artwork-list"),
     path("cart/", CartListView.as_view(), name="cart-list"),
     path("cart/<str:artwork_id>/", CartDetailView.as_view(), name="cart-detail"),
+    path("cache-stats/", CacheStatsView.as_view(), name="cache-stats"),
 ]
@@ -0,0 +1,317 @@
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.http import HttpResponse
+from django.utils.text import slugify
+from django.conf import settings
+
+from .models import Genre, Artwork
+from portal.redis_client import get_redis_connection
+from portal.cache import get_tiered, invalidate_tiered
+from portal.codec import dumps, loads
+
+from rest_framework.renderers import JSONRenderer
+from datetime import datetime, timezone
+from time import time, sleep, monotonic
+from uuid import uuid4, UUID
+from urllib.parse import urlencode
+from hashlib import md5
+
+
+PAGE_CACHE_TIMEOUT = 60 * 15
+SNAPSHOT_CACHE_TIMEOUT = 60 * 60
+FILL_LOCK_TIMEOUT = 10
+FILL_WAIT_TIMEOUT = 0.5
+FILL_POLL_INTERVAL = 0.05
+CACHE_STATS_KEY = "palette_cache_stats"
+GENRE_SLUG_MAP_KEY = "genre_slug_map"
+
+# Object types whose list generation, pages and objects are also cached in-process
+TIERED_OBJECT_TYPES = {"genre"}
+
+
+def get_list_generation(object_type):
+    """
+    Retrieves the current generation of a genre/artwork list.
+    Cached pages are keyed by generation, so bumping it invalidates every page at once.
+    """
+    generation_key = f"{object_type}_list_generation"
+    if object_type in TIERED_OBJECT_TYPES:
+        generation = get_tiered(generation_key)
+    else:
+        generation = cache.get(generation_key)
+    if generation is None:
+        # Seeding with the current time keeps a restarted counter ahead of evicted generations
+        cache.add(generation_key, int(time() * 1000), None)
+        generation = cache.get(generation_key)
+    return generation
+
+
+def bump_list_generation(object_type):
+    """
+    Atomically increments the generation of a genre/artwork list.
+    Readers rebuild the pages of the new generation lazily.
+    """
+    generation_key = f"{object_type}_list_generation"
+    cache.set(f"{object_type}_list_modified", time(), None)
+    try:
+        generation = cache.incr(generation_key)
+    except ValueError:
+        cache.add(generation_key, int(time() * 1000), None)
+        generation = cache.incr(generation_key)
+        
+    if object_type in TIERED_OBJECT_TYPES:
+        invalidate_tiered(generation_key, shared=False)
+    return generation
+
+
+def get_artist_artwork_list_type(artist_id):
+    # List type of one artist's artworks, whose generation is bumped on each write to the artist's artworks
+    return f"artist_{artist_id}_artwork"
+
+
+def get_list_last_modified(*object_types):
+    # Time of the latest generation bump of any of the lists, used as the `Last-Modified` of every page of a list
+    modified = cache.get_many([f"{object_type}_list_modified" for object_type in object_types]).values()
+    if modified:
+        return datetime.fromtimestamp(max(modified), tz=timezone.utc)
+
+
+def record_cache_event(event):
+    # Counts cache fill outcomes in a redis hash, read by the cache stats view
+    get_redis_connection().hincrby(CACHE_STATS_KEY, event, 1)
+
+
+def get_cache_stats():
+    return {event.decode(): int(count) for event, count in get_redis_connection().hgetall(CACHE_STATS_KEY).items()}
+
+
+def get_or_fill_cache(cache_key, fill):
+    """
+    Retrieves and decodes a cached value, or fills it on a miss with the value returned by `fill` (None if missing).
+    Only the request holding the fill lock runs `fill`; concurrent misses briefly wait for its result,
+    and only query the db themselves if the fill takes longer than `FILL_WAIT_TIMEOUT`.
+    """
+    value = loads(cache.get(cache_key))
+    if value is not None:
+        return value
+    
+    lock_key = f"{cache_key}_fill_lock"
+    if cache.add(lock_key, 1, FILL_LOCK_TIMEOUT):
+        record_cache_event("fills")
+        try:
+            value = fill()
+            if value is not None:
+                cache.set(cache_key, dumps(value))
+        finally:
+            cache.delete(lock_key)
+        return value
+    
+    deadline = monotonic() + FILL_WAIT_TIMEOUT
+    while monotonic() < deadline:
+        sleep(FILL_POLL_INTERVAL)
+        value = loads(cache.get(cache_key))
+        if value is not None:
+            record_cache_event("collapsed")
+            return value
+        
+    record_cache_event("fallbacks")
+    return fill()
+
+
+def load_palette_object(slug, object_type):
+    # Retrieves a genre/artwork object from the db, with the relations its serializer reads
+    if object_type == "genre":
+        return Genre.objects.filter(slug=slug).first()
+    return Artwork.objects.for_listing().filter(slug=slug).first()
+
+
+def get_palette_object(slug, object_type):
+    """
+    Retrieves a genre/artwork object from the cache, filling it in a single flight on a miss.
+    Artworks are resolved through their slug alias. Returns None if the object does not exist.
+    """
+    if object_type == "artwork":
+        return get_artwork_by_slug(slug)
+    
+    cache_key = f"{object_type}_{slug}"
+    item = loads(get_tiered(cache_key))
+    if item is None:
+        item = get_or_fill_cache(cache_key, lambda: load_palette_object(slug, object_type))
+    return item
+
+
+def get_artwork_cache_key(artwork_id):
+    # Canonical cache key of an artwork; every read path resolves to it
+    return f"artwork_{artwork_id}"
+
+
+def get_artwork_alias_key(slug):
+    # Maps an artwork's slug to its id
+    return f"artwork_slug_{slug}"
+
+
+def cache_artwork(artwork):
+    cache.set_many(
+        {
+            get_artwork_cache_key(artwork.id): dumps(artwork),
+            get_artwork_alias_key(artwork.slug): dumps(str(artwork.id)),
+        }
+    )
+
+
+def invalidate_artwork_cache(artwork_id, slug=None):
+    # Drops an artwork's canonical entry and snapshot, and its slug alias (only needed on delete)
+    cache_keys = [get_artwork_cache_key(artwork_id), f"artwork_snapshot_{artwork_id}"]
+    if slug is not None:
+        cache_keys.append(get_artwork_alias_key(slug))
+    cache.delete_many(cache_keys)
+
+
+def get_artwork(artwork_id):
+    """
+    Retrieves an artwork by id from its canonical cache entry, filling it in a single flight on a miss.
+    Returns None if the id is malformed or the artwork does not exist.
+    """
+    try:
+        artwork_id = UUID(str(artwork_id))
+    except ValueError:
+        return None
+    
+    return get_or_fill_cache(
+        get_artwork_cache_key(artwork_id),
+        lambda: Artwork.objects.for_listing().filter(id=artwork_id).first(),
+    )
+
+
+def get_artwork_by_slug(slug):
+    """
+    Retrieves an artwork by slug, resolving the slug to its id through the alias entry.
+    An alias miss loads the artwork once, and fills both its alias and canonical entries.
+    """
+    def fill_alias():
+        artwork = load_palette_object(slug, "artwork")
+        if artwork is None:
+            return None
+        cache.set(get_artwork_cache_key(artwork.id), dumps(artwork))
+        return str(artwork.id)
+    
+    artwork_id = get_or_fill_cache(get_artwork_alias_key(slug), fill_alias)
+    return get_artwork(artwork_id) if artwork_id is not None else None
+
+
+def get_page_cache_key(object_type, paginator, request, filters=None, dependencies=()):
+    """
+    Builds the cache key of a single list page from the endpoint, cursor and page size.
+    Validated filters are hashed into the key so each filter combination is cached separately.
+    `dependencies` are the other list types whose objects are rendered in the page (e.g. the genres of artworks);
+    their generations are part of the key, so bumping them also invalidates the page.
+    """
+    generation = "_".join(str(get_list_generation(list_type)) for list_type in (object_type, *dependencies))
+    cursor = request.query_params.get(paginator.cursor_query_param, "")
+    page_size = paginator.get_page_size(request)
+    cache_key = f"{object_type}_list_page_{generation}_{page_size}_{cursor}"
+    if filters:
+        filter_string = urlencode(sorted(filters.items()), doseq=True)
+        cache_key += f"_{md5(filter_string.encode()).hexdigest()}"
+    return cache_key
+
+
+def get_cached_page(cache_key, tiered=False):
+    """
+    Retrieves the rendered JSON bytes of a cached list page, also checking the in-process cache if `tiered`.
+    Returns None if the page has not been cached.
+    """
+    content = get_tiered(cache_key) if tiered else cache.get(cache_key)
+    if content is not None:
+        return HttpResponse(content, content_type="application/json")
+
+
+def cache_page(cache_key, paginator, data):
+    """
+    Renders a paginated list page to JSON bytes and caches it.
+    """
+    paginated_data = paginator.get_paginated_response(data).data
+    content = JSONRenderer().render(paginated_data)
+    cache.set(cache_key, content, PAGE_CACHE_TIMEOUT)
+    return HttpResponse(content, content_type="application/json")
+
+
+def get_genre_slug_map():
+    # Dict of every genre's `{slug: id}`, cached in-process and in redis
+    return get_tiered(GENRE_SLUG_MAP_KEY, fill=lambda: dict(Genre.objects.values_list("slug", "id")))
+
+
+def resolve_genre_ids(genre_names):
+    """
+    Resolves a list of genre names to a dict of `{slug: id}` from the cached genre slug map.
+    Slugs missing from the map (e.g. genres created since it was cached) are looked up in a single query.
+    Names without a matching genre are left out.
+    """
+    slugs = {slugify(genre_name) for genre_name in genre_names}
+    if not slugs:
+        return {}
+    
+    genre_slug_map = get_genre_slug_map()
+    genre_ids = {slug: genre_slug_map[slug] for slug in slugs if slug in genre_slug_map}
+    missing_slugs = slugs - genre_ids.keys()
+    if missing_slugs:
+        genre_ids.update(Genre.objects.filter(slug__in=missing_slugs).values_list("slug", "id"))
+    return genre_ids
+
+
+def build_artwork_snapshot(artwork):
+    # Compact artwork data used by the cart read model
+    return {
+        "id": str(artwork.id),
+        "name": artwork.name,
+        "slug": artwork.slug,
+        "image": artwork.image.url if artwork.image else None,
+        "price": None if artwork.price is None else str(artwork.price),
+        "is_available": artwork.is_available,
+    }
+
+
+def get_artwork_snapshots(artwork_ids):
+    """
+    Retrieves compact artwork snapshots as a dict of `{artwork_id: snapshot}`.
+    Cached snapshots are read with a single multi-get; the rest are loaded with one bulk query and cached.
+    """
+    cache_keys = {f"artwork_snapshot_{artwork_id}": str(artwork_id) for artwork_id in artwork_ids}
+    snapshots = {
+        cache_keys[cache_key]: snapshot
+        for cache_key, snapshot in cache.get_many(cache_keys.keys()).items()
+    }
+    
+    missing_ids = [artwork_id for artwork_id in cache_keys.values() if artwork_id not in snapshots]
+    if missing_ids:
+        artworks = Artwork.objects.filter(id__in=missing_ids).only(
+            "id", "name", "slug", "image", "price", "is_available"
+        )
+        missing_snapshots = {str(artwork.id): build_artwork_snapshot(artwork) for artwork in artworks}
+        cache.set_many(
+            {f"artwork_snapshot_{artwork_id}": snapshot for artwork_id, snapshot in missing_snapshots.items()},
+            SNAPSHOT_CACHE_TIMEOUT,
+        )
+        snapshots.update(missing_snapshots)
+
+    return snapshots
+
+
+def get_staging_storage():
+    # Local storage shared by the web and worker containers for uploads awaiting ingestion
+    return FileSystemStorage(location=settings.ARTWORK_STAGING_ROOT)
+
+
+def stage_artwork_image(image):
+    """
+    Saves an uploaded image to the local staging storage.
+    Returns the staged file name, which is prefixed to avoid collisions.
+    """
+    return get_staging_storage().save(f"{uuid4().hex}_{image.name}", image)
+
+
+def delete_staged_images(staged_names):
+    # Removes staged images whose artworks were never created, so they aren't left for ingestion
+    staging_storage = get_staging_storage()
+    for staged_name in staged_names:
+        staging_storage.delete(staged_name)
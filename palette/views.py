@@ -1,33 +1,64 @@
-from django.db.transaction import atomic
+from django.db.transaction import atomic, on_commit
 from django.core.cache import cache
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 
 from .serializers import (
     GenreSerializer,
     ArtworkSerializer,
     Genre,
     Artwork,
+    Artist,
     CartUpdateSerializer,
+    ArtworkFilterSerializer,
+    ArtworkBulkCreateSerializer,
+    ArtworkBulkUpdateSerializer,
+    ArtworkExportSerializer,
 )
 from .cart import Cart
 from portal.permissions import (IsAdminOrReadOnly, IsArtistOrReadOnly, IsCreatorOrReadOnly, IsCollectorOrReadOnly)
 from user.views import JWTAuthentication, PaletteTokenAuthentication
-from .tasks import update_palette_cache_details
+from .tasks import (
+    update_palette_cache_details,
+    update_artwork_batch_cache_details,
+    ingest_artwork_image,
+    process_artwork_image,
+)
+from .utils import (
+    get_page_cache_key,
+    get_cached_page,
+    cache_page,
+    stage_artwork_image,
+    delete_staged_images,
+    get_list_generation,
+    get_list_last_modified,
+    get_palette_object,
+    get_artwork,
+    get_artwork_by_slug,
+    get_cache_stats,
+    get_artist_artwork_list_type,
+)
+from .facets import get_genre_counts
+from .popularity import get_viewer_id, get_stats, record_artwork_view, record_cart_add
+from .recommendations import get_similar_artworks
+from .export import CONTENT_TYPES, aexport_artworks
+from portal.conditional import make_etag, get_not_modified_response, set_conditional_headers
+from portal.cache import get_tier_stats, invalidate_tiered
+from portal.codec import loads
+from portal.pagination import KeysetPagination
 
 from rest_framework.views import APIView
 from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.pagination import CursorPagination
-from rest_framework.parsers import MultiPartParser
-from rest_framework.permissions import IsAuthenticated
-from uuid import UUID
-import pickle
+from rest_framework.parsers import MultiPartParser, JSONParser
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from drf_spectacular.utils import extend_schema
 
 
-class PalettePagination(CursorPagination):
+class PalettePagination(KeysetPagination):
     page_size = 15
-    ordering = "-created"
 
 
 class GenreListView(APIView):
@@ -43,20 +74,27 @@ class GenreListView(APIView):
     )
     def get(self, request):
         """
-        Retrieves an existing cached list of all existing genres.
-        If none exists, retrieves an caches a non-cached list.
+        Retrieves an existing cached page of the genre list.
+        If none exists, retrieves and caches the rendered page.
+        Returns `304 Not Modified` if the client's copy of the page is current.
         """
-        cached_genres = cache.get("genre_list")
-        if cached_genres is not None:
-            genres = pickle.loads(cached_genres)
-        else:
-            genres = Genre.objects.all()
-            cache.set("genre_list", pickle.dumps(genres))
-            
         paginator = self.pagination_class()
+        cache_key = get_page_cache_key("genre", paginator, request)
+        # Pages are versioned by their cache key, which changes with the list generation
+        etag = make_etag(cache_key)
+        last_modified = get_list_last_modified("genre")
+        not_modified = get_not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        
+        cached_page = get_cached_page(cache_key, tiered=True)
+        if cached_page is not None:
+            return set_conditional_headers(cached_page, etag, last_modified)
+
+        genres = Genre.objects.all()
         paginated_genres = paginator.paginate_queryset(genres, request, view=self)
         genre_data = self.serializer_class(paginated_genres, many=True).data
-        return paginator.get_paginated_response(genre_data)
+        return set_conditional_headers(cache_page(cache_key, paginator, genre_data), etag, last_modified)
 
     @extend_schema(
         operation_id="v1_genre_create",
@@ -70,6 +108,7 @@ class GenreListView(APIView):
                 genre = serializer.save()
 
             genre_data = self.serializer_class(genre).data
+            update_palette_cache_details.delay(genre_data["slug"], "genre")
             return Response(genre_data, status=status.HTTP_201_CREATED)
 
 
@@ -86,20 +125,26 @@ class GenreDetailView(APIView):
     def get(self, request, slug):
         """
         Retrieves an existing cached genre object.
-        If none exists, retrieves an caches an non-cached object.
+        If none exists, retrieves and caches it; concurrent misses share a single fill.
+        Returns `304 Not Modified` if the client's copy of the object is current.
         """
-        cached_genre = cache.get(f"genre_{slug}")
-        if cached_genre is not None:
-            genre = pickle.loads(cached_genre)
-        else:
-            genre = Genre.objects.filter(slug=slug).first()
-            if genre:
-                update_palette_cache_details.delay(slug, "genre")
-            else:
-                return Response("Genre does not exist.", status=status.HTTP_404_NOT_FOUND)
+        genre = get_palette_object(slug, "genre")
+        if genre is None:
+            return Response("Genre does not exist.", status=status.HTTP_404_NOT_FOUND)
+        
+        # The cached object's counts may be stale, so the current counts are read from their redis mirror
+        counts = get_genre_counts([genre.id]).get(genre.id)
+        if counts is not None:
+            genre.artwork_count, genre.available_artwork_count = counts
+            
+        # The counts change without touching `updated`, so only the ETag validates this representation
+        etag = make_etag("genre", genre.id, genre.updated, genre.artwork_count, genre.available_artwork_count)
+        not_modified = get_not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
 
         data = self.serializer_class(genre).data
-        return Response(data, status=status.HTTP_200_OK)
+        return set_conditional_headers(Response(data, status=status.HTTP_200_OK), etag)
 
     @extend_schema(
         operation_id="v1_genre_update",
@@ -110,10 +155,8 @@ class GenreDetailView(APIView):
         Updates an existing genre object.
         Also updates the cache for both genre list and corresponding genre object.
         """
-        cached_genre = cache.get(f"genre_{slug}")
-        if cached_genre is not None:
-            genre = pickle.loads(cached_genre)
-        else:
+        genre = loads(cache.get(f"genre_{slug}"))
+        if genre is None:
             genre = Genre.objects.filter(slug=slug).first()
             if not genre:
                 return Response("Genre does not exist.", status=status.HTTP_404_NOT_FOUND)
@@ -123,6 +166,10 @@ class GenreDetailView(APIView):
             with atomic():
                 genre = serializer.save()
                 
+            if genre.slug != slug:
+                # Renames also change the slug, so the entry under the old slug is dropped
+                invalidate_tiered(f"genre_{slug}")
+                
             genre_data = self.serializer_class(genre).data
             update_palette_cache_details.delay(genre_data["slug"], "genre")
             return Response(genre_data, status=status.HTTP_202_ACCEPTED)
@@ -136,10 +183,8 @@ class GenreDetailView(APIView):
         Deletes an existing genre object.
         Also deletes the cache for corresponding genre object, and updates that of genre list.
         """
-        cached_genre = cache.get(f"genre_{slug}")
-        if cached_genre is not None:
-            genre = pickle.loads(cached_genre)
-        else:
+        genre = loads(cache.get(f"genre_{slug}"))
+        if genre is None:
             genre = Genre.objects.filter(slug=slug).first()
             if not genre:
                 return Response("Genre does not exist.", status=status.HTTP_404_NOT_FOUND)
@@ -165,35 +210,70 @@ class ArtworkListView(APIView):
     )
     def get(self, request):
         """
-        Retrieves an existing cached list of all existing artworks.
-        If none exists, retrieves an caches a non-cached list.
+        Retrieves an existing cached page of the artwork list.
+        If none exists, retrieves and caches the rendered page.
+        Returns `304 Not Modified` if the client's copy of the page is current.
+        Supports filtering by genre slug(s), artist, availability, price, width and height ranges,
+        and sorting by `ordering` (creation, price, name or update time); price orderings leave out unpriced artworks.
         """
-        cached_artworks = cache.get("artwork_list")
-        if cached_artworks is not None:
-            artworks = pickle.loads(cached_artworks)
-        else:
-            artworks = Artwork.objects.all()
-            cache.set("artwork_list", pickle.dumps(artworks))
-            
+        filter_serializer = ArtworkFilterSerializer(data=request.query_params.dict())
+        filter_serializer.is_valid(raise_exception=True)
+        filters = filter_serializer.validated_data
+        
         paginator = self.pagination_class()
+        # Pages render genre names, so they are also versioned by the genre list generation
+        cache_key = get_page_cache_key("artwork", paginator, request, filters=filters, dependencies=["genre"])
+        # Pages are versioned by their cache key, which changes with the list generation
+        etag = make_etag(cache_key)
+        last_modified = get_list_last_modified("artwork", "genre")
+        not_modified = get_not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        
+        cached_page = get_cached_page(cache_key)
+        if cached_page is not None:
+            return set_conditional_headers(cached_page, etag, last_modified)
+
+        artworks = Artwork.objects.for_listing().filter_catalog(filters)
+        paginator.set_ordering(filters.get("ordering", "-created"))
         paginated_artworks = paginator.paginate_queryset(artworks, request, view=self)
         artwork_data = self.serializer_class(paginated_artworks, many=True).data
-        return paginator.get_paginated_response(artwork_data)
+        return set_conditional_headers(cache_page(cache_key, paginator, artwork_data), etag, last_modified)
 
     @extend_schema(
         operation_id="v1_artwork_create",
         tags=["artwork_v1"],
     )
     def post(self, request):
-        # Creates a new artwork object using form-data (multi-part content)
+        """
+        Creates a new artwork object using form-data (multi-part content).
+        With `ARTWORK_ASYNC_INGESTION`, the image is staged locally and uploaded by a celery task,
+        and the artwork is returned with a "processing" image status.
+        """
         serializer = self.serializer_class(
             data=request.data, context={"data": request.data, "user": request.user}
         )
         if serializer.is_valid(raise_exception=True):
+            if settings.ARTWORK_ASYNC_INGESTION:
+                staged_name = stage_artwork_image(serializer.validated_data.pop("image"))
+                try:
+                    with atomic():
+                        artwork = serializer.save(image_status=Artwork.ImageStatus.PROCESSING)
+                        on_commit(lambda: ingest_artwork_image.delay(str(artwork.id), staged_name))
+                except Exception:
+                    delete_staged_images([staged_name])
+                    raise
+
+                artwork_data = self.serializer_class(artwork).data
+                update_palette_cache_details.delay(artwork_data["slug"], "artwork")
+                return Response(artwork_data, status=status.HTTP_202_ACCEPTED)
+            
             with atomic():
                 artwork = serializer.save()
+                on_commit(lambda: process_artwork_image.delay(str(artwork.id)))
 
             artwork_data = self.serializer_class(artwork).data
+            update_palette_cache_details.delay(artwork_data["slug"], "artwork")
             return Response(artwork_data, status=status.HTTP_201_CREATED)
 
 
@@ -211,20 +291,28 @@ class ArtworkDetailView(APIView):
     def get(self, request, slug):
         """
         Retrieves an existing cached artwork object.
-        If none exists, retrieves an caches an non-cached object.
+        If none exists, retrieves and caches it; concurrent misses share a single fill.
+        Returns `304 Not Modified` if the client's copy of the object is current.
         """
-        cached_artwork = cache.get(f"artwork_{slug}")
-        if cached_artwork is not None:
-            artwork = pickle.loads(cached_artwork)
-        else:
-            artwork = Artwork.objects.filter(slug=slug).first()
-            if artwork:
-                update_palette_cache_details.delay(slug, "artwork")
-            else:
-                return Response("Artwork does not exist.", status=status.HTTP_404_NOT_FOUND)
+        artwork = get_artwork_by_slug(slug)
+        if artwork is None:
+            return Response("Artwork does not exist.", status=status.HTTP_404_NOT_FOUND)
+        
+        # Revalidated copies count as views too
+        record_artwork_view(artwork, get_viewer_id(request))
+            
+        # Genre names and popularity counts are part of the representation, so their changes also change the version
+        stats = get_stats(artwork)
+        last_modified = max(artwork.updated, stats.updated) if stats else artwork.updated
+        etag = make_etag(
+            "artwork", artwork.id, artwork.updated, stats and stats.updated, get_list_generation("genre")
+        )
+        not_modified = get_not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
 
         data = self.serializer_class(artwork).data
-        return Response(data, status=status.HTTP_200_OK)
+        return set_conditional_headers(Response(data, status=status.HTTP_200_OK), etag, last_modified)
 
     @extend_schema(
         operation_id="v1_artwork_update",
@@ -235,13 +323,9 @@ class ArtworkDetailView(APIView):
         Updates an existing artwork object.
         Also updates the cache for both artwork list and corresponding artwork object.
         """
-        cached_artwork = cache.get(f"artwork_{slug}")
-        if cached_artwork is not None:
-            artwork = pickle.loads(cached_artwork)
-        else:
-            artwork = Artwork.objects.filter(slug=slug).first()
-            if not artwork:
-                return Response("Artwork does not exist.", status=status.HTTP_404_NOT_FOUND)
+        artwork = get_artwork_by_slug(slug)
+        if artwork is None:
+            return Response("Artwork does not exist.", status=status.HTTP_404_NOT_FOUND)
 
         serializer = self.serializer_class(artwork, data=request.data, partial=True)
         if serializer.is_valid(raise_exception=True):
@@ -261,21 +345,188 @@ class ArtworkDetailView(APIView):
         Deletes an existing artwork object.
         Also deletes the cache for corresponding artwork object, and updates that of artwork list.
         """
-        cached_artwork = cache.get(f"artwork_{slug}")
-        if cached_artwork is not None:
-            artwork = pickle.loads(cached_artwork)
-        else:
-            artwork = Artwork.objects.filter(slug=slug).first()
-            if not artwork:
-                return Response("Artwork does not exist.", status=status.HTTP_404_NOT_FOUND)
+        artwork = get_artwork_by_slug(slug)
+        if artwork is None:
+            return Response("Artwork does not exist.", status=status.HTTP_404_NOT_FOUND)
             
+        artwork_id = str(artwork.id)  # The primary key is cleared on delete
         with atomic():
             artwork.delete()
             
-        update_palette_cache_details.delay(slug, "artwork", is_delete=True)
+        update_palette_cache_details.delay(slug, "artwork", is_delete=True, object_id=artwork_id)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class ArtworkSimilarView(APIView):
+    throttle_classes = [AnonRateThrottle, UserRateThrottle]
+    authentication_classes = [JWTAuthentication, PaletteTokenAuthentication]
+
+    @extend_schema(
+        operation_id="v1_artwork_similar_retrieve",
+        tags=["artwork_v1"],
+    )
+    def get(self, request, slug):
+        """
+        Retrieves compact copies of the available artworks most similar to an artwork, best match first.
+        Similar artworks are precomputed daily; new artworks have none until the next run.
+        """
+        artwork = get_artwork_by_slug(slug)
+        if artwork is None:
+            return Response("Artwork does not exist.", status=status.HTTP_404_NOT_FOUND)
+        
+        return Response(get_similar_artworks(artwork.id), status=status.HTTP_200_OK)
+
+
+class ArtworkBulkView(APIView):
+    throttle_classes = [UserRateThrottle]
+    parser_classes = [MultiPartParser, JSONParser]
+    serializer_class = ArtworkSerializer
+    authentication_classes = [JWTAuthentication, PaletteTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsArtistOrReadOnly]
+
+    @extend_schema(
+        operation_id="v1_artwork_bulk_create",
+        tags=["artwork_v1"],
+    )
+    def post(self, request):
+        """
+        Creates a batch of artworks using form-data (multi-part content), validated together and inserted in bulk.
+        Images are staged locally and uploaded by celery tasks, so artworks are returned with a "processing" image status.
+        If the batch can't be staged or inserted, the images staged so far are deleted.
+        The artwork list caches are updated once for the whole batch.
+        """
+        serializer = ArtworkBulkCreateSerializer(data=request.data, context={"user": request.user})
+        if serializer.is_valid(raise_exception=True):
+            staged_names = []
+            try:
+                for image in serializer.validated_data.pop("images"):
+                    staged_names.append(stage_artwork_image(image))
+                with atomic():
+                    artworks = serializer.save()
+                    artwork_ids = [str(artwork.id) for artwork in artworks]
+                    on_commit(
+                        lambda: [
+                            ingest_artwork_image.delay(artwork_id, staged_name)
+                            for artwork_id, staged_name in zip(artwork_ids, staged_names)
+                        ]
+                    )
+            except Exception:
+                delete_staged_images(staged_names)
+                raise
+
+            # Reloaded with the relations read by the serializer, in the order they were sent
+            listed_artworks = Artwork.objects.for_listing().in_bulk(artwork_ids)
+            artwork_data = self.serializer_class(
+                [listed_artworks[artwork.id] for artwork in artworks], many=True
+            ).data
+            update_artwork_batch_cache_details.delay(str(artworks[0].artist_id))
+            return Response(artwork_data, status=status.HTTP_202_ACCEPTED)
+
+    @extend_schema(
+        operation_id="v1_artwork_bulk_update",
+        tags=["artwork_v1"],
+    )
+    def put(self, request):
+        """
+        Updates a batch of the requesting artist's artworks, validated together and written with one bulk update.
+        The artwork caches are updated once for the whole batch.
+        """
+        serializer = ArtworkBulkUpdateSerializer(
+            Artwork.objects.filter(artist__user=request.user), data=request.data
+        )
+        if serializer.is_valid(raise_exception=True):
+            with atomic():
+                artworks = serializer.save()
+            
+            artwork_ids = [str(artwork.id) for artwork in artworks]
+            listed_artworks = Artwork.objects.for_listing().in_bulk(artwork_ids)
+            artwork_data = self.serializer_class(
+                [listed_artworks[artwork.id] for artwork in artworks], many=True
+            ).data
+            update_artwork_batch_cache_details.delay(str(artworks[0].artist_id), artwork_ids)
+            return Response(artwork_data, status=status.HTTP_202_ACCEPTED)
+
+
+class ArtworkExportView(APIView):
+    throttle_classes = [UserRateThrottle]
+    authentication_classes = [JWTAuthentication, PaletteTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    @extend_schema(
+        operation_id="v1_artwork_export_retrieve",
+        tags=["artwork_v1"],
+    )
+    def get(self, request):
+        """
+        Streams the whole artwork catalog as NDJSON (default) or CSV, oldest update first.
+        `X-Export-Timestamp` holds the time the export started, to be sent back as `updated_since`
+        for an incremental export. Deleted artworks are not reported by incremental exports.
+        """
+        serializer = ArtworkExportSerializer(data=request.query_params.dict())
+        serializer.is_valid(raise_exception=True)
+        export_format = serializer.validated_data["export_format"]
+
+        # Taken before the query, so artworks updated while streaming are exported again next time
+        started = timezone.now()
+        # Streamed from an async generator, as the app is served over ASGI (see `aexport_artworks`)
+        response = StreamingHttpResponse(
+            aexport_artworks(export_format, serializer.validated_data.get("updated_since")),
+            content_type=CONTENT_TYPES[export_format],
+        )
+        response["Content-Disposition"] = f'attachment; filename="artworks.{export_format}"'
+        response["X-Export-Timestamp"] = started.isoformat()
+        return response
+
+
+class ArtistArtworkListView(APIView):
+    throttle_classes = [AnonRateThrottle, UserRateThrottle]
+    serializer_class = ArtworkSerializer
+    authentication_classes = [JWTAuthentication, PaletteTokenAuthentication]
+    pagination_class = PalettePagination
+
+    @extend_schema(
+        operation_id="v1_artist_artwork_list_retrieve",
+        tags=["artwork_v1"],
+    )
+    def get(self, request, artist_id):
+        """
+        Retrieves a page of an artist's artworks, newest first; supports the artwork list filters.
+        The first page is cached per artist, and invalidated whenever one of the artist's artworks changes.
+        Returns `304 Not Modified` if the client's copy of the page is current.
+        """
+        filter_serializer = ArtworkFilterSerializer(data=request.query_params.dict())
+        filter_serializer.is_valid(raise_exception=True)
+        filters = {**filter_serializer.validated_data, "artist": artist_id}
+        
+        paginator = self.pagination_class()
+        list_type = get_artist_artwork_list_type(artist_id)
+        cache_key = get_page_cache_key(list_type, paginator, request, filters=filters, dependencies=["genre"])
+        etag = make_etag(cache_key)
+        last_modified = get_list_last_modified(list_type, "genre")
+        not_modified = get_not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        
+        is_first_page = not request.query_params.get(paginator.cursor_query_param)
+        if is_first_page:
+            cached_page = get_cached_page(cache_key)
+            if cached_page is not None:
+                return set_conditional_headers(cached_page, etag, last_modified)
+
+        artworks = Artwork.objects.for_listing().filter_catalog(filters)
+        paginator.set_ordering(filters.get("ordering", "-created"))
+        paginated_artworks = paginator.paginate_queryset(artworks, request, view=self)
+        if is_first_page and not paginated_artworks and not Artist.objects.filter(id=artist_id).exists():
+            return Response("Artist does not exist.", status=status.HTTP_404_NOT_FOUND)
+        
+        artwork_data = self.serializer_class(paginated_artworks, many=True).data
+        if is_first_page:
+            response = cache_page(cache_key, paginator, artwork_data)
+        else:
+            response = paginator.get_paginated_response(artwork_data)
+        return set_conditional_headers(response, etag, last_modified)
+
+
 class CartListView(APIView):
     throttle_classes = [AnonRateThrottle]
     authentication_classes = [JWTAuthentication, PaletteTokenAuthentication]
@@ -305,20 +556,16 @@ class CartDetailView(APIView):
     )
     def post(self, request, artwork_id):
         # Increments the quantity of artwork items in cart
-        cached_artwork = cache.get(f"artwork_{artwork_id}")
-        if cached_artwork is not None:
-            artwork = pickle.loads(cached_artwork)
-        else:
-            artwork = Artwork.available.filter(id=artwork_id).first()
-            if not artwork:
-                return Response("Artwork does not exist.", status=status.HTTP_404_NOT_FOUND)
-            update_palette_cache_details.delay(artwork.slug, "artwork", object_id=artwork.id)
+        artwork = get_artwork(artwork_id)
+        if artwork is None or not artwork.is_available:
+            return Response("Artwork does not exist.", status=status.HTTP_404_NOT_FOUND)
 
         serializer = self.serializer_class(
             data=request.data, context={"request": request, "artwork": artwork}
         )
         if serializer.is_valid(raise_exception=True):
             cart_data = serializer.save()
+            record_cart_add(artwork.id)
             return Response(cart_data, status=status.HTTP_201_CREATED)
 
     @extend_schema(
@@ -327,14 +574,9 @@ class CartDetailView(APIView):
     )
     def put(self, request, artwork_id):
         # Sets the quantity of artwork items in cart to a specific value
-        cached_artwork = cache.get(f"artwork_{artwork_id}")
-        if cached_artwork is not None:
-            artwork = pickle.loads(cached_artwork)
-        else:
-            artwork = Artwork.available.filter(id=artwork_id).first()
-            if not artwork:
-                return Response("Artwork does not exist.", status=status.HTTP_404_NOT_FOUND)
-            update_palette_cache_details.delay(artwork.slug, "artwork", object_id=artwork.id)
+        artwork = get_artwork(artwork_id)
+        if artwork is None or not artwork.is_available:
+            return Response("Artwork does not exist.", status=status.HTTP_404_NOT_FOUND)
 
         serializer = self.serializer_class(
             artwork, data=request.data, context={"request": request}
@@ -350,14 +592,27 @@ class CartDetailView(APIView):
     def delete(self, request, artwork_id):
         # Removes artwork items from cart
         cart = Cart(request)
-        cached_artwork = cache.get(f"artwork_{artwork_id}")
-        if cached_artwork is not None:
-            artwork = pickle.loads(cached_artwork)
-        else:
-            artwork = Artwork.available.filter(id=artwork_id).first()
-            if not artwork:
-                return Response("Artwork does not exist.", status=status.HTTP_404_NOT_FOUND)
-            update_palette_cache_details.delay(artwork.slug, "artwork", object_id=artwork.id)
+        # Unavailable artworks can still be removed from carts
+        artwork = get_artwork(artwork_id)
+        if artwork is None:
+            return Response("Artwork does not exist.", status=status.HTTP_404_NOT_FOUND)
 
         cart.remove(artwork)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CacheStatsView(APIView):
+    authentication_classes = [JWTAuthentication, PaletteTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    @extend_schema(
+        operation_id="v1_cache_stats_retrieve",
+        tags=["cache_v1"],
+    )
+    def get(self, request):
+        """
+        Retrieves the counts of single-flight cache fills: `fills` (misses that queried the db),
+        `collapsed` (misses served by another request's fill) and `fallbacks` (waits that timed out),
+        along with the hits and misses of the in-process (`l1`) and redis (`l2`) cache tiers.
+        """
+        return Response({**get_cache_stats(), **get_tier_stats()}, status=status.HTTP_200_OK)
@@ -0,0 +1,144 @@
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.conf import settings
+
+from .redis_client import get_redis_connection
+
+from collections import OrderedDict, Counter
+from threading import Lock, Thread
+from time import monotonic, sleep
+import os
+
+
+INVALIDATION_CHANNEL = "local_cache_invalidation"
+TIER_STATS_KEY = "local_cache_stats"
+TIER_STATS_FLUSH_INTERVAL = 10
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache, used as a tier in front of the shared (redis) cache for small, hot families.
+    Entries expire after `LOCAL_CACHE_TIMEOUT` seconds, which bounds staleness if an invalidation message is missed.
+    """
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self._listener_pid = None
+        self._stats = Counter()
+        self._stats_flushed = monotonic()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, monotonic() + self.timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def record(self, event):
+        """
+        Counts a tier hit/miss in-process, and adds the counts to a redis hash at most every few seconds,
+        so that l1 hits don't cost a redis round trip.
+        """
+        with self._lock:
+            self._stats[event] += 1
+            if monotonic() - self._stats_flushed < TIER_STATS_FLUSH_INTERVAL:
+                return
+            stats, self._stats = self._stats, Counter()
+            self._stats_flushed = monotonic()
+
+        pipeline = get_redis_connection().pipeline(transaction=False)
+        for stat, count in stats.items():
+            pipeline.hincrby(TIER_STATS_KEY, stat, count)
+        pipeline.execute()
+
+    def ensure_listener(self):
+        # Each process (including forked uvicorn/celery workers) needs its own subscriber thread
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            self._entries.clear()
+        Thread(target=self._listen, name="local-cache-invalidation", daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = get_redis_connection().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Messages published while disconnected are lost, so everything cached before is dropped
+                self.clear()
+                for message in pubsub.listen():
+                    self.delete_many(message["data"].decode().split(","))
+            except Exception:
+                sleep(1)
+
+
+local_cache = LocalCache(settings.LOCAL_CACHE_MAX_ENTRIES, settings.LOCAL_CACHE_TIMEOUT)
+
+
+def get_tiered(key, fill=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Retrieves a value from the in-process cache, then the shared cache, and finally from `fill` (if provided).
+    Values found in a lower tier are copied into the tiers above it. Returns None on a full miss.
+    """
+    local_cache.ensure_listener()
+    value = local_cache.get(key)
+    if value is not None:
+        local_cache.record("l1_hits")
+        return value
+    local_cache.record("l1_misses")
+
+    value = cache.get(key)
+    if value is not None:
+        local_cache.record("l2_hits")
+    else:
+        local_cache.record("l2_misses")
+        if fill is None:
+            return None
+        value = fill()
+        if value is None:
+            return None
+        cache.set(key, value, timeout)
+
+    local_cache.set(key, value)
+    return value
+
+
+def invalidate_tiered(*keys, shared=True):
+    """
+    Removes keys from the in-process cache of every process (via redis pub/sub), and from the shared cache.
+    Pass `shared=False` for keys whose shared copy is versioned or refreshed separately.
+    """
+    if shared:
+        cache.delete_many(keys)
+    local_cache.delete_many(keys)
+    get_redis_connection().publish(INVALIDATION_CHANNEL, ",".join(keys))
+
+
+def get_tier_stats():
+    return {stat.decode(): int(count) for stat, count in get_redis_connection().hgetall(TIER_STATS_KEY).items()}
@@ -26,5 +26,25 @@ app.conf.beat_schedule = {
     "cleanup_expired_tokens": {
         "task": "user.tasks.cleanup_expired_refresh_tokens",
         "schedule": crontab(hour=12),
-    }
+    },
+    "persist_carts": {
+        "task": "palette.tasks.persist_carts",
+        "schedule": crontab(minute="*/5"),
+    },
+    "purge_deleted_media": {
+        "task": "palette.tasks.purge_deleted_media",
+        "schedule": crontab(minute="*/10"),
+    },
+    "reconcile_genre_counts": {
+        "task": "palette.tasks.reconcile_palette_genre_counts",
+        "schedule": crontab(minute=0),
+    },
+    "flush_popularity_counts": {
+        "task": "palette.tasks.flush_popularity_counts",
+        "schedule": crontab(minute="*/5"),
+    },
+    "build_similar_artworks": {
+        "task": "palette.tasks.build_palette_similar_artworks",
+        "schedule": crontab(hour=3, minute=30),
+    },
 }
\ No newline at end of file
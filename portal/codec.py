@@ -0,0 +1,125 @@
+"""
+Compact cache serialization for model instances and plain data.
+
+Values are stored as a version byte followed by msgpack. Model instances keep only their loaded field values,
+along with the related objects and prefetched lists that were loaded with them (e.g. through `select_related`),
+so decoded instances can be serialized without querying the db.
+Bumping `CODEC_VERSION` makes every value written by a previous deploy decode as a cache miss.
+"""
+
+from django.apps import apps
+from django.db.models import Model
+from django.db.models.fields.files import FieldFile
+
+from msgpack import packb, unpackb, ExtType, Timestamp
+from datetime import datetime, date, timezone
+from decimal import Decimal
+from functools import partial
+from uuid import UUID
+
+
+CODEC_VERSION = 1
+
+EXT_UUID = 1
+EXT_DECIMAL = 2
+EXT_NAIVE_DATETIME = 3
+EXT_DATE = 4
+EXT_INSTANCE = 5
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _pack(value, path):
+    return packb(value, default=partial(_default, path=path), use_bin_type=True)
+
+
+def _default(value, path):
+    if isinstance(value, Model):
+        return ExtType(EXT_INSTANCE, _encode_instance(value, path))
+    elif isinstance(value, UUID):
+        return ExtType(EXT_UUID, value.bytes)
+    elif isinstance(value, Decimal):
+        return ExtType(EXT_DECIMAL, str(value).encode())
+    elif isinstance(value, datetime):
+        if value.tzinfo is not None:
+            # Built from the exact offset, as `Timestamp.from_datetime` rounds through a float
+            delta = value - EPOCH
+            return Timestamp(delta.days * 86400 + delta.seconds, delta.microseconds * 1000)
+        return ExtType(EXT_NAIVE_DATETIME, value.isoformat().encode())
+    elif isinstance(value, date):
+        return ExtType(EXT_DATE, value.isoformat().encode())
+    elif isinstance(value, FieldFile):
+        return value.name or ""
+    elif isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} for the cache.")
+
+
+def _encode_instance(instance, path):
+    # `path` holds the instances being encoded above this one, to skip reverse relations pointing back up
+    path = path | {id(instance)}
+    deferred_fields = instance.get_deferred_fields()
+    fields = {
+        field.attname: field.value_from_object(instance)
+        for field in instance._meta.concrete_fields
+        if field.attname not in deferred_fields
+    }
+    related = {
+        name: related_instance
+        for name, related_instance in instance._state.fields_cache.items()
+        if id(related_instance) not in path
+    }
+    prefetched = {
+        name: list(queryset)
+        for name, queryset in getattr(instance, "_prefetched_objects_cache", {}).items()
+    }
+    return _pack([instance._meta.label, fields, related, prefetched], path)
+
+
+def _decode_instance(model_label, fields, related, prefetched):
+    model = apps.get_model(model_label)
+    # Fields added since the value was written are left deferred, and removed fields are ignored
+    field_names = [field.attname for field in model._meta.concrete_fields if field.attname in fields]
+    instance = model.from_db("default", field_names, [fields[field_name] for field_name in field_names])
+    instance._state.fields_cache.update(related)
+
+    if prefetched:
+        instance._prefetched_objects_cache = {}
+        for name, related_instances in prefetched.items():
+            queryset = getattr(instance, name).get_queryset()
+            queryset._result_cache = related_instances
+            queryset._prefetch_done = True
+            instance._prefetched_objects_cache[name] = queryset
+    return instance
+
+
+def _ext_hook(code, data):
+    if code == EXT_INSTANCE:
+        return _decode_instance(*unpackb(data, ext_hook=_ext_hook, timestamp=3, raw=False))
+    elif code == EXT_UUID:
+        return UUID(bytes=data)
+    elif code == EXT_DECIMAL:
+        return Decimal(data.decode())
+    elif code == EXT_NAIVE_DATETIME:
+        return datetime.fromisoformat(data.decode())
+    elif code == EXT_DATE:
+        return date.fromisoformat(data.decode())
+    return ExtType(code, data)
+
+
+def dumps(value):
+    """
+    Encodes a model instance, a list of instances, or plain data (dicts, lists, strings, numbers, UUIDs,
+    decimals and datetimes) for the cache.
+    """
+    return bytes([CODEC_VERSION]) + _pack(value, frozenset())
+
+
+def loads(data):
+    """
+    Decodes a cached value written by `dumps`.
+    Returns None for values written with another codec version (or with pickle), so callers refill them.
+    """
+    if not data or data[0] != CODEC_VERSION:
+        return None
+    return unpackb(data[1:], ext_hook=_ext_hook, timestamp=3, raw=False)
@@ -0,0 +1,32 @@
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from hashlib import md5
+
+
+def make_etag(*parts):
+    """
+    Builds a strong ETag from the parts that identify a representation's version,
+    e.g. an object's id and `updated` timestamp, or a list page's cache key.
+    """
+    version = ":".join(str(part) for part in parts)
+    return quote_etag(md5(version.encode()).hexdigest())
+
+
+def get_not_modified_response(request, etag, last_modified=None):
+    """
+    Evaluates the request's `If-None-Match`/`If-Modified-Since` headers against a representation's version.
+    Returns a `304 Not Modified` response if the client's copy is current, otherwise None.
+    """
+    last_modified_timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified_timestamp)
+    if response is not None:
+        return set_conditional_headers(response, etag, last_modified)
+
+
+def set_conditional_headers(response, etag, last_modified=None):
+    # Adds the validators that clients send back on their next conditional request
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
@@ -0,0 +1,91 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from rest_framework.pagination import CursorPagination, Cursor
+from rest_framework.exceptions import NotFound
+import json
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination on a unique composite key, e.g. `(created, id)`.
+    The cursor holds the key of the last (or first) row of a page, and the next page is fetched with
+    a row comparison on the key, so rows sharing a `created` value are never skipped or repeated,
+    and deep pages cost the same as the first one when backed by an index on the ordering.
+    The last ordering field must be unique.
+    """
+    ordering = ("-created", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        ordering = [self.invert(field) for field in self.ordering] if reverse else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None and self.cursor.position is not None:
+            queryset = queryset.filter(self.get_position_filter(queryset.model, ordering, self.cursor.position))
+
+        # One extra row is fetched to tell whether another page follows
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        has_following_page = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_following_page
+        else:
+            self.has_next, self.has_previous = has_following_page, self.cursor is not None
+        return self.page
+
+    def set_ordering(self, field):
+        # Orders by a single field, with `id` in the same direction as the tie-breaker
+        self.ordering = (field, "-id" if field.startswith("-") else "id")
+
+    def invert(self, field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    def get_position_filter(self, model, ordering, position):
+        """
+        Builds the row comparison `(f1, f2, ...) > (v1, v2, ...)` for the given ordering as
+        `f1 >= v1 AND (f1 > v1 OR (f1 = v1 AND f2 > v2) OR ...)`, with `<` for descending fields.
+        The redundant leading `f1 >= v1` gives the database an index bound on the ordering's index;
+        without it, the disjunction is evaluated as a filter over every row before the cursor.
+        """
+        try:
+            values = json.loads(position)
+            field_names = [field.lstrip("-") for field in ordering]
+            if not isinstance(values, list) or len(values) != len(field_names):
+                raise ValueError
+            values = [
+                model._meta.get_field(field_name).to_python(value)
+                for field_name, value in zip(field_names, values)
+            ]
+        except (ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        position_filter = Q()
+        for i, field in enumerate(ordering):
+            lookup = "lt" if field.startswith("-") else "gt"
+            previous_fields_equal = {field_names[j]: values[j] for j in range(i)}
+            position_filter |= Q(**previous_fields_equal, **{f"{field_names[i]}__{lookup}": values[i]})
+        leading_lookup = "lte" if ordering[0].startswith("-") else "gte"
+        return Q(**{f"{field_names[0]}__{leading_lookup}": values[0]}) & position_filter
+
+    def get_position(self, instance):
+        return json.dumps([str(getattr(instance, field.lstrip("-"))) for field in self.ordering])
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.get_position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.get_position(self.page[0])))
@@ -1,7 +1,7 @@
 from django.core.cache import cache
 
 from chat.models import Artist, Collector, Chat, User
-from palette.models import Artwork
+from palette.utils import get_artwork_by_slug
 
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 from rest_framework.exceptions import NotFound, PermissionDenied, NotAuthenticated
@@ -31,8 +31,10 @@ class IsAdminOrReadOnly(BasePermission):
         
 class IsArtistOrReadOnly(BasePermission):
     def has_permission(self, request, view):
-        artists_user_list = [str(id) for id in Artist.objects.values_list("user_id", flat=True)]
-        if any([(request.user.is_authenticated and str(request.user.id) in artists_user_list), request.method in SAFE_METHODS]):
+        # Safe methods are checked first so that cached reads don't query the artist table
+        if request.method in SAFE_METHODS:
+            return True
+        elif request.user.is_authenticated and Artist.objects.filter(user_id=request.user.id).exists():
             return True
         else:
             raise PermissionDenied("You must be an artist to perform this action.")
@@ -41,8 +43,8 @@ class IsArtistOrReadOnly(BasePermission):
 class IsCreatorOrReadOnly(BasePermission):
     def has_permission(self, request, view):
         artwork_slug = view.kwargs.get("slug")
-        artwork = Artwork.available.filter(slug=artwork_slug).first()
-        if not artwork:
+        artwork = get_artwork_by_slug(artwork_slug)
+        if not artwork or not artwork.is_available:
             raise NotFound("Artwork does not exist.")
         
         if not any([all([request.user.is_authenticated, (str(artwork.artist.user.id) == str(request.user.id))]), request.method in SAFE_METHODS]):
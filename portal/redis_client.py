@@ -0,0 +1,13 @@
+from django.conf import settings
+
+from redis import Redis
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_redis_connection():
+    """
+    Returns a shared client for the default cache's Redis server.
+    Used for data structures the Django cache API doesn't expose (hashes, sets, counters).
+    """
+    return Redis.from_url(settings.CACHES["default"]["LOCATION"])
@@ -134,15 +134,30 @@ CACHES = {
     },
 }
 
+# In-process LRU tier in front of the default cache, for small and hot data such as genres
+LOCAL_CACHE_MAX_ENTRIES = 1024
+LOCAL_CACHE_TIMEOUT = 10
+
 
 # Session settings (using a cache-db backend)
 
-CART_SESSION_ID = "cart"  # For cart
 REFRESH_SESSION_ID = "refresh"  # For refresh token
 SESSION_CACHE_ALIAS = "session_cache"
 SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
 
 
+# Cart settings (carts are redis hashes keyed by user, persisted periodically to the database)
+
+CART_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+CART_PERSIST_BATCH_SIZE = 500
+
+
+# Media deletion settings (deleted cloudinary files are queued and purged periodically in batches)
+
+MEDIA_DELETION_BATCH_SIZE = 100  # Cloudinary accepts up to 100 public ids per bulk delete
+MEDIA_DELETION_MAX_ATTEMPTS = 5
+
+
 # Celery settings
 
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
@@ -204,6 +219,29 @@ MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
 
+# Stages artwork uploads locally and pushes them to the storage backend from a celery task
+ARTWORK_ASYNC_INGESTION = os.getenv("ARTWORK_ASYNC_INGESTION", "False").lower() == "true"
+ARTWORK_STAGING_ROOT = MEDIA_ROOT / "temp_uploads"
+
+# Maximum number of artworks created/updated by a single bulk request
+ARTWORK_BULK_MAX_ITEMS = 25
+
+# Uploads whose image hash differs from an existing artwork's in at most this many bits (of 64) are rejected
+ARTWORK_DUPLICATE_MAX_DISTANCE = 6
+
+# Number of similar artworks precomputed per artwork, and the number of artworks scored against each other at once
+ARTWORK_SIMILAR_COUNT = 12
+ARTWORK_SIMILARITY_BLOCK_SIZE = 2048
+
+# Number of artworks fetched per round trip while streaming a catalog export
+ARTWORK_EXPORT_CHUNK_SIZE = 2000
+
+# Widths (in pixels) of the WebP variants generated for each artwork image
+ARTWORK_IMAGE_VARIANT_WIDTHS = [320, 640, 1024]
+ARTWORK_IMAGE_VARIANT_QUALITY = 80
+# Uploads with more pixels than this are rejected before being decoded
+ARTWORK_IMAGE_MAX_PIXELS = 50_000_000
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
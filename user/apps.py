@@ -6,4 +6,4 @@ class UserConfig(AppConfig):
     name = "user"
     
     def ready(self):
-        import user.schema
\ No newline at end of file
+        import user.schema
@@ -115,7 +115,7 @@ class Artist(Model):
     class Meta:
         db_table = "artist"
         ordering = ["-created"]
-        indexes = [Index(fields=["id", "user"])]
+        indexes = [Index(fields=["id", "user"]), Index(fields=["-created", "-id"])]
 
     def __str__(self):
         return self.user.username
@@ -134,6 +134,7 @@ class Collector(Model):
     class Meta:
         db_table = "collector"
         ordering = ["-created"]
+        indexes = [Index(fields=["-created", "-id"])]
 
     def __str__(self):
         return self.user.username
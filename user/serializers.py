@@ -6,6 +6,7 @@ from django.core import signing
 from .models import User, Artist, Collector, PaletteAuthToken, UserOTP
 from .refresh import SessionRefreshToken
 from .tasks import store_access_token, send_otp
+from palette.popularity import get_popularity
 
 from rest_framework.serializers import (
     ModelSerializer,
@@ -257,15 +258,20 @@ class RefreshTokenSerializer(Serializer):
 
 class ArtistProfileSerializer(ModelSerializer):
     user = SerializerMethodField()
+    popularity = SerializerMethodField()
 
     class Meta:
         model = Artist
-        fields = ["id", "bio", "instagram", "user"]
+        fields = ["id", "bio", "instagram", "user", "popularity"]
         read_only_fields = ["id"]
 
     def get_user(self, obj):
         return str(obj.user)
 
+    def get_popularity(self, obj):
+        # Totals over the artist's artworks
+        return get_popularity(obj)
+
     def create(self, validated_data):
         user = self.context["user"]
         validated_data["user"] = user
@@ -1,17 +1,15 @@
 from django.db.transaction import atomic
 from django.utils import timezone
-from django.core.cache import cache
 from django.core.mail import send_mail
 from django.core import signing
 from django.conf import settings
 
-from .models import PaletteAuthToken, JWTAccessToken, Artist, User, Collector
+from .models import PaletteAuthToken, JWTAccessToken, User
 from .utils import generate_otp_code
 
 from celery import shared_task
 from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
 from rest_framework_simplejwt.tokens import AccessToken
-import pickle
 
 
 @shared_task
@@ -46,21 +44,6 @@ def cleanup_expired_refresh_tokens():
     expired_tokens.delete()
     
     
-@shared_task
-def update_cache_details(object_id, profile_id, is_delete=False, is_collector=False):
-    object_model = Collector if is_collector else Artist
-    object_prefix = "collector" if is_collector else "artist" 
-    profile = object_model.objects.filter(id=object_id).first()
-    profiles_cache = pickle.loads(cache.get(f"{object_prefix}_list", []))
-    profiles_cache_ids = [i.id for i in profiles_cache if str(i.id) != str(profile_id)]
-    if not is_delete:
-        profiles_cache_ids.append(profile.id)
-        
-    object_list = object_model.objects.filter(id__in=profiles_cache_ids)
-    cache.set(f"{object_prefix}_list", pickle.dumps(object_list))
-       
-       
-       
 @shared_task
 def send_otp(email, otp_type=None):
     otp_code, user_id = generate_otp_code(email, otp_type)
@@ -1,11 +1,9 @@
 from django.urls import reverse
-from django.core.cache import cache
 
 from .models import User, Artist, Collector, PaletteAuthToken
 
 from rest_framework.test import APITestCase, override_settings
 from time import sleep
-import pickle
 
 
 class RegisterViewTestCase(APITestCase):
@@ -211,23 +209,12 @@ class ArtistProfileViewTestCase(APITestCase):
             "profile_id": "764e3e7c-3c23-4f06-8a48-ef37abf3b8cf"
         })
 
-    def test_get_artists_from_db_success(self):
-        cache.clear()
-        self.assertIsNone(cache.get("artist_list"))
-        
+    def test_get_artists_success(self):
         response = self.client.post(
             self.knox_login,
             data={"email": "admin1@gmail.com", "password": "Admin,123"}
         )
         token = response.data["token"]
-        self.client.get(
-            self.artist_profile,
-            headers={"Authorization": f"Token {token}"}
-        )
-        # Checks that queries are cached properly
-        self.assertIsNotNone(cache.get("artist_list"))
-        cache.clear()
-
         response1 = self.client.get(
             self.artist_profile,
             headers={"Authorization": f"Token {token}"}
@@ -235,13 +222,9 @@ class ArtistProfileViewTestCase(APITestCase):
         self.assertEqual(response1.status_code, 200)
         self.assertEqual(len(response1.data), 3)
         self.assertEqual(response1.data["results"][0]["id"], str(self.artist2.id))
-        self.assertIsNotNone(cache.get("artist_list"))
         
-    def test_get_artists_from_cache_success(self):
+    def test_get_artists_after_create_success(self):
         artist = Artist.objects.create(user=self.user3)
-        artists = Artist.objects.all()
-        cache.set("artist_list", pickle.dumps(artists))
-        
         response = self.client.post(
             self.knox_login,
             data={"email": "admin1@gmail.com", "password": "Admin,123"}
@@ -309,6 +292,58 @@ class ArtistProfileViewTestCase(APITestCase):
         self.assertIn("user", response1.data)
         self.assertEqual(response1.status_code, 200)
         
+    def test_artist_profile_detail_get_not_modified(self):
+        response = self.client.post(
+            self.knox_login,
+            data={"email": "admin1@gmail.com", "password": "Admin,123"}
+        )
+        token = response.data["token"]
+        response1 = self.client.get(
+            self.artist1_detail,
+            headers={"Authorization": f"Token {token}"}
+        )
+        etag = response1.headers["ETag"]
+        
+        response2 = self.client.get(
+            self.artist1_detail,
+            headers={"Authorization": f"Token {token}", "If-None-Match": etag}
+        )
+        self.assertEqual(response2.status_code, 304)
+        
+        self.artist1.bio = "Painter"
+        self.artist1.save()
+        response3 = self.client.get(
+            self.artist1_detail,
+            headers={"Authorization": f"Token {token}", "If-None-Match": etag}
+        )
+        self.assertEqual(response3.status_code, 200)
+        self.assertEqual(response3.data["bio"], "Painter")
+        
+    def test_artist_profile_list_get_not_modified(self):
+        response = self.client.post(
+            self.knox_login,
+            data={"email": "admin1@gmail.com", "password": "Admin,123"}
+        )
+        token = response.data["token"]
+        etag = self.client.get(
+            self.artist_profile,
+            headers={"Authorization": f"Token {token}"}
+        ).headers["ETag"]
+        
+        response1 = self.client.get(
+            self.artist_profile,
+            headers={"Authorization": f"Token {token}", "If-None-Match": etag}
+        )
+        self.assertEqual(response1.status_code, 304)
+        
+        Artist.objects.create(user=self.user3)
+        response2 = self.client.get(
+            self.artist_profile,
+            headers={"Authorization": f"Token {token}", "If-None-Match": etag}
+        )
+        self.assertEqual(response2.status_code, 200)
+        self.assertEqual(len(response2.data["results"]), 3)
+        
     def test_artist_profile_detail_get_failure(self):
         response = self.client.post(
             self.knox_login,
@@ -322,10 +357,16 @@ class ArtistProfileViewTestCase(APITestCase):
         self.assertEqual("Profile does not exist.", response1.data)
         self.assertEqual(response1.status_code, 404)
         
-    def test_artist_profile_detail_put_success(self):
-        artists = Artist.objects.all()
-        cache.set("artist_list", pickle.dumps(artists))
+        # The id of a collector profile is not an artist profile
+        collector = Collector.objects.create(user=self.user3)
+        response2 = self.client.get(
+            reverse("user:artist-profile-detail", kwargs={"profile_id": collector.id}),
+            headers={"Authorization": f"Token {token}"}
+        )
+        self.assertEqual("Profile does not exist.", response2.data)
+        self.assertEqual(response2.status_code, 404)
         
+    def test_artist_profile_detail_put_success(self):
         response = self.client.post(
             self.knox_login,
             data={"email": "admin1@gmail.com", "password": "Admin,123"}
@@ -374,9 +415,6 @@ class ArtistProfileViewTestCase(APITestCase):
         self.assertEqual(response3.status_code, 404)
         
     def test_artist_profile_detail_delete_success(self):
-        artists = Artist.objects.all()
-        cache.set("artist_list", pickle.dumps(artists))
-        
         response = self.client.post(
             self.knox_login,
             data={"email": "admin1@gmail.com", "password": "Admin,123"}
@@ -462,23 +500,12 @@ class CollectorProfileViewTestCase(APITestCase):
             "profile_id": "764e3e7c-3c23-4f06-8a48-ef37abf3b8cf"
         })
 
-    def test_get_collectors_from_db_success(self):
-        cache.clear()
-        self.assertIsNone(cache.get("collector_list"))
-        
+    def test_get_collectors_success(self):
         response = self.client.post(
             self.knox_login,
             data={"email": "admin1@gmail.com", "password": "Admin,123"}
         )
         token = response.data["token"]
-        self.client.get(
-            self.collector_profile,
-            headers={"Authorization": f"Token {token}"}
-        )
-        # Checks that queries are cached properly
-        self.assertIsNotNone(cache.get("collector_list"))
-        cache.clear()
-
         response1 = self.client.get(
             self.collector_profile,
             headers={"Authorization": f"Token {token}"}
@@ -486,13 +513,9 @@ class CollectorProfileViewTestCase(APITestCase):
         self.assertEqual(response1.status_code, 200)
         self.assertEqual(len(response1.data), 3)
         self.assertEqual(response1.data["results"][0]["id"], str(self.collector2.id))
-        self.assertIsNotNone(cache.get("collector_list"))
         
-    def test_get_collectors_from_cache_success(self):
+    def test_get_collectors_after_create_success(self):
         collector = Collector.objects.create(user=self.user3)
-        collectors = Collector.objects.all()
-        cache.set("collector_list", pickle.dumps(collectors))
-        
         response = self.client.post(
             self.knox_login,
             data={"email": "admin1@gmail.com", "password": "Admin,123"}
@@ -573,10 +596,16 @@ class CollectorProfileViewTestCase(APITestCase):
         self.assertEqual("Profile does not exist.", response1.data)
         self.assertEqual(response1.status_code, 404)
         
-    def test_collector_profile_detail_put_success(self):
-        collectors = Collector.objects.all()
-        cache.set("collector_list", pickle.dumps(collectors))
+        # The id of an artist profile is not a collector profile
+        artist = Artist.objects.create(user=self.user3)
+        response2 = self.client.get(
+            reverse("user:collector-profile-detail", kwargs={"profile_id": artist.id}),
+            headers={"Authorization": f"Token {token}"}
+        )
+        self.assertEqual("Profile does not exist.", response2.data)
+        self.assertEqual(response2.status_code, 404)
         
+    def test_collector_profile_detail_put_success(self):
         response = self.client.post(
             self.knox_login,
             data={"email": "admin1@gmail.com", "password": "Admin,123"}
@@ -625,9 +654,6 @@ class CollectorProfileViewTestCase(APITestCase):
         self.assertEqual(response3.status_code, 404)
         
     def test_collector_profile_detail_delete_success(self):
-        collectors = Collector.objects.all()
-        cache.set("collector_list", pickle.dumps(collectors))
-        
         response = self.client.post(
             self.knox_login,
             data={"email": "admin1@gmail.com", "password": "Admin,123"}
@@ -1,9 +1,9 @@
 from django.db.transaction import atomic
 from django.contrib.auth.signals import user_logged_out
-from django.core.cache import cache
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.cache import never_cache
 from django.utils.decorators import method_decorator
+from django.db.models import Count, Max
 
 from .serializers import (
     User,
@@ -21,7 +21,9 @@ from .serializers import (
 from .models import PaletteTokenAuthentication
 from .refresh import SessionRefreshToken
 from portal.permissions import IsCurrentOwnerOrReadOnly
-from .tasks import store_access_token, delete_access_token, update_cache_details, send_otp
+from portal.conditional import make_etag, get_not_modified_response, set_conditional_headers
+from portal.pagination import KeysetPagination
+from .tasks import store_access_token, delete_access_token, send_otp
 from .social_authentication import begin_social_authentication, complete_social_authentication
 
 from rest_framework.views import APIView
@@ -29,19 +31,39 @@ from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.pagination import CursorPagination
 from knox.views import LoginView, LogoutAllView
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from uuid import UUID
-import pickle
 from social_django.utils import psa
 from drf_spectacular.utils import extend_schema
 
 
-class UserPagination(CursorPagination):
+class UserPagination(KeysetPagination):
     page_size = 15
-    ordering = "-created"
+
+
+def get_profile_list_etag(profile_model, paginator, request, include_stats=False):
+    """
+    Builds the ETag of a profile list page from the profile count and latest profile/user updates.
+    Creates, updates and deletes all change at least one of these, using a single aggregate query.
+    `include_stats` adds the latest stats update, for profiles listed with their popularity counts.
+    """
+    aggregates = {"count": Count("id"), "updated": Max("updated"), "user_updated": Max("user__updated")}
+    if include_stats:
+        aggregates["stats_updated"] = Max("stats__updated")
+    versions = profile_model.objects.aggregate(**aggregates)
+    cursor = request.query_params.get(paginator.cursor_query_param, "")
+    return make_etag(
+        profile_model._meta.model_name, *versions.values(), cursor, paginator.get_page_size(request)
+    )
+
+
+def get_profile_etag(profile):
+    # The username (and an artist's popularity counts) are part of the representation, so their updates also change the version
+    stats = getattr(profile, "stats", None)
+    versions = [profile.updated, profile.user.updated] + ([stats.updated] if stats else [])
+    return make_etag(profile._meta.model_name, profile.id, *versions), max(versions)
 
 
 class RegisterView(APIView):
@@ -290,18 +312,19 @@ class ArtistProfileListView(APIView):
         tags=["profile_v1"],
     )
     def get(self, request):
-        cached_artists = cache.get("artist_list")
-        if cached_artists is not None:
-            artists = pickle.loads(cached_artists)
-        else:
-            artists = Artist.objects.all()
-            cache.set("artist_list", pickle.dumps(artists))
-            
-        # Paginate the artists queryset
         paginator = self.pagination_class()
+        etag = get_profile_list_etag(Artist, paginator, request, include_stats=True)
+        not_modified = get_not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        
+        # Only the requested page is fetched, and unchanged pages are answered by the ETag check above
+        artists = Artist.objects.select_related("user", "stats")
+        
+        # Paginate the artists queryset
         paginated_artists = paginator.paginate_queryset(artists, request, view=self)
         artist_data = self.serializer_class(paginated_artists, many=True).data    
-        return paginator.get_paginated_response(artist_data)
+        return set_conditional_headers(paginator.get_paginated_response(artist_data), etag)
         
     @extend_schema(
         operation_id="v1_artist_create",
@@ -328,9 +351,18 @@ class ArtistProfileDetailView(APIView):
         tags=["profile_v1"],
     )
     def get(self, request, profile_id):
-        artist = Artist.objects.filter(id=profile_id).first()
+        artist = Artist.objects.select_related("user", "stats").filter(id=profile_id).first()
+        if artist is None:
+            # The permission check also accepts the id of the other profile type
+            return Response("Profile does not exist.", status=status.HTTP_404_NOT_FOUND)
+        
+        etag, last_modified = get_profile_etag(artist)
+        not_modified = get_not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        
         artist_data = self.serializer_class(artist).data
-        return Response(artist_data, status=status.HTTP_200_OK)
+        return set_conditional_headers(Response(artist_data, status=status.HTTP_200_OK), etag, last_modified)
 
     @extend_schema(
         operation_id="v1_artist_update",
@@ -348,7 +380,6 @@ class ArtistProfileDetailView(APIView):
                 profile_data = serializer.save()
                 
             artist_data = self.serializer_class(profile_data).data
-            update_cache_details.delay(artist_data["id"], profile_id)
             return Response(artist_data, status=status.HTTP_202_ACCEPTED)
 
     @extend_schema(
@@ -360,7 +391,6 @@ class ArtistProfileDetailView(APIView):
         with atomic():
             artist.delete()
             
-        update_cache_details.delay(artist.id, profile_id, is_delete=True)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -376,18 +406,19 @@ class CollectorProfileListView(APIView):
         tags=["profile_v1"],
     )
     def get(self, request):
-        cached_collectors = cache.get("collector_list")
-        if cached_collectors is not None:
-            collectors = pickle.loads(cached_collectors)
-        else:
-            collectors = Collector.objects.all()
-            cache.set("collector_list", pickle.dumps(collectors))
-            
-        # Paginate the collectors queryset
         paginator = self.pagination_class()
+        etag = get_profile_list_etag(Collector, paginator, request)
+        not_modified = get_not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        
+        # Only the requested page is fetched, and unchanged pages are answered by the ETag check above
+        collectors = Collector.objects.select_related("user")
+        
+        # Paginate the collectors queryset
         paginated_collectors = paginator.paginate_queryset(collectors, request, view=self)
         collectors_data = self.serializer_class(paginated_collectors, many=True).data
-        return paginator.get_paginated_response(collectors_data)
+        return set_conditional_headers(paginator.get_paginated_response(collectors_data), etag)
 
     @extend_schema(
         operation_id="v1_collector_create",
@@ -416,9 +447,18 @@ class CollectorProfileDetailView(APIView):
         tags=["profile_v1"],
     )
     def get(self, request, profile_id):
-        collector = Collector.objects.filter(id=profile_id).first()
+        collector = Collector.objects.select_related("user").filter(id=profile_id).first()
+        if collector is None:
+            # The permission check also accepts the id of the other profile type
+            return Response("Profile does not exist.", status=status.HTTP_404_NOT_FOUND)
+        
+        etag, last_modified = get_profile_etag(collector)
+        not_modified = get_not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        
         collector_data = self.serializer_class(collector).data
-        return Response(collector_data, status=status.HTTP_200_OK)
+        return set_conditional_headers(Response(collector_data, status=status.HTTP_200_OK), etag, last_modified)
 
     @extend_schema(
         operation_id="v1_collector_update",
@@ -436,7 +476,6 @@ class CollectorProfileDetailView(APIView):
                 profile_data = serializer.save()
                 
             collector_data = self.serializer_class(profile_data).data
-            update_cache_details.delay(collector_data["id"], profile_id, is_collector=True)
             return Response(collector_data, status=status.HTTP_202_ACCEPTED)
 
     @extend_schema(
@@ -448,7 +487,6 @@ class CollectorProfileDetailView(APIView):
         with atomic():
             collector.delete()
             
-        update_cache_details.delay(collector.id, profile_id, is_delete=True, is_collector=True)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 